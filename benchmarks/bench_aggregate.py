@@ -0,0 +1,55 @@
+# benchmarks/bench_aggregate.py
+# 对比取出全部行在应用代码中聚合与聚合查询（COUNT(*) 元数据、按列求值、有序索引、散列聚合）的耗时。
+# 用法: python benchmarks/bench_aggregate.py [行数]
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.query_executor import QueryExecutor
+
+DEFAULT_ROWS = 1_000_000
+
+def build(storage, row_count):
+    executor = QueryExecutor()
+    executor.execute(f"CREATE TABLE t (id INT, dept TEXT, salary INT) STORAGE {storage}")
+    executor.database.get_table('t').bulk_insert(
+        [[i, f'dept{i % 100}', i % 5000] for i in range(row_count)])
+    executor.execute("CREATE INDEX idx_salary ON t (salary)")
+    return executor
+
+def manual_group(executor):
+    totals = {}
+    for dept, salary in executor.execute("SELECT dept, salary FROM t"):
+        totals[dept] = totals.get(dept, 0) + salary
+    return totals
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    print(f"{'storage':>9} {'query':>34} {'manual(s)':>10} {'aggregate(s)':>13}")
+    for storage in ['ROW', 'COLUMNAR']:
+        executor = build(storage, row_count)
+        cases = [
+            ('COUNT(*)', lambda: len(executor.execute("SELECT * FROM t").fetchall()),
+             "SELECT COUNT(*) FROM t"),
+            ('SUM(salary) WHERE id < n/2', lambda: sum(row[0] for row in executor.execute(
+                f"SELECT salary FROM t WHERE id < {row_count // 2}")),
+             f"SELECT SUM(salary) FROM t WHERE id < {row_count // 2}"),
+            ('MAX(salary)', lambda: max(row[0] for row in executor.execute("SELECT salary FROM t")),
+             "SELECT MAX(salary) FROM t"),
+            ('SUM(salary) GROUP BY dept', lambda: manual_group(executor),
+             "SELECT dept, SUM(salary) FROM t GROUP BY dept"),
+        ]
+        for name, manual, sql in cases:
+            start = time.perf_counter()
+            manual()
+            manual_s = time.perf_counter() - start
+            start = time.perf_counter()
+            executor.execute(sql).fetchall()
+            aggregate_s = time.perf_counter() - start
+            print(f"{storage:>9} {name:>34} {manual_s:>10.3f} {aggregate_s:>13.4f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,48 @@
+# benchmarks/bench_alter.py
+# ALTER TABLE ADD / DROP COLUMN 的耗时随行数的变化：以前逐行改写（每行追加 / 删除一个值），
+# 现在只修改表结构，行在压缩时才改写。压缩单独计时，它可以在后台空闲时进行。
+# 用法: python benchmarks/bench_alter.py [行数 ...]
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import Database
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def load(row_count):
+    database = Database()
+    database.create_table('t', {'id': 'INT', 'name': 'TEXT', 'score': 'INT'})
+    database.get_table('t').bulk_insert([(i, f'name{i % 1000}', i % 97) for i in range(row_count)])
+    return database
+
+def rewrite_alter(rows):
+    # 以前的实现：ADD COLUMN 为每行追加 None，DROP COLUMN 从每行删除该值
+    add = timed(lambda: rows.__setitem__(slice(None), [row + (None,) for row in rows]))
+    drop = timed(lambda: rows.__setitem__(slice(None), [row[:1] + row[2:] for row in rows]))
+    return add, drop
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or DEFAULT_SIZES
+    print(f"{'rows':>10} {'rewrite add':>12} {'rewrite drop':>12} {'add':>10} {'drop':>10} {'compact':>10}")
+    for row_count in sizes:
+        database = load(row_count)
+        table = database.get_table('t')
+        old_add, old_drop = rewrite_alter(list(table.storage.rows))
+        add = timed(lambda: database.alter_table('t', 'ADD COLUMN', 'age', 'INT'))
+        drop = timed(lambda: database.alter_table('t', 'DROP COLUMN', 'name'))
+        compact = timed(database.compact)
+        assert table.rows[0] == [0, 0, None]
+        print(f"{row_count:>10} {old_add * 1e3:>10.2f}ms {old_drop * 1e3:>10.2f}ms {add * 1e6:>8.1f}us "
+              f"{drop * 1e6:>8.1f}us {compact * 1e3:>8.2f}ms")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
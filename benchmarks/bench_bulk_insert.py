@@ -0,0 +1,49 @@
+# benchmarks/bench_bulk_insert.py
+# 对比逐条 INSERT、多行 VALUES、executemany 与 Table.bulk_insert 的装载速度。
+# 用法: python benchmarks/bench_bulk_insert.py [行数]
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.query_executor import QueryExecutor
+
+DEFAULT_ROWS = 100_000
+BATCH = 1000
+
+def new_executor():
+    executor = QueryExecutor()
+    executor.execute("CREATE TABLE t (id INT, name TEXT)")
+    executor.execute("CREATE INDEX idx_id ON t (id)")
+    return executor
+
+def single_rows(executor, row_count):
+    for i in range(row_count):
+        executor.execute(f"INSERT INTO t (id, name) VALUES ({i}, 'name{i}')")
+
+def multi_row_values(executor, row_count):
+    for start in range(0, row_count, BATCH):
+        values = ', '.join(f"({i}, 'name{i}')" for i in range(start, min(start + BATCH, row_count)))
+        executor.execute(f"INSERT INTO t (id, name) VALUES {values}")
+
+def executemany(executor, row_count):
+    executor.executemany("INSERT INTO t (id, name) VALUES (?, ?)", [(i, f'name{i}') for i in range(row_count)])
+
+def bulk_insert(executor, row_count):
+    executor.database.get_table('t').bulk_insert([[i, f'name{i}'] for i in range(row_count)])
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    print(f"{'method':>18} {'seconds':>9} {'rows/s':>11}")
+    for method in [single_rows, multi_row_values, executemany, bulk_insert]:
+        executor = new_executor()
+        start = time.perf_counter()
+        method(executor, row_count)
+        elapsed = time.perf_counter() - start
+        assert len(executor.database.get_table('t').rows) == row_count
+        print(f"{method.__name__:>18} {elapsed:>9.3f} {row_count / elapsed:>11.0f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,68 @@
+# benchmarks/bench_concurrency.py
+# 多个读线程与写线程共享一个 QueryExecutor：报告不同写负载下的读吞吐，
+# 写者写同一张表（与读者竞争表锁）或另一张表（只竞争解释器）。
+# 用法: python benchmarks/bench_concurrency.py [读线程数] [秒数]
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.query_executor import QueryExecutor
+
+ROWS = 10_000
+WRITER_COUNTS = [0, 1, 4]
+
+def build():
+    executor = QueryExecutor()
+    for name in ('t', 'log'):
+        executor.execute(f"CREATE TABLE {name} (id INT, name TEXT, score INT)")
+        executor.database.get_table(name).bulk_insert([[i, f'name{i}', i % 100] for i in range(ROWS)])
+        executor.execute(f"CREATE INDEX idx_{name}_id ON {name} (id) USING HASH")
+    return executor
+
+def run(readers, writers, target, seconds):
+    executor = build()
+    reads = [0] * readers
+    writes = [0] * writers
+    stop = threading.Event()
+
+    def reader(slot):
+        statement = executor.prepare("SELECT name, score FROM t WHERE id = ?")
+        i = slot
+        while not stop.is_set():
+            statement.execute((i % ROWS,)).fetchall()
+            reads[slot] += 1
+            i += 7
+
+    def writer(slot):
+        statement = executor.prepare(f"UPDATE {target} SET score = ? WHERE id = ?")
+        i = slot
+        while not stop.is_set():
+            statement.execute((i % 100, i % ROWS))
+            writes[slot] += 1
+            i += 13
+
+    threads = ([threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+               + [threading.Thread(target=writer, args=(i,)) for i in range(writers)])
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(reads) / seconds, sum(writes) / seconds
+
+def main(argv):
+    readers = int(argv[0]) if argv else 4
+    seconds = float(argv[1]) if len(argv) > 1 else 2.0
+    print(f"{'readers':>8} {'writers':>8} {'writes to':>10} {'reads/s':>10} {'writes/s':>10}")
+    for writers in WRITER_COUNTS:
+        for target in (['t', 'log'] if writers else ['t']):
+            read_rate, write_rate = run(readers, writers, target, seconds)
+            print(f"{readers:>8} {writers:>8} {target if writers else '-':>10} {read_rate:>10.0f} {write_rate:>10.0f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,51 @@
+# benchmarks/bench_cursor.py
+# 对比物化查询（Table.select）与游标流式扫描的首行延迟和峰值内存。
+# 用法: python benchmarks/bench_cursor.py [行数]
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.query_executor import QueryExecutor
+
+DEFAULT_ROWS = 1_000_000
+
+def build(storage, row_count):
+    executor = QueryExecutor()
+    executor.execute(f"CREATE TABLE t (id INT, name TEXT) STORAGE {storage}")
+    executor.database.get_table('t').bulk_insert([[i, f'name{i % 1000}'] for i in range(row_count)])
+    return executor
+
+def measure(fn):
+    # 返回 (首行延迟 ms, 总耗时 ms, 峰值内存 MB)
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = fn()
+    first = next(rows)
+    first_ms = (time.perf_counter() - start) * 1000
+    for _ in rows:
+        pass
+    total_ms = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return first_ms, total_ms, peak
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    print(f"{'storage':>9} {'method':>8} {'first(ms)':>10} {'total(ms)':>10} {'peak(MB)':>9}")
+    for storage in ['ROW', 'COLUMNAR']:
+        executor = build(storage, row_count)
+        table = executor.database.get_table('t')
+        methods = {
+            'select': lambda: iter(table.select(['*'])),
+            'cursor': lambda: executor.execute("SELECT * FROM t"),
+        }
+        for name, fn in methods.items():
+            first_ms, total_ms, peak = measure(fn)
+            print(f"{storage:>9} {name:>8} {first_ms:>10.2f} {total_ms:>10.1f} {peak:>9.1f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
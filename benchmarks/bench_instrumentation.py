@@ -0,0 +1,57 @@
+# benchmarks/bench_instrumentation.py
+# 开启语句计量的开销：同样的点查、范围查询与逐条 INSERT，分别在不计量与计量时执行，对比单条语句的耗时。
+# 用法: python benchmarks/bench_instrumentation.py [行数]
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.instrumentation import Instrumentation
+from src.query_executor import QueryExecutor
+
+DEFAULT_ROWS = 100_000
+STATEMENTS = 2000
+REPEAT = 5
+
+def build(row_count, instrumentation):
+    executor = QueryExecutor(instrumentation=instrumentation)
+    executor.execute("CREATE TABLE t (id INT, name TEXT, score INT)")
+    executor.database.get_table('t').bulk_insert([[i, f'name{i % 1000}', i % 97] for i in range(row_count)])
+    executor.execute("CREATE INDEX idx_id ON t (id)")
+    return executor
+
+def point(executor, row_count, i):
+    executor.execute("SELECT name FROM t WHERE id = ?", (i * 7919 % row_count,)).fetchall()
+
+def range_query(executor, row_count, i):
+    low = i * 7919 % row_count
+    executor.execute("SELECT id, name FROM t WHERE id BETWEEN ? AND ?", (low, low + 100)).fetchall()
+
+def insert(executor, row_count, i):
+    executor.execute("INSERT INTO t (id, name, score) VALUES (?, 'new', 0)", (row_count + i,))
+
+def per_statement(fn, executor, row_count):
+    timings = []
+    for round_ in range(REPEAT):
+        start = time.perf_counter()
+        for i in range(STATEMENTS):
+            fn(executor, row_count, round_ * STATEMENTS + i)
+        timings.append((time.perf_counter() - start) / STATEMENTS)
+    return statistics.median(timings)
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    plain = build(row_count, None)
+    profiled = build(row_count, Instrumentation())
+    print(f"rows: {row_count}")
+    print(f"{'statement':>12} {'off (us)':>10} {'on (us)':>10} {'overhead':>9}")
+    for name, fn in [('point', point), ('range', range_query), ('insert', insert)]:
+        off = per_statement(fn, plain, row_count)
+        on = per_statement(fn, profiled, row_count)
+        print(f"{name:>12} {off * 1e6:>10.2f} {on * 1e6:>10.2f} {on / off - 1:>+8.0%}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
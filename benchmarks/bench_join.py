@@ -0,0 +1,59 @@
+# benchmarks/bench_join.py
+# 对比在应用代码中连接两个完整结果集（嵌套循环）、散列连接、归并连接与溢出到磁盘的散列连接。
+# 用法: python benchmarks/bench_join.py [订单行数]
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import Database
+from src.query_executor import QueryExecutor
+
+DEFAULT_ROWS = 200_000
+JOIN_SQL = "SELECT users.name, orders.amount FROM users JOIN orders ON users.id = orders.user_id"
+
+def build(order_count, join_memory_rows=1_000_000, indexed=False):
+    executor = QueryExecutor(Database(join_memory_rows=join_memory_rows))
+    user_count = max(1, order_count // 10)
+    executor.execute("CREATE TABLE users (id INT, name TEXT)")
+    executor.execute("CREATE TABLE orders (oid INT, user_id INT, amount INT)")
+    executor.database.get_table('users').bulk_insert([[i, f'user{i}'] for i in range(user_count)])
+    executor.database.get_table('orders').bulk_insert([[i, i * 7 % user_count, i % 1000] for i in range(order_count)])
+    if indexed:
+        executor.execute("CREATE INDEX idx_users ON users (id)")
+        executor.execute("CREATE INDEX idx_orders ON orders (user_id)")
+    return executor
+
+def application_join(executor):
+    # 原来的做法：取出两张表的全部行，在应用代码中逐对比较
+    users = executor.execute("SELECT id, name FROM users").fetchall()
+    orders = executor.execute("SELECT user_id, amount FROM orders").fetchall()
+    return [[name, amount] for user_id, amount in orders for uid, name in users if uid == user_id]
+
+def timed(fn):
+    start = time.perf_counter()
+    rows = fn()
+    return time.perf_counter() - start, len(rows)
+
+def main(argv):
+    order_count = int(argv[0]) if argv else DEFAULT_ROWS
+    print(f"{'method':>14} {'rows':>9} {'seconds':>9}")
+    # 嵌套循环是平方复杂度，只在较小的数据量上与散列连接对比
+    small = build(min(order_count, 5_000))
+    for name, fn in [('nested loop', lambda: application_join(small)),
+                     ('hash join', lambda: small.execute(JOIN_SQL).fetchall())]:
+        seconds, rows = timed(fn)
+        print(f"{name:>14} {rows:>9} {seconds:>9.3f}")
+    cases = [
+        ('hash join', build(order_count)),
+        ('merge join', build(order_count, indexed=True)),
+        ('hash + spill', build(order_count, join_memory_rows=max(1, order_count // 100))),
+    ]
+    for name, executor in cases:
+        seconds, rows = timed(lambda: executor.execute(JOIN_SQL).fetchall())
+        print(f"{name:>14} {rows:>9} {seconds:>9.3f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
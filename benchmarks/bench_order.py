@@ -0,0 +1,58 @@
+# benchmarks/bench_order.py
+# 对比取出全部行在应用代码中排序分页与 ORDER BY / LIMIT（Top-N 堆、沿有序索引读取、LIMIT 提前结束）的耗时。
+# 用法: python benchmarks/bench_order.py [行数]
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.query_executor import QueryExecutor
+
+DEFAULT_ROWS = 1_000_000
+PAGE = 20
+
+def build(storage, row_count):
+    executor = QueryExecutor()
+    scores = list(range(row_count))
+    random.Random(0).shuffle(scores)
+    executor.execute(f"CREATE TABLE t (id INT, score INT, name TEXT) STORAGE {storage}")
+    executor.database.get_table('t').bulk_insert(
+        [[i, score, f'name{i}'] for i, score in enumerate(scores)])
+    executor.execute("CREATE INDEX idx_id ON t (id)")
+    return executor
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    print(f"{'storage':>9} {'query':>36} {'manual(s)':>10} {'query(s)':>9}")
+    for storage in ['ROW', 'COLUMNAR']:
+        executor = build(storage, row_count)
+        cases = [
+            (f'ORDER BY score DESC LIMIT {PAGE}',
+             lambda: sorted(executor.execute("SELECT id, score FROM t").fetchall(),
+                            key=lambda row: row[1], reverse=True)[:PAGE],
+             f"SELECT id, score FROM t ORDER BY score DESC LIMIT {PAGE}"),
+            (f'ORDER BY id DESC LIMIT {PAGE} (index)',
+             lambda: sorted(executor.execute("SELECT id, name FROM t").fetchall(), reverse=True)[:PAGE],
+             f"SELECT id, name FROM t ORDER BY id DESC LIMIT {PAGE}"),
+            (f'WHERE score < n/2 LIMIT {PAGE}',
+             lambda: executor.execute(f"SELECT id FROM t WHERE score < {row_count // 2}").fetchall()[:PAGE],
+             f"SELECT id FROM t WHERE score < {row_count // 2} LIMIT {PAGE}"),
+            ('ORDER BY score (full sort)',
+             lambda: sorted(executor.execute("SELECT id, score FROM t").fetchall(), key=lambda row: row[1]),
+             "SELECT id, score FROM t ORDER BY score"),
+        ]
+        for name, manual, sql in cases:
+            start = time.perf_counter()
+            expected = manual()
+            manual_s = time.perf_counter() - start
+            start = time.perf_counter()
+            result = executor.execute(sql).fetchall()
+            query_s = time.perf_counter() - start
+            assert len(result) == len(expected)
+            print(f"{storage:>9} {name:>36} {manual_s:>10.3f} {query_s:>9.4f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,51 @@
+# benchmarks/bench_parallel.py
+# 对比串行扫描与不同并行度下的 WHERE 过滤耗时。
+# 用法: python benchmarks/bench_parallel.py [行数] [并行度 ...]
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import Database
+
+DEFAULT_ROWS = 2_000_000
+DEFAULT_WORKERS = [2, 4, 8]
+REPEAT = 5
+QUERIES = [('id', '<', 1000), ('age', '=', 42), ('name', '=', 'name7')]
+
+def build(row_count):
+    database = Database()
+    database.create_table('t', {'id': 'INT', 'name': 'TEXT', 'age': 'INT'}, 'COLUMNAR')
+    database.get_table('t').bulk_insert([[i, f'name{i % 100}', i % 90] for i in range(row_count)])
+    return database
+
+def time_ms(table, where):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        table._matching_positions(where)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    worker_counts = [int(arg) for arg in argv[1:]] or DEFAULT_WORKERS
+    database = build(row_count)
+    table = database.get_table('t')
+    print(f"rows={row_count} cpus={os.cpu_count()}")
+    print(f"{'where':>18} {'serial(ms)':>11}" + ''.join(f" {f'x{w}(ms)':>11}" for w in worker_counts))
+    results = {where: [time_ms(table, where)] for where in QUERIES}
+    for workers in worker_counts:
+        database.set_parallelism(workers, threshold=0)
+        for where in QUERIES:
+            table._matching_positions(where)  # 预热进程池
+            results[where].append(time_ms(table, where))
+    database.close()
+    for where, timings in results.items():
+        print(f"{' '.join(map(str, where)):>18}" + ''.join(f" {ms:>11.1f}" for ms in timings))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
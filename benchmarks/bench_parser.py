@@ -0,0 +1,46 @@
+# benchmarks/bench_parser.py
+# 解析器微基准：旧的正则分派解析器与单遍词法分析 + 递归下降解析器的每秒解析语句数（不使用解析缓存）。
+# 用法: python benchmarks/bench_parser.py [每种语句的解析次数]
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from legacy_sql_parser import SQLParser as LegacySQLParser
+from src.sql_parser import SQLParser
+
+DEFAULT_REPEAT = 20_000
+STATEMENTS = [
+    "CREATE TABLE students (id INT, name TEXT, age INT)",
+    "INSERT INTO students (id, name, age) VALUES (1, 'Alice', 20)",
+    "SELECT id, name FROM students WHERE age > 20",
+    "UPDATE students SET name = 'Bob' WHERE id = 2",
+    "DELETE FROM students WHERE id = 3",
+    "DROP TABLE students",
+    "COMMIT",
+]
+
+def statements_per_sec(parser, sql, repeat):
+    parse = parser.parse
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(sql)
+    return repeat / (time.perf_counter() - start)
+
+def main(argv):
+    repeat = int(argv[0]) if argv else DEFAULT_REPEAT
+    legacy, parser = LegacySQLParser(cache_size=0), SQLParser(cache_size=0)
+    print(f"{'statement':>12} {'regex(stmt/s)':>14} {'descent(stmt/s)':>16} {'speedup':>8}")
+    for sql in STATEMENTS:
+        before = statements_per_sec(legacy, sql, repeat)
+        after = statements_per_sec(parser, sql, repeat)
+        print(f"{sql.split()[0]:>12} {before:>14.0f} {after:>16.0f} {after / before:>7.2f}x")
+    # 旧解析器不支持的语句只测新解析器
+    sql = "SELECT * FROM students WHERE (age BETWEEN 20 AND 30 OR name LIKE 'A%') AND id NOT IN (1, 2, 3)"
+    print(f"{'WHERE expr':>12} {'-':>14} {statements_per_sec(parser, sql, repeat):>16.0f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
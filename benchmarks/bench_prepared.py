@@ -0,0 +1,52 @@
+# benchmarks/bench_prepared.py
+# 对比同一形状的 INSERT / SELECT 每次重新解析、命中解析缓存与使用预编译语句的耗时。
+# 用法: python benchmarks/bench_prepared.py [语句数]
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.query_executor import QueryExecutor
+
+DEFAULT_COUNT = 20_000
+
+def run(count, mode):
+    executor = QueryExecutor()
+    if mode == 'no cache':
+        executor.parser.cache_size = 0
+    executor.execute("CREATE TABLE t (id INT, name TEXT)")
+    executor.execute("CREATE INDEX idx_id ON t (id) USING HASH")
+    start = time.perf_counter()
+    if mode == 'prepared':
+        insert = executor.prepare("INSERT INTO t (id, name) VALUES (?, ?)")
+        select = executor.prepare("SELECT name FROM t WHERE id = ?")
+        for i in range(count):
+            insert.execute((i, 'x'))
+        for i in range(count):
+            select.execute((i,))
+    elif mode == 'cached':
+        # 参数化的语句文本不变，每次执行都命中解析缓存
+        for i in range(count):
+            executor.execute("INSERT INTO t (id, name) VALUES (?, ?)", (i, 'x'))
+        for i in range(count):
+            executor.execute("SELECT name FROM t WHERE id = ?", (i,))
+    else:
+        # 常量写在语句中，每条语句都要重新解析
+        for i in range(count):
+            executor.execute(f"INSERT INTO t (id, name) VALUES ({i}, 'x')")
+        for i in range(count):
+            executor.execute(f"SELECT name FROM t WHERE id = {i}")
+    elapsed = time.perf_counter() - start
+    return elapsed * 1e6 / (2 * count), executor.parser.cache_info()
+
+def main(argv):
+    count = int(argv[0]) if argv else DEFAULT_COUNT
+    print(f"{'mode':>10} {'us/stmt':>9} {'hits':>8} {'misses':>8}")
+    for mode in ['no cache', 'cached', 'prepared']:
+        us, info = run(count, mode)
+        print(f"{mode:>10} {us:>9.2f} {info['hits']:>8} {info['misses']:>8}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
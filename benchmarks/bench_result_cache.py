@@ -0,0 +1,58 @@
+# benchmarks/bench_result_cache.py
+# 查询结果缓存：仪表盘式的重复查询在关闭与开启缓存时的单条耗时，
+# 以及每 N 条查询穿插一次写操作（写操作使缓存的结果过期）时的耗时与命中率。
+# 用法: python benchmarks/bench_result_cache.py [行数]
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import Database
+from src.query_executor import QueryExecutor
+from src.result_cache import ResultCache
+
+DEFAULT_ROWS = 100_000
+QUERIES = [
+    "SELECT region, COUNT(*), SUM(amount) FROM sales GROUP BY region",
+    "SELECT id, amount FROM sales WHERE amount > 990 ORDER BY amount DESC LIMIT 20",
+    "SELECT COUNT(*) FROM sales WHERE region = 'north' AND amount BETWEEN 100 AND 200",
+]
+ROUNDS = 50
+
+def load(row_count):
+    database = Database()
+    database.create_table('sales', {'id': 'INT', 'region': 'TEXT', 'amount': 'INT'})
+    regions = ['north', 'south', 'east', 'west']
+    database.get_table('sales').bulk_insert([(i, regions[i % 4], i * 7 % 1000) for i in range(row_count)])
+    return database
+
+def run(executor, write_every=None):
+    # 返回每条查询的平均耗时；write_every 条查询之后插入一行
+    count = 0
+    next_id = 10 ** 9
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for sql in QUERIES:
+            executor.execute(sql).fetchall()
+            count += 1
+            if write_every and count % write_every == 0:
+                executor.execute(f"INSERT INTO sales (id, region, amount) VALUES ({next_id}, 'north', 150)")
+                next_id += 1
+    return (time.perf_counter() - start) / count
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    database = load(row_count)
+    print(f"{row_count} rows, {len(QUERIES)} queries x {ROUNDS} rounds")
+    print(f"{'writes':>16} {'no cache':>12} {'cache':>12} {'hit rate':>9}")
+    for write_every in [None, 30, 3]:
+        uncached = run(QueryExecutor(database), write_every)
+        cache = ResultCache()
+        cached = run(QueryExecutor(database, result_cache=cache), write_every)
+        label = 'none' if write_every is None else f'every {write_every} queries'
+        print(f"{label:>16} {uncached * 1e3:>10.3f}ms {cached * 1e3:>10.3f}ms {cache.cache_info()['hit_rate']:>8.0%}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,49 @@
+# benchmarks/bench_row_memory.py
+# 行存储每行占用的内存：以前每行一个 list，现在每行一个 tuple。
+# 同样的数据分别以两种形式装入，用 tracemalloc 统计装载后仍占用的内存（不含共享的字符串与小整数）。
+# 用法: python benchmarks/bench_row_memory.py [行数]
+
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import Table
+
+DEFAULT_ROWS = 1_000_000
+COLUMNS = {'id': 'INT', 'name': 'TEXT', 'score': 'INT'}
+
+def retained(build):
+    # 返回 build() 的结果在装载完成后占用的字节数
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, result
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    # 值在测量前按列创建，两种形式共享同样的值对象，差别只在行容器
+    names = [f'name{i % 1000}' for i in range(1000)]
+    columns = [list(range(row_count)), [names[i % 1000] for i in range(row_count)],
+               [1000 + i % 97 for i in range(row_count)]]
+
+    # 以前 bulk_insert 把转换后的各列拼成 list 行
+    list_bytes, as_lists = retained(lambda: list(map(list, zip(*columns))))
+    del as_lists
+    table = Table('t', COLUMNS)
+    rows = list(zip(*columns))
+    tuple_bytes, _ = retained(lambda: table.bulk_insert(rows))
+    del rows
+
+    print(f"rows: {row_count}")
+    print(f"{'row representation':>20} {'MB':>10} {'bytes/row':>10}")
+    for name, used in [('list (before)', list_bytes), ('tuple (RowStorage)', tuple_bytes)]:
+        print(f"{name:>20} {used / 1e6:>10.1f} {used / row_count:>10.1f}")
+    print(f"saved: {(list_bytes - tuple_bytes) / row_count:.1f} bytes/row, "
+          f"{(list_bytes - tuple_bytes) / 1e6:.1f} MB in total")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
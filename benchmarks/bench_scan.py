@@ -0,0 +1,74 @@
+# benchmarks/bench_scan.py
+# 比较带 WHERE 的全表扫描：原先逐行调用条件判断的实现与编译后的批量求值。
+# 用法: python benchmarks/bench_scan.py [行数]
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import Table
+
+DEFAULT_ROWS = 1_000_000
+PREDICATES = [('age', '>', 50), ('id', '=', 5), ('name', '=', 'name7')]
+
+def build_table(row_count, storage):
+    table = Table('t', {'id': 'INT', 'name': 'TEXT', 'age': 'INT'}, storage=storage)
+    table.rows = [[i, f'name{i % 100}', i % 90] for i in range(row_count)]
+    return table
+
+def legacy_evaluate(left, operator, right):
+    # 原 Table._evaluate_condition：每行一次调用，逐行做类型判断并按运算符分支
+    if left is None or right is None:
+        return False
+    if isinstance(left, str) and isinstance(right, str):
+        pass
+    elif isinstance(left, int) and isinstance(right, int):
+        pass
+    else:
+        try:
+            if isinstance(left, str):
+                left = int(left)
+            if isinstance(right, str):
+                right = int(right)
+        except ValueError:
+            pass
+    if operator == '=':
+        return left == right
+    elif operator == '<':
+        return left < right
+    elif operator == '>':
+        return left > right
+    raise ValueError(f"Unsupported operator '{operator}'")
+
+def legacy_scan(rows, column_names, where):
+    # 原实现的扫描方式：逐行定位列并调用条件判断
+    where_col, operator, where_val = where
+    positions = []
+    for pos, row in enumerate(rows):
+        where_idx = column_names.index(where_col)
+        if legacy_evaluate(row[where_idx], operator, where_val):
+            positions.append(pos)
+    return positions
+
+def time_s(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    print(f"{'storage':>9} {'predicate':>22} {'matches':>8} {'row-at-a-time(s)':>17} {'batch(s)':>9} {'speedup':>8}")
+    for storage in ['ROW', 'COLUMNAR']:
+        table = build_table(row_count, storage)
+        rows = table.storage.to_rows()
+        for where in PREDICATES:
+            slow, expected = time_s(lambda: legacy_scan(rows, table.column_names, where))
+            fast, positions = time_s(lambda: table._matching_positions(where))
+            assert positions == expected
+            print(f"{storage:>9} {' '.join(map(str, where)):>22} {len(positions):>8} "
+                  f"{slow:>17.3f} {fast:>9.3f} {slow / fast:>7.1f}x")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
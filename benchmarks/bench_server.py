@@ -0,0 +1,76 @@
+# benchmarks/bench_server.py
+# 在本机启动数据库服务器，用多个客户端线程经连接池发送请求，报告 QPS 与 p50 / p99 延迟；
+# 另测流水线方式（每次往返连续发送 PIPELINE 个请求）的吞吐，其延迟为每次往返的耗时除以请求数。
+# 用法: python benchmarks/bench_server.py [客户端数] [每个客户端的请求数]
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.client import ConnectionPool
+from src.database import Database
+from src.server import DatabaseServer
+
+ROWS = 10_000
+PIPELINE = 16
+WRITE_EVERY = 10  # 每这么多个请求中有一个 UPDATE
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run(pool, clients, requests, pipelined):
+    latencies = [[] for _ in range(clients)]
+
+    def statement(i):
+        if i % WRITE_EVERY == 0:
+            return "UPDATE t SET score = ? WHERE id = ?", (i % 100, i % ROWS)
+        return "SELECT name, score FROM t WHERE id = ?", (i % ROWS,)
+
+    def client(slot):
+        samples = latencies[slot]
+        if pipelined:
+            for start in range(0, requests, PIPELINE):
+                began = time.perf_counter()
+                with pool.connection() as connection:
+                    for result in connection.pipeline([statement(i) for i in range(start, start + PIPELINE)]):
+                        result.fetchall()
+                samples.append((time.perf_counter() - began) / PIPELINE)
+            return
+        for i in range(slot, slot + requests):
+            began = time.perf_counter()
+            pool.execute(*statement(i))
+            samples.append(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=client, args=(slot,)) for slot in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    samples = [sample for client_samples in latencies for sample in client_samples]
+    return clients * requests / elapsed, percentile(samples, 0.5), percentile(samples, 0.99)
+
+def main(argv):
+    clients = int(argv[0]) if argv else 8
+    requests = int(argv[1]) if len(argv) > 1 else 2000
+    database = Database()
+    server = DatabaseServer(database, port=0)
+    server.start_background()
+    pool = ConnectionPool(port=server.port, size=clients)
+    pool.execute("CREATE TABLE t (id INT, name TEXT, score INT)")
+    database.get_table('t').bulk_insert([[i, f'name{i}', i % 100] for i in range(ROWS)])
+    pool.execute("CREATE INDEX idx_id ON t (id) USING HASH")
+    results = [(mode, run(pool, clients, requests, mode == 'pipelined')) for mode in ('request', 'pipelined')]
+    pool.close()
+    server.stop()
+    print(f"{'mode':>10} {'clients':>8} {'QPS':>9} {'p50(ms)':>9} {'p99(ms)':>9}")
+    for mode, (qps, p50, p99) in results:
+        print(f"{mode:>10} {clients:>8} {qps:>9.0f} {p50 * 1000:>9.3f} {p99 * 1000:>9.3f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
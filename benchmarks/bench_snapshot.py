@@ -0,0 +1,55 @@
+# benchmarks/bench_snapshot.py
+# 对比重放 INSERT 语句重建表与从快照载入：保存耗时、文件大小、打开耗时，以及打开后首次点查与全表聚合的耗时。
+# 用法: python benchmarks/bench_snapshot.py [行数]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.query_executor import QueryExecutor
+
+DEFAULT_ROWS = 1_000_000
+REPLAY_ROWS = 20_000  # 逐条 INSERT 太慢，只重放这么多行，再按比例折算
+
+def build(row_count):
+    executor = QueryExecutor()
+    executor.execute("CREATE TABLE t (id INT, name TEXT, score INT) STORAGE COLUMNAR")
+    executor.database.get_table('t').bulk_insert([[i, f'name{i % 1000}', i % 97] for i in range(row_count)])
+    return executor
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    executor = build(row_count)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.snap')
+        save_s, _ = timed(lambda: executor.execute(f"SAVE '{path}'"))
+
+        replay = QueryExecutor()
+        replay.execute("CREATE TABLE t (id INT, name TEXT, score INT) STORAGE COLUMNAR")
+        replay_s, _ = timed(lambda: [replay.execute(f"INSERT INTO t (id, name, score) VALUES ({i}, 'name{i % 1000}', {i % 97})")
+                                     for i in range(min(REPLAY_ROWS, row_count))])
+        replay_s *= row_count / min(REPLAY_ROWS, row_count)
+
+        loaded = QueryExecutor()
+        open_s, _ = timed(lambda: loaded.execute(f"LOAD '{path}'"))
+        table = loaded.database.get_table('t')
+        lookup_s, row = timed(lambda: table.storage.get_row(row_count // 2))
+        assert row == [row_count // 2, f'name{row_count // 2 % 1000}', row_count // 2 % 97]
+        scan_s, _ = timed(lambda: loaded.execute("SELECT SUM(score) FROM t WHERE id >= 0").fetchall())
+
+        print(f"rows: {row_count}, snapshot size: {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"{'step':>26} {'seconds':>10}")
+        for step, seconds in [('SAVE', save_s), ('replay INSERT (estimated)', replay_s), ('LOAD (open)', open_s),
+                              ('first point lookup', lookup_s), ('first full aggregate', scan_s)]:
+            print(f"{step:>26} {seconds:>10.4f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,62 @@
+# benchmarks/bench_transactions.py
+# 测量 BEGIN / COMMIT / ROLLBACK 的延迟随数据量的变化。
+# 用法: python benchmarks/bench_transactions.py [行数 ...]
+
+import copy
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import Database
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+REPEAT = 50
+
+def build_database(row_count):
+    database = Database()
+    database.create_table('t', {'id': 'INT', 'name': 'TEXT'})
+    # 直接填充行
+    table = database.get_table('t')
+    table.rows = [[i, f'name{i}'] for i in range(row_count)]
+    table.create_index('idx_id', 'id', 'HASH')
+    return database
+
+def time_us(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1e6
+
+def bench(row_count):
+    database = build_database(row_count)
+    table = database.get_table('t')
+    begin, commit, rollback = [], [], []
+    for i in range(REPEAT):
+        begin.append(time_us(database.begin_transaction))
+        table.update_rows({'name': 'x'}, ('id', '=', i))
+        commit.append(time_us(database.commit))
+        database.begin_transaction()
+        table.update_rows({'name': 'y'}, ('id', '=', i))
+        rollback.append(time_us(database.rollback))
+    # 旧实现 BEGIN 需要 deepcopy 全部表，作为对照只测一次
+    deepcopy_us = time_us(lambda: copy.deepcopy({name: table.rows for name, table in database.tables.items()}))
+    return {
+        'rows': row_count,
+        'begin_us': statistics.median(begin),
+        'commit_us': statistics.median(commit),
+        'rollback_us': statistics.median(rollback),
+        'deepcopy_us': deepcopy_us,
+    }
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or DEFAULT_SIZES
+    print(f"{'rows':>10} {'BEGIN(us)':>10} {'COMMIT(us)':>11} {'ROLLBACK(us)':>13} {'deepcopy(us)':>13}")
+    for row_count in sizes:
+        r = bench(row_count)
+        print(f"{r['rows']:>10} {r['begin_us']:>10.2f} {r['commit_us']:>11.2f} "
+              f"{r['rollback_us']:>13.2f} {r['deepcopy_us']:>13.0f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
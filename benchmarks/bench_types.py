@@ -0,0 +1,67 @@
+# benchmarks/bench_types.py
+# 列类型的影响：
+#   1. 范围查询：日期存为 TEXT（常量逐行转换比较）与存为 DATE（常量在规划时转换一次、逐行直接比较）
+#   2. 同一次扫描中逐行转换常量的比较（旧的做法，这里在本地重现）与规划时转换一次的比较（compile_predicate）
+#   3. MODIFY COLUMN：TEXT 转为 DATE 的整列转换耗时
+# 用法: python benchmarks/bench_types.py [行数]
+
+import datetime
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import Database
+from src.predicate import compile_predicate
+from src.query_executor import QueryExecutor
+
+DEFAULT_ROWS = 200_000
+START = datetime.date(2020, 1, 1)
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def coercing_scan(values, right):
+    # 逐行把字符串常量转换为整数后再比较：常量绑定到列类型之前 WHERE 与 HAVING 的做法
+    return [pos for pos, cell in enumerate(values) if cell is not None and cell > int(right)]
+
+def load(row_count, storage, day_type):
+    executor = QueryExecutor(Database())
+    executor.execute(f"CREATE TABLE events (id INT, day {day_type}) STORAGE {storage}")
+    days = [(START + datetime.timedelta(days=i % 1500)).isoformat() for i in range(row_count)]
+    executor.database.get_table('events').bulk_insert(list(zip(range(row_count), days)))
+    return executor
+
+def main(argv):
+    row_count = int(argv[0]) if argv else DEFAULT_ROWS
+    sql = "SELECT COUNT(*) FROM events WHERE day >= '2022-06-01' AND day < '2022-07-01'"
+    print(f"{row_count} rows, {sql}")
+    for storage in ['ROW', 'COLUMNAR']:
+        results = {}
+        for day_type in ['TEXT', 'DATE']:
+            executor = load(row_count, storage, day_type)
+            results[day_type] = executor.execute(sql).fetchall()
+            elapsed = best_of(lambda: executor.execute(sql).fetchall())
+            print(f"  {storage:<9} day {day_type:<5} {elapsed * 1e3:>8.2f}ms")
+        assert results['TEXT'] == results['DATE']
+
+    values = [i % 1000 for i in range(row_count)]
+    bound = compile_predicate('>', 500)
+    assert coercing_scan(values, '500') == bound(values)
+    print(f"  scan with per-row conversion {best_of(lambda: coercing_scan(values, '500')) * 1e3:>8.2f}ms")
+    print(f"  scan with bound constant     {best_of(lambda: bound(values)) * 1e3:>8.2f}ms")
+
+    for storage in ['ROW', 'COLUMNAR']:
+        executor = load(row_count, storage, 'TEXT')
+        start = time.perf_counter()
+        executor.execute("ALTER TABLE events MODIFY COLUMN day DATE")
+        print(f"  {storage:<9} MODIFY COLUMN day DATE {(time.perf_counter() - start) * 1e3:>8.2f}ms")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,58 @@
+# benchmarks/bench_wal.py
+# 测量预写日志在不同并发写入者数量下的提交吞吐，以及 group commit 合并 fsync 的效果。
+# 用法: python benchmarks/bench_wal.py [写入者数 ...]
+# 这里多个线程直接调用 WriteAheadLog.commit，不经过表锁，只测量日志本身。
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.wal import WriteAheadLog
+
+DEFAULT_WRITERS = [1, 8, 64]
+COMMITS_PER_RUN = 2000
+WINDOWS = [0, 0.001]
+
+def bench(writers, window):
+    data_dir = tempfile.mkdtemp()
+    wal = WriteAheadLog(os.path.join(data_dir, 'wal.log'), group_commit_window=window)
+    per_writer = max(1, COMMITS_PER_RUN // writers)
+    op = [('insert', 't', [1, 'name1'])]
+
+    def writer():
+        for _ in range(per_writer):
+            wal.commit(op)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    wal.close()
+    shutil.rmtree(data_dir)
+    return {
+        'writers': writers,
+        'window_ms': window * 1000,
+        'commits_per_sec': wal.commits / elapsed,
+        'fsyncs': wal.fsyncs,
+        'batch': wal.commits / wal.fsyncs,
+    }
+
+def main(argv):
+    writer_counts = [int(arg) for arg in argv] or DEFAULT_WRITERS
+    print(f"{'writers':>8} {'window(ms)':>11} {'commits/s':>11} {'fsyncs':>8} {'commits/fsync':>14}")
+    for writers in writer_counts:
+        for window in WINDOWS:
+            r = bench(writers, window)
+            print(f"{r['writers']:>8} {r['window_ms']:>11.1f} {r['commits_per_sec']:>11.0f} "
+                  f"{r['fsyncs']:>8} {r['batch']:>14.1f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
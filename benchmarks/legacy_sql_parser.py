@@ -0,0 +1,276 @@
+# benchmarks/legacy_sql_parser.py
+# 改写为递归下降解析器之前基于正则分派的 SQLParser，仅供 bench_parser.py 对比使用。
+
+import re
+from collections import OrderedDict
+
+class Placeholder:
+    # 预编译语句中的 ? 参数，执行时按出现顺序绑定
+    def __repr__(self):
+        return '?'
+
+PLACEHOLDER = Placeholder()
+
+# 所有正则只编译一次
+_STATEMENTS = [
+    (re.compile(r'^CREATE\s+TABLE', re.IGNORECASE), '_parse_create_table'),
+    (re.compile(r'^CREATE\s+INDEX', re.IGNORECASE), '_parse_create_index'),
+    (re.compile(r'^DROP\s+INDEX', re.IGNORECASE), '_parse_drop_index'),
+    (re.compile(r'^INSERT\s+INTO', re.IGNORECASE), '_parse_insert_into'),
+    (re.compile(r'^SELECT', re.IGNORECASE), '_parse_select'),
+    (re.compile(r'^ALTER\s+TABLE', re.IGNORECASE), '_parse_alter_table'),
+    (re.compile(r'^DELETE\s+FROM', re.IGNORECASE), '_parse_delete_from'),
+    (re.compile(r'^UPDATE', re.IGNORECASE), '_parse_update'),
+    (re.compile(r'^DROP\s+TABLE', re.IGNORECASE), '_parse_drop_table'),
+]
+_SIMPLE_STATEMENTS = [
+    (re.compile(r'^BEGIN\s+TRANSACTION$', re.IGNORECASE), "BEGIN TRANSACTION"),
+    (re.compile(r'^COMMIT$', re.IGNORECASE), "COMMIT"),
+    (re.compile(r'^ROLLBACK$', re.IGNORECASE), "ROLLBACK"),
+]
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(\w+)\s*\((.+)\)(?:\s+STORAGE\s*=?\s*(\w+))?$", re.IGNORECASE)
+_INSERT_INTO = re.compile(r"INSERT\s+INTO\s+(\w+)\s*\((.+?)\)\s+VALUES\s*(\(.+\))", re.IGNORECASE)
+# VALUES 中的一个元组，以及元组中以逗号分隔的值；引号内的逗号与括号不作分隔
+_VALUES_ROW = re.compile(r"\(((?:'[^']*'|[^'()])*)\)")
+_VALUES_SEPARATOR = re.compile(r"\s*,\s*")
+_VALUE_ITEM = re.compile(r"(?:'[^']*'|[^,'])+")
+_SELECT = re.compile(r"SELECT\s+(.+)\s+FROM\s+(\w+)(?:\s+WHERE\s+(.+))?", re.IGNORECASE)
+_ALTER_ADD = re.compile(r"ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+(\w+)\s+(\w+)", re.IGNORECASE)
+_ALTER_DROP = re.compile(r"ALTER\s+TABLE\s+(\w+)\s+DROP\s+COLUMN\s+(\w+)", re.IGNORECASE)
+_ALTER_MODIFY = re.compile(r"ALTER\s+TABLE\s+(\w+)\s+MODIFY\s+COLUMN\s+(\w+)\s+(\w+)", re.IGNORECASE)
+_ADD_COLUMN = re.compile(r'ADD\s+COLUMN', re.IGNORECASE)
+_DROP_COLUMN = re.compile(r'DROP\s+COLUMN', re.IGNORECASE)
+_MODIFY_COLUMN = re.compile(r'MODIFY\s+COLUMN', re.IGNORECASE)
+_DELETE_FROM = re.compile(r"DELETE\s+FROM\s+(\w+)(?:\s+WHERE\s+(.+))?", re.IGNORECASE)
+_UPDATE = re.compile(r"UPDATE\s+(\w+)\s+SET\s+(.+?)(?:\s+WHERE\s+(.+))?$", re.IGNORECASE)
+_DROP_TABLE = re.compile(r"DROP\s+TABLE\s+(\w+)", re.IGNORECASE)
+_CREATE_INDEX = re.compile(r"CREATE\s+INDEX\s+(\w+)\s+ON\s+(\w+)\s*\(\s*(\w+)\s*\)(?:\s+USING\s+(\w+))?$", re.IGNORECASE)
+_DROP_INDEX = re.compile(r"DROP\s+INDEX\s+(\w+)(?:\s+ON\s+(\w+))?$", re.IGNORECASE)
+_WHERE = re.compile(r"(\w+)\s*(=|<|>)\s*(\?|'?[\w\s]+'?)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(sql):
+    # 解析缓存的键：去掉首尾空白与结尾分号，折叠引号外的连续空白，引号内的字符串原样保留
+    sql = sql.strip().rstrip(';').strip()
+    if "'" not in sql:
+        return ' '.join(sql.split())
+    parts = sql.split("'")
+    parts[::2] = [_WHITESPACE.sub(' ', part) for part in parts[::2]]
+    return "'".join(parts)
+
+def count_parameters(node):
+    if node is PLACEHOLDER:
+        return 1
+    if isinstance(node, dict):
+        return sum(count_parameters(value) for value in node.values())
+    if isinstance(node, (list, tuple)):
+        return sum(count_parameters(value) for value in node)
+    return 0
+
+def bind_parameters(parsed, params):
+    # 按 ? 在语句中出现的顺序代入参数，返回新的解析结果，缓存中的结果保持不变
+    expected = parsed.get('param_count')
+    if expected is None:
+        expected = count_parameters(parsed)
+    if len(params) != expected:
+        raise ValueError(f"Statement expects {expected} parameter(s), got {len(params)}.")
+    if not expected:
+        return parsed
+    return _substitute(parsed, iter(params))
+
+def _substitute(node, params):
+    if node is PLACEHOLDER:
+        return next(params)
+    if isinstance(node, dict):
+        return {key: _substitute(value, params) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_substitute(value, params) for value in node]
+    if isinstance(node, tuple):
+        return tuple(_substitute(value, params) for value in node)
+    return node
+
+def _parse_value(text):
+    # 未加引号的 ? 是参数占位符，'?' 是普通字符串
+    text = text.strip()
+    if text == '?':
+        return PLACEHOLDER
+    return text.strip("'")
+
+def _split_rows(text):
+    # "(1, 'a'), (2, 'b')" -> [['1', "'a'"], ['2', "'b'"]]
+    rows = []
+    pos = 0
+    for match in _VALUES_ROW.finditer(text):
+        separator = text[pos:match.start()]
+        if (rows and not _VALUES_SEPARATOR.fullmatch(separator)) or (not rows and separator.strip()):
+            raise ValueError("INSERT INTO syntax error.")
+        inner = match.group(1)
+        rows.append(_VALUE_ITEM.findall(inner) if "'" in inner else inner.split(','))
+        pos = match.end()
+    if not rows or text[pos:].strip():
+        raise ValueError("INSERT INTO syntax error.")
+    return rows
+
+class SQLParser:
+    def __init__(self, cache_size=256):
+        # 解析结果的 LRU 缓存，键为规范化后的 SQL；缓存的结果是只读的
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def parse(self, sql):
+        key = normalize_sql(sql)
+        parsed = self.cache.get(key)
+        if parsed is not None:
+            self.cache_hits += 1
+            self.cache.move_to_end(key)
+            return parsed
+        self.cache_misses += 1
+        parsed = self._parse(key)
+        # 参数个数只在解析时统计一次；语句中没有 ? 时不必遍历
+        parsed['param_count'] = count_parameters(parsed) if '?' in key else 0
+        if self.cache_size > 0:
+            self.cache[key] = parsed
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return parsed
+
+    def cache_info(self):
+        return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                'size': len(self.cache), 'capacity': self.cache_size}
+
+    def _parse(self, sql):
+        # 使用正则表达式时忽略大小写
+        for pattern, method in _STATEMENTS:
+            if pattern.match(sql):
+                return getattr(self, method)(sql)
+        for pattern, action in _SIMPLE_STATEMENTS:
+            if pattern.match(sql):
+                return {"action": action}
+        raise ValueError(f"Unable to parse SQL statement: {sql}")
+
+    def _parse_create_table(self, sql):
+        match = _CREATE_TABLE.match(sql)
+        if not match:
+            raise ValueError("CREATE TABLE syntax error.")
+        table_name = match.group(1)
+        columns_str = match.group(2)
+        storage = match.group(3).upper() if match.group(3) else None
+        columns = {}
+        for col_def in columns_str.split(','):
+            parts = col_def.strip().split()
+            if len(parts) != 2:
+                raise ValueError(f"Invalid column definition: {col_def}")
+            col_name, col_type = parts
+            columns[col_name] = col_type
+        return {"action": "CREATE TABLE", "table_name": table_name, "columns": columns, "storage": storage}
+
+    def _parse_insert_into(self, sql):
+        match = _INSERT_INTO.match(sql)
+        if not match:
+            raise ValueError("INSERT INTO syntax error.")
+        table_name = match.group(1)
+        columns = [col.strip() for col in match.group(2).split(',')]
+        rows = [[_parse_value(val) for val in values] for values in _split_rows(match.group(3))]
+        return {"action": "INSERT INTO", "table_name": table_name, "columns": columns, "rows": rows}
+
+    def _parse_select(self, sql):
+        match = _SELECT.match(sql)
+        if not match:
+            raise ValueError("SELECT syntax error.")
+        columns = [col.strip() for col in match.group(1).split(',')]
+        table_name = match.group(2)
+        where_clause = match.group(3)
+        where = None
+        if where_clause:
+            where = self._parse_where(where_clause)
+        return {"action": "SELECT", "columns": columns, "table_name": table_name, "where": where}
+
+    def _parse_alter_table(self, sql):
+        if _ADD_COLUMN.search(sql):
+            match = _ALTER_ADD.match(sql)
+            if not match:
+                raise ValueError("ALTER TABLE ADD COLUMN syntax error.")
+            table_name, column_name, column_type = match.groups()
+            return {"action": "ALTER TABLE", "operation": "ADD COLUMN", "table_name": table_name, "column_name": column_name, "column_type": column_type}
+        elif _DROP_COLUMN.search(sql):
+            match = _ALTER_DROP.match(sql)
+            if not match:
+                raise ValueError("ALTER TABLE DROP COLUMN syntax error.")
+            table_name, column_name = match.groups()
+            return {"action": "ALTER TABLE", "operation": "DROP COLUMN", "table_name": table_name, "column_name": column_name}
+        elif _MODIFY_COLUMN.search(sql):
+            match = _ALTER_MODIFY.match(sql)
+            if not match:
+                raise ValueError("ALTER TABLE MODIFY COLUMN syntax error.")
+            table_name, column_name, column_type = match.groups()
+            return {"action": "ALTER TABLE", "operation": "MODIFY COLUMN", "table_name": table_name, "column_name": column_name, "column_type": column_type}
+        else:
+            raise ValueError("Unsupported ALTER TABLE operation.")
+
+    def _parse_delete_from(self, sql):
+        match = _DELETE_FROM.match(sql)
+        if not match:
+            raise ValueError("DELETE FROM syntax error.")
+        table_name = match.group(1)
+        where_clause = match.group(2)
+        where = None
+        if where_clause:
+            where = self._parse_where(where_clause)
+        return {"action": "DELETE FROM", "table_name": table_name, "where": where}
+
+    def _parse_update(self, sql):
+        match = _UPDATE.match(sql)
+        if not match:
+            raise ValueError("UPDATE syntax error.")
+        table_name = match.group(1)
+        set_clause = match.group(2)
+        where_clause = match.group(3)
+        set_values = {}
+        for assignment in set_clause.split(','):
+            parts = assignment.strip().split('=')
+            if len(parts) != 2:
+                raise ValueError(f"Invalid SET assignment: {assignment}")
+            col, val = parts
+            set_values[col.strip()] = _parse_value(val)
+        where = None
+        if where_clause:
+            where = self._parse_where(where_clause)
+        return {"action": "UPDATE", "table_name": table_name, "set_values": set_values, "where": where}
+
+    def _parse_drop_table(self, sql):
+        match = _DROP_TABLE.match(sql)
+        if not match:
+            raise ValueError("DROP TABLE syntax error.")
+        table_name = match.group(1)
+        return {"action": "DROP TABLE", "table_name": table_name}
+
+    def _parse_create_index(self, sql):
+        match = _CREATE_INDEX.match(sql)
+        if not match:
+            raise ValueError("CREATE INDEX syntax error.")
+        index_name, table_name, column_name, index_type = match.groups()
+        return {"action": "CREATE INDEX", "index_name": index_name, "table_name": table_name,
+                "column_name": column_name, "index_type": (index_type or 'SORTED').upper()}
+
+    def _parse_drop_index(self, sql):
+        match = _DROP_INDEX.match(sql)
+        if not match:
+            raise ValueError("DROP INDEX syntax error.")
+        index_name, table_name = match.groups()
+        return {"action": "DROP INDEX", "index_name": index_name, "table_name": table_name}
+
+    def _parse_where(self, clause):
+        # 简单的WHERE子句解析器，支持 "column operator value"，value 可以是 ? 参数
+        match = _WHERE.match(clause)
+        if not match:
+            raise ValueError("WHERE clause syntax error.")
+        column, operator, value = match.groups()
+        if value == '?':
+            return (column, operator, PLACEHOLDER)
+        value = value.strip("'")  # 去除引号
+        # 尝试转换为整数
+        if value.isdigit():
+            value = int(value)
+        return (column, operator, value)
@@ -0,0 +1,248 @@
+# benchmarks/suite.py
+# SQL 引擎的基准测试套件：解析吞吐、逐条与批量 INSERT、有无索引的点查与范围查询、带 WHERE 的 UPDATE / DELETE、
+# 大表上的 BEGIN / ROLLBACK。每种表规模各跑一遍，结果写成 JSON，并与保存的基线比较。
+# 用法: python benchmarks/suite.py [--sizes 1000,100000] [--storage ROW] [--repeat 5] [--cases select,update]
+#                                 [--output results.json] [--baseline benchmarks/baseline.json]
+#                                 [--threshold 0.25] [--save-baseline]
+# 有用例比基线慢超过 threshold 时退出码为 1。基线与机器有关，应在同一台机器上先用 --save-baseline 生成。
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.query_executor import QueryExecutor
+from src.sql_parser import SQLParser
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+RANGE_WIDTH = 100  # 范围查询与 UPDATE / DELETE 每条语句覆盖的行数
+PARSE_STATEMENTS = [
+    "INSERT INTO t (id, name, score) VALUES ({i}, 'name{i}', {i})",
+    "SELECT id, name FROM t WHERE score > {i} AND name = 'x'",
+    "UPDATE t SET name = 'y' WHERE id = {i}",
+    "DELETE FROM t WHERE id BETWEEN {i} AND 100",
+    "SELECT name, COUNT(*) FROM t WHERE id < {i} GROUP BY name ORDER BY name LIMIT 10",
+]
+
+class Fixture:
+    # 一种表规模下所有用例共用的数据库：t 没有索引，u 在 id 上有有序索引，两张表内容相同
+    def __init__(self, rows, storage):
+        self.rows = rows
+        self.storage = storage
+        self.executor = QueryExecutor()
+        for name in ('t', 'u'):
+            self.executor.execute(f"CREATE TABLE {name} (id INT, name TEXT, score INT) STORAGE {storage}")
+            self.executor.database.get_table(name).bulk_insert([[i, f'name{i % 1000}', i % 97] for i in range(rows)])
+        self.executor.execute("CREATE INDEX idx_u_id ON u (id)")
+        self.next_id = rows  # 逐条 INSERT 使用的下一个 id
+
+def keys(rows, count):
+    # 均匀分布在表中的 count 个键
+    step = max(1, rows // count)
+    return [(i * step) % max(1, rows - RANGE_WIDTH) for i in range(count)]
+
+def scaled_ops(rows, per_million):
+    # 每次测量的操作数：表越大单次操作越慢，操作数相应减少，保证每个用例在各个规模下耗时相近
+    return max(1, min(1000, per_million * 1_000_000 // max(rows, 1)))
+
+# ---- 用例：每个函数执行一轮，返回操作数；计时由 measure 完成 ----
+
+def case_parse(fixture):
+    # 不使用解析缓存，每条语句的常量都不同
+    parser = SQLParser(cache_size=0)
+    count = 2000
+    for i in range(count):
+        parser.parse(PARSE_STATEMENTS[i % len(PARSE_STATEMENTS)].format(i=i))
+    return count
+
+def case_insert_single(fixture):
+    # 逐条 INSERT（每条都要解析）追加到带索引的表末尾
+    start = fixture.next_id
+    count = 500
+    for i in range(start, start + count):
+        fixture.executor.execute(f"INSERT INTO u (id, name, score) VALUES ({i}, 'new', 0)")
+    fixture.next_id += count
+    return count
+
+def case_insert_bulk(fixture):
+    # executemany 装载一张与表同样大小的带索引的新表，装载后删除
+    executor = fixture.executor
+    executor.execute(f"CREATE TABLE bulk (id INT, name TEXT, score INT) STORAGE {fixture.storage}")
+    executor.execute("CREATE INDEX idx_bulk_id ON bulk (id)")
+    executor.executemany("INSERT INTO bulk (id, name, score) VALUES (?, ?, ?)",
+                         [(i, f'name{i % 1000}', i % 97) for i in range(fixture.rows)])
+    executor.execute("DROP TABLE bulk")
+    return fixture.rows
+
+# 查询用例的语句与计划中预期的访问路径。测量前用 EXPLAIN 检查，规划器选择了其他路径时报错，
+# 避免用例名与实际测量的内容不符（如 select_range_index 实际是全表扫描）
+QUERY_PLANS = {
+    'select_point_scan': ("SELECT name FROM t WHERE id = ?", 'Full Scan'),
+    'select_point_index': ("SELECT name FROM u WHERE id = ?", 'Index Scan'),
+    'select_range_scan': ("SELECT id, name FROM t WHERE id >= ? AND id < ?", 'Full Scan'),
+    'select_range_index': ("SELECT id, name FROM u WHERE id >= ? AND id < ?", 'Index Scan'),
+}
+
+def _params(param_count, key):
+    return (key,) if param_count == 1 else (key, key + RANGE_WIDTH)
+
+def check_plan(fixture, name):
+    sql, access = QUERY_PLANS[name]
+    key = keys(fixture.rows, 2)[-1]
+    plan = [line for line, in fixture.executor.execute('EXPLAIN ' + sql, _params(sql.count('?'), key))]
+    if not plan[1].startswith(access):
+        raise AssertionError(f"Case '{name}' expects '{access}' but the plan is: {plan[1]}")
+
+def _queries(fixture, name, per_million):
+    statement = fixture.executor.prepare(QUERY_PLANS[name][0])
+    ops = keys(fixture.rows, scaled_ops(fixture.rows, per_million))
+    for key in ops:
+        statement.execute(_params(statement.param_count, key)).fetchall()
+    return len(ops)
+
+def case_select_point_scan(fixture):
+    return _queries(fixture, 'select_point_scan', 20)
+
+def case_select_point_index(fixture):
+    return _queries(fixture, 'select_point_index', 100_000)
+
+def case_select_range_scan(fixture):
+    return _queries(fixture, 'select_range_scan', 20)
+
+def case_select_range_index(fixture):
+    return _queries(fixture, 'select_range_index', 100_000)
+
+def case_update_where(fixture):
+    return _queries(fixture, "UPDATE u SET score = 0 WHERE id >= ? AND id < ?", 1000)
+
+def case_begin_rollback(fixture):
+    # 大表上的一个短事务：BEGIN、修改一行、ROLLBACK
+    executor = fixture.executor
+    ops = keys(fixture.rows, 200)
+    for key in ops:
+        executor.execute("BEGIN TRANSACTION")
+        executor.execute("UPDATE u SET name = 'x' WHERE id = ?", (key,))
+        executor.execute("ROLLBACK")
+    return len(ops)
+
+def case_delete_where(fixture):
+    # 删除会移动行位置并重建索引；每轮删除的行很少，对后续轮次的影响可以忽略
+    ops = keys(fixture.rows, scaled_ops(fixture.rows, 50))
+    statement = fixture.executor.prepare("DELETE FROM t WHERE id >= ? AND id < ?")
+    for key in ops:
+        statement.execute((key, key + 1))
+    return len(ops)
+
+# 按顺序执行：修改数据的用例放在只读用例之后
+CASES = [
+    ('parse', case_parse),
+    ('insert_single', case_insert_single),
+    ('insert_bulk', case_insert_bulk),
+    ('select_point_scan', case_select_point_scan),
+    ('select_point_index', case_select_point_index),
+    ('select_range_scan', case_select_range_scan),
+    ('select_range_index', case_select_range_index),
+    ('update_where', case_update_where),
+    ('begin_rollback', case_begin_rollback),
+    ('delete_where', case_delete_where),
+]
+
+def measure(fn, fixture, repeat):
+    # 返回 (每轮的操作数, 每个操作耗时的中位数)
+    timings = []
+    ops = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        ops = fn(fixture)
+        timings.append((time.perf_counter() - start) / ops)
+    return ops, statistics.median(timings)
+
+def run(sizes, storage, repeat, selected=None):
+    results = []
+    for rows in sizes:
+        fixture = Fixture(rows, storage)
+        for name, fn in CASES:
+            if selected and not any(name.startswith(prefix) for prefix in selected):
+                continue
+            if name == 'parse' and rows != sizes[0]:
+                continue  # 解析与表大小无关，只测一次
+            if name in QUERY_PLANS:
+                check_plan(fixture, name)
+            ops, seconds = measure(fn, fixture, repeat)
+            result = {'case': name, 'rows': 0 if name == 'parse' else rows, 'storage': storage,
+                      'ops': ops, 'seconds_per_op': seconds, 'ops_per_second': 1 / seconds}
+            results.append(result)
+            print(f"{name:>20} {result['rows']:>10} {seconds * 1e6:>14.2f} {1 / seconds:>14.0f}", flush=True)
+        del fixture
+    return results
+
+def compare(results, baseline):
+    # 返回 [(结果, 基线耗时, 变化比例)]，变化比例 = 当前耗时 / 基线耗时 - 1；基线中没有的用例不比较
+    reference = {(item['case'], item['rows'], item['storage']): item['seconds_per_op'] for item in baseline['results']}
+    changes = []
+    for result in results:
+        before = reference.get((result['case'], result['rows'], result['storage']))
+        if before:
+            changes.append((result, before, result['seconds_per_op'] / before - 1))
+    return changes
+
+def report(changes, threshold):
+    print(f"\n{'case':>20} {'rows':>10} {'baseline(us)':>14} {'current(us)':>14} {'change':>8}")
+    regressions = 0
+    for result, before, change in changes:
+        regressed = change > threshold
+        regressions += regressed
+        print(f"{result['case']:>20} {result['rows']:>10} {before * 1e6:>14.2f} {result['seconds_per_op'] * 1e6:>14.2f} "
+              f"{change:>+7.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the SQL engine and compare against a baseline.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="表的行数，逗号分隔（1000 到 10000000）")
+    parser.add_argument('--storage', default='ROW', choices=['ROW', 'COLUMNAR'])
+    parser.add_argument('--repeat', type=int, default=5, help="每个用例测量的轮数，取中位数")
+    parser.add_argument('--cases', help="只运行名字以这些前缀开头的用例，逗号分隔")
+    parser.add_argument('--output', help="结果写入的 JSON 文件")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25, help="比基线慢超过这个比例视为退化")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    selected = args.cases.split(',') if args.cases else None
+    print(f"{'case':>20} {'rows':>10} {'us/op':>14} {'ops/s':>14}")
+    results = run(sizes, args.storage, args.repeat, selected)
+    document = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeat': args.repeat},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = report(compare(results, baseline), args.threshold)
+    if regressions:
+        print(f"\n{regressions} case(s) are more than {args.threshold:.0%} slower than the baseline.")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
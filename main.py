@@ -1,21 +1,46 @@
 ﻿# main.py
 
+import sys
+
+from src.database import Database
+from src.instrumentation import Instrumentation
 from src.query_executor import QueryExecutor
 
+def print_cursor(cursor):
+    # 逐行输出，不需要先取出全部结果
+    print("\t".join(cursor.columns))
+    for row in cursor:
+        print("\t".join(map(str, row)))
+
+def print_result(result):
+    # 查询输出结果行，其他语句输出状态说明
+    if result.columns is not None:
+        print_cursor(result)
+    elif result.message:
+        print(result.message)
+
 def main():
-    executor = QueryExecutor()
+    # 可选参数为数据目录，指定后数据持久化到磁盘
+    # 交互使用时开启语句计量，可以用 SHOW STATS 与 SHOW SLOW QUERIES 查看
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    executor = QueryExecutor(Database(data_dir), Instrumentation())
     print("Welcome to the DBMS Prototype System. Type 'exit' or 'quit' to exit.")
-    while True:
-        try:
-            sql = input("dbms> ")
-            if sql.strip().lower() in ['exit', 'quit']:
-                print("Exiting the system.")
+    try:
+        while True:
+            try:
+                sql = input("dbms> ")
+                if sql.strip().lower() in ['exit', 'quit']:
+                    print("Exiting the system.")
+                    break
+                if not sql.strip():
+                    continue  # 忽略空输入
+                print_result(executor.execute(sql))
+            except EOFError:
                 break
-            if not sql.strip():
-                continue  # 忽略空输入
-            executor.execute(sql)
-        except Exception as e:
-            print(f"Error: {e}")
+            except Exception as e:
+                print(f"Error: {e}")
+    finally:
+        executor.database.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,266 @@
+# src/aggregate.py
+
+from itertools import islice
+
+from src import datatypes
+from src.predicate import compile_in, compile_like, compile_predicate, intersect_positions, union_positions
+from src.sql_ast import Aggregate, And, Between, Comparison, In, Like, Not, Or, bind_literals, columns_of, negate
+
+# 各聚合函数的累加器：每次 add_many 合并一批值（sum / min / max 在 C 层完成），最后 result。
+# NULL 不参与计算，没有非 NULL 值时 SUM / MIN / MAX / AVG 为 NULL
+
+def _non_null(values):
+    return [value for value in values if value is not None] if None in values else values
+
+class _Count:
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def add_many(self, values):
+        self.count += len(values) - values.count(None)
+
+    def result(self):
+        return self.count
+
+class _Sum:
+    __slots__ = ('total',)
+
+    def __init__(self):
+        self.total = None
+
+    def add_many(self, values):
+        values = _non_null(values)
+        if values:
+            self.total = sum(values, 0 if self.total is None else self.total)
+
+    def result(self):
+        return self.total
+
+class _Min:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = None
+
+    def add_many(self, values):
+        values = _non_null(values)
+        if values:
+            low = min(values)
+            if self.value is None or low < self.value:
+                self.value = low
+
+    def result(self):
+        return self.value
+
+class _Max(_Min):
+    __slots__ = ()
+
+    def add_many(self, values):
+        values = _non_null(values)
+        if values:
+            high = max(values)
+            if self.value is None or high > self.value:
+                self.value = high
+
+class _Avg:
+    __slots__ = ('total', 'count')
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add_many(self, values):
+        values = _non_null(values)
+        self.total = sum(values, self.total)
+        self.count += len(values)
+
+    def result(self):
+        return self.total / self.count if self.count else None
+
+class _CountRows(_Count):
+    # COUNT(*)：只需要每批的行数
+    __slots__ = ()
+
+    def add_many(self, values):
+        self.count += len(values)
+
+ACCUMULATORS = {'COUNT': _Count, 'SUM': _Sum, 'MIN': _Min, 'MAX': _Max, 'AVG': _Avg}
+# 聚合输入每批的行数：批越大，每个分组每批的合并开销分摊到的行越多
+AGGREGATE_BATCH = 16384
+
+def aggregate_values(function, values):
+    # 对一整列求聚合值，sum / min / max 在 C 层完成；values 为 list 或 array
+    if None in values:
+        values = [value for value in values if value is not None]
+    if function == 'COUNT':
+        return len(values)
+    if not values:
+        return None
+    if function == 'SUM':
+        return sum(values)
+    if function == 'MIN':
+        return min(values)
+    if function == 'MAX':
+        return max(values)
+    return sum(values) / len(values)
+
+def row_batches(rows, width):
+    # 把行流转置为 (行数, [各列的值]) 批，供按列输入的算子消费（如连接的输出）
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, AGGREGATE_BATCH))
+        if not batch:
+            return
+        yield len(batch), [list(column) for column in zip(*batch)] if width else []
+
+class HashAggregate:
+    # 流式散列聚合：输入为 (行数, [各列的值]) 批，每个分组只保存一组累加器，内存占用与分组数和批大小成正比。
+    # 批内先按分组键收集位置，再把各组的值整批合并进累加器。
+    # 前 group_count 列为分组列；aggregates 为 [(函数名, 输入列下标)]，COUNT(*) 的下标为 None。
+    # 输出行为 分组列的值 + 各聚合值，分组按首次出现的顺序输出；没有分组列时即使输入为空也输出一行。
+    def __init__(self, batches, group_count, aggregates):
+        self.batches = batches
+        self.group_count = group_count
+        self.aggregates = aggregates
+
+    def __iter__(self):
+        groups = {}
+        factories = [_CountRows if idx is None else ACCUMULATORS[function] for function, idx in self.aggregates]
+        indices = [idx for _, idx in self.aggregates]
+        group_count = self.group_count
+        for count, columns in self.batches:
+            if not count:
+                continue
+            if not group_count:
+                buckets = {(): None}
+            else:
+                # 只有一个分组列时分组键是值本身
+                keys = columns[0] if group_count == 1 else zip(*columns[:group_count])
+                buckets = {}
+                for pos, key in enumerate(keys):
+                    bucket = buckets.get(key)
+                    if bucket is None:
+                        buckets[key] = [pos]
+                    else:
+                        bucket.append(pos)
+            for key, positions in buckets.items():
+                accumulators = groups.get(key)
+                if accumulators is None:
+                    accumulators = groups[key] = [factory() for factory in factories]
+                for accumulator, idx in zip(accumulators, indices):
+                    if idx is None:
+                        accumulator.add_many(range(count) if positions is None else positions)
+                    elif positions is None:
+                        accumulator.add_many(columns[idx])
+                    else:
+                        accumulator.add_many(list(map(columns[idx].__getitem__, positions)))
+        if not group_count and not groups:
+            groups[()] = [factory() for factory in factories]
+        single = group_count == 1
+        for key, accumulators in groups.items():
+            yield ([key] if single else list(key)) + [accumulator.result() for accumulator in accumulators]
+
+class AggregateQuery:
+    # SELECT 列表含聚合函数或带 GROUP BY 的查询。
+    # 输入只读取分组列与聚合函数用到的列（input_columns）；聚合结果按 HAVING 过滤后投影为 SELECT 列表。
+    def __init__(self, columns, group_by=(), having=None):
+        if columns == ["*"]:
+            raise ValueError("SELECT * cannot be combined with aggregate functions or GROUP BY.")
+        self.columns = columns
+        self.group_by = list(group_by)
+        self.having = having
+        self.aggregates = []
+        for item in list(columns) + ([] if having is None else sorted(columns_of(having), key=str)):
+            if isinstance(item, Aggregate):
+                if item not in self.aggregates:
+                    self.aggregates.append(item)
+            elif item not in self.group_by:
+                raise ValueError(f"Column '{item}' must appear in GROUP BY or be used in an aggregate function.")
+        self.input_columns = list(self.group_by)
+        for aggregate in self.aggregates:
+            if aggregate.column is not None and aggregate.column not in self.input_columns:
+                self.input_columns.append(aggregate.column)
+        self.column_names = [str(item) for item in columns]
+
+    def bind(self, column_type):
+        # HAVING 中的常量按所比较的分组列或聚合结果的类型转换一次，之后对聚合结果直接比较。
+        # column_type(列名) 返回输入列的 ColumnType
+        if self.having is None:
+            return
+
+        def literal(key, value):
+            if value is None:
+                return None
+            try:
+                return _result_type(key, column_type).literal(value)
+            except (ValueError, TypeError, OverflowError):
+                raise ValueError(f"Invalid value for column '{key}': {value}")
+        self.having = bind_literals(self.having, literal)
+
+    def execute(self, batches):
+        # batches 为按 input_columns 排列的 (行数, [各列的值]) 批；返回 (列名, 结果行)
+        aggregates = [(aggregate.function, None if aggregate.column is None
+                       else self.input_columns.index(aggregate.column)) for aggregate in self.aggregates]
+        operator = HashAggregate(batches, len(self.group_by), aggregates)
+        try:
+            results = list(operator)
+        except TypeError:
+            raise ValueError(f"Aggregate functions {', '.join(map(str, self.aggregates))} "
+                             f"cannot be applied to these column types.")
+        return self._finish(results)
+
+    def execute_ungrouped(self, values):
+        # values 为各聚合函数的结果（由 Table.aggregate 直接从存储或元数据求得）
+        return self._finish([list(values)])
+
+    def _finish(self, results):
+        layout = {column: i for i, column in enumerate(self.group_by)}
+        for i, aggregate in enumerate(self.aggregates):
+            layout[aggregate] = len(self.group_by) + i
+        if self.having is not None:
+            positions = _filter_positions(self.having, lambda key: [row[layout[key]] for row in results])
+            results = [results[pos] for pos in positions]
+        indices = [layout[item] for item in self.columns]
+        return self.column_names, [[row[idx] for idx in indices] for row in results]
+
+    def describe(self):
+        aggregates = ', '.join(map(str, self.aggregates)) or 'none'
+        if self.group_by:
+            return f"Hash Aggregate: {aggregates} (group by: {', '.join(self.group_by)})"
+        return f"Aggregate: {aggregates}"
+
+def _result_type(key, column_type):
+    # 分组列与 MIN / MAX 为输入列的类型，COUNT、SUM、AVG 的结果为数值
+    if not isinstance(key, Aggregate):
+        return column_type(key)
+    if key.function in ('MIN', 'MAX'):
+        return column_type(key.column)
+    if key.function == 'AVG':
+        return datatypes.FLOAT
+    if key.function == 'SUM' and column_type(key.column) is datatypes.FLOAT:
+        return datatypes.FLOAT
+    return datatypes.INT
+
+def _filter_positions(expr, column):
+    # 对聚合结果求 HAVING 条件；column(键) 返回该列在各结果行上的值。常量已由 AggregateQuery.bind 按类型转换
+    kind = type(expr)
+    if kind is And:
+        return intersect_positions([_filter_positions(item, column) for item in expr.items])
+    if kind is Or:
+        return union_positions([_filter_positions(item, column) for item in expr.items])
+    if kind is Not:
+        return _filter_positions(negate(expr.item), column)
+    if kind is Between:
+        low = Comparison(expr.column, '<' if expr.negated else '>=', expr.low)
+        high = Comparison(expr.column, '>' if expr.negated else '<=', expr.high)
+        return _filter_positions((Or if expr.negated else And)((low, high)), column)
+    values = column(expr[0])
+    if kind is In:
+        return compile_in(expr.values, expr.negated)(values)
+    if kind is Like:
+        return compile_like(expr.pattern, expr.negated)(values)
+    if expr[2] is None:
+        return []
+    return compile_predicate(expr[1], expr[2])(values)
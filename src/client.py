@@ -0,0 +1,191 @@
+# src/client.py
+
+import contextlib
+import queue
+import socket
+import threading
+from collections import deque
+
+from src.protocol import DEFAULT_PORT, encode_frame, recv_frame
+
+class Result:
+    # 一个请求的结果：行按批从连接上读取，迭代时才接收后续的批
+    def __init__(self, connection, request_id):
+        self.connection = connection
+        self.id = request_id
+        self.columns = None
+        self.batches = deque()
+        self.done = False
+        self.error = None
+        self.rowcount = -1
+        self.message = None  # 非查询语句的状态说明
+
+    def wait(self):
+        # 等到第一帧到达；语句出错时抛出 ValueError
+        while self.columns is None and not self.done:
+            self.connection._receive()
+        self._check()
+        return self
+
+    def _check(self):
+        if self.error is not None:
+            raise ValueError(self.error)
+
+    def __iter__(self):
+        while True:
+            while self.batches:
+                yield from self.batches.popleft()
+            self._check()
+            if self.done:
+                return
+            self.connection._receive()
+
+    def fetchall(self):
+        return list(self)
+
+class Connection:
+    # 一个到服务器的 TCP 连接，对应服务器上的一个会话（事务状态属于连接）。
+    # 请求可以连续发送（pipeline），响应按发送顺序到达，依次交给尚未接收完的结果
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        self.next_id = 0
+        self.pending = deque()
+        self.in_transaction = False  # 服务器在最近一个完成的请求之后报告的事务状态
+
+    def send(self, sql, params=()):
+        # 发送请求但不等待响应，返回 Result
+        return self._send([(sql, params)])[0]
+
+    def execute(self, sql, params=()):
+        return self.send(sql, params).wait()
+
+    def pipeline(self, statements):
+        # statements 为 [sql 或 (sql, params)]，一次写出所有请求，返回各自的 Result
+        return self._send([(item, ()) if isinstance(item, str) else item for item in statements])
+
+    def _send(self, statements):
+        results = []
+        frames = []
+        for sql, params in statements:
+            self.next_id += 1
+            frames.append(encode_frame({'id': self.next_id, 'sql': sql, 'params': list(params)}))
+            results.append(Result(self, self.next_id))
+        self.pending.extend(results)
+        self.sock.sendall(b''.join(frames))
+        return results
+
+    def _receive(self):
+        # 读取一帧，交给最早的未接收完的结果
+        message = recv_frame(self.stream)
+        result = self.pending[0]
+        if message.get('id') != result.id:
+            raise ConnectionError(f"Unexpected response {message.get('id')} for request {result.id}.")
+        if 'transaction' in message:
+            self.in_transaction = message['transaction']
+        if 'error' in message:
+            result.error = message['error']
+            result.done = True
+        else:
+            if 'columns' in message:
+                result.columns = message['columns']
+            if message['rows']:
+                result.batches.append(message['rows'])
+            if message['done']:
+                result.done = True
+                result.rowcount = message.get('rowcount', -1)
+                result.message = message.get('message')
+        if result.done:
+            self.pending.popleft()
+
+    def drain(self):
+        # 接收完所有已发送请求的响应（未读的行缓存在各自的 Result 中）
+        while self.pending:
+            self._receive()
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class ConnectionPool:
+    # 线程安全的连接池：最多 size 个连接，按需建立，用完放回复用。
+    # 连接在放回之前接收完它的所有响应，并回滚借用者没有结束的事务（下一个借用者不会继承它未提交的修改与锁）；
+    # 出过网络错误或无法回滚的连接直接关闭
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, size=8, timeout=None):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self):
+        connection = self._acquire()
+        try:
+            yield connection
+        except (OSError, ConnectionError):
+            self._discard(connection)
+            raise
+        except BaseException:
+            with contextlib.suppress(OSError, ConnectionError, ValueError):
+                self._release(connection)
+            raise
+        else:
+            self._release(connection)
+
+    def _release(self, connection):
+        try:
+            connection.drain()
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+        except (OSError, ConnectionError, ValueError):
+            self._discard(connection)
+            raise
+        self.idle.put(connection)
+
+    def _discard(self, connection):
+        connection.close()
+        with self.lock:
+            self.created -= 1
+
+    def execute(self, sql, params=()):
+        # 取出全部结果，返回 (列名, 行)；非查询语句的列名为 None
+        with self.connection() as connection:
+            result = connection.execute(sql, params)
+            return result.columns, result.fetchall()
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            create = self.created < self.size
+            if create:
+                self.created += 1
+        if create:
+            try:
+                return Connection(self.host, self.port, self.timeout)
+            except BaseException:
+                with self.lock:
+                    self.created -= 1
+                raise
+        return self.idle.get(timeout=self.timeout)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self.lock:
+                self.created -= 1
@@ -0,0 +1,62 @@
+# src/cursor.py
+
+from itertools import islice
+
+class Cursor:
+    # 语句的执行结果。SELECT 按需从行生成器中取行，不预先物化整个结果集；
+    # 其他语句没有列（columns 为 None），rowcount 为影响的行数（不适用时为 -1），message 为状态说明。
+    # SELECT 的 rowcount 在取完所有行之后才等于结果的行数，之前为 -1。
+    # elapsed 为执行语句所用的秒数（SELECT 不含取行的时间，行是在取用时才生成的）
+    def __init__(self, columns, rows=(), rowcount=-1, message=None):
+        self.columns = columns
+        self.rows = iter(rows)
+        self.rowcount = rowcount
+        self.message = message
+        self.elapsed = None
+        self.arraysize = 1
+        self.rownumber = 0  # 已取出的行数
+
+    def fetchone(self):
+        row = next(self.rows, None)
+        if row is None:
+            self._exhausted()
+        else:
+            self.rownumber += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = list(islice(self.rows, size))
+        self.rownumber += len(rows)
+        if len(rows) < size:
+            self._exhausted()
+        return rows
+
+    def fetchall(self):
+        rows = list(self.rows)
+        self.rownumber += len(rows)
+        self._exhausted()
+        return rows
+
+    def _exhausted(self):
+        if self.columns is not None:
+            self.rowcount = self.rownumber
+
+    def close(self):
+        # 提前关闭时释放语句持有的读锁
+        close = getattr(self.rows, 'close', None)
+        self.rows = iter(())
+        if close is not None:
+            close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            row = next(self.rows)
+        except StopIteration:
+            self._exhausted()
+            raise
+        self.rownumber += 1
+        return row
@@ -1,222 +1,1200 @@
 # src/database.py
 
-import copy
+import contextlib
+import itertools
+import json
+import os
+import threading
+
+from src.aggregate import AGGREGATE_BATCH, AggregateQuery, aggregate_values, row_batches
+from src.disk_storage import BufferPool, DiskStorage, HeapFile, load_directory
+from src.index import create_index
+from src.instrumentation import record_index_hit, record_scan, timed_phase
+from src.join import JoinQuery
+from src.parallel import ParallelScanner
+from src.planner import TableStats, column_stats, index_stats, plan_query
+from src.predicate import compile_in, compile_like, compile_predicate, union_positions
+from src.datatypes import convert_values
+from src.schema import Schema
+from src.snapshot import read_snapshot, write_snapshot
+from src.sort import Sort, limit_rows
+from src.sql_ast import Aggregate, And, Between, Comparison, In, Like, Not, Or, Range, bind_literals, columns_of, negate
+from src.storage import SCAN_BATCH, create_storage
+from src.transaction import LOCK_TIMEOUT, LockedRows, SessionManager, UndoLog
+from src.wal import WriteAheadLog, read_log
+
+CATALOG_FILE = 'catalog.json'
+WAL_FILE = 'wal.log'
+# UPDATE 或其回滚改动的行超过表行数的这一比例时，整体重建受影响的索引，不再逐行删除与插入索引项
+REINDEX_FRACTION = 0.1
 
 class Database:
-    def __init__(self):
+    def __init__(self, data_dir=None, buffer_pool_pages=1024, group_commit_window=0.001,
+                 parallel_workers=0, parallel_threshold=1_000_000, join_memory_rows=1_000_000,
+                 lock_timeout=LOCK_TIMEOUT, compaction_interval=None):
         self.tables = {}
-        self.in_transaction = False
-        self.transaction_backup = None
+        # 每个线程（连接）有自己的撤销日志，BEGIN 只需打开日志，与数据量无关；
+        # 语句按表加读写锁，事务内的锁保持到提交或回滚
+        self.journal = SessionManager(lock_timeout)
+        # 指定 data_dir 时新建的表默认使用磁盘存储，检查点时写入目录
+        self.data_dir = data_dir
+        self.buffer_pool = None
+        self.checkpoint_id = 0
+        self.next_file_id = 0
+        self.dropped_tables = []
+        self.wal = None
+        # parallel_workers 为 0 时所有扫描都是串行的
+        self.scanner = None
+        # 散列连接的 build 一侧超过这么多行时溢出到磁盘（临时文件放在 data_dir 或系统临时目录中）
+        self.join_memory_rows = join_memory_rows
+        self.set_parallelism(parallel_workers, parallel_threshold)
+        if data_dir is not None:
+            os.makedirs(data_dir, exist_ok=True)
+            self.buffer_pool = BufferPool(buffer_pool_pages)
+            wal_lsn = self._load_catalog()
+            self._recover(wal_lsn, group_commit_window)
+        # ALTER TABLE 不改写已有的行；指定 compaction_interval（秒）时由后台线程定期压缩，否则调用 compact()
+        self.compactor = None
+        self.compactor_stop = threading.Event()
+        if compaction_interval is not None:
+            self.compactor = threading.Thread(target=self._compact_periodically, args=(compaction_interval,),
+                                              name='compactor', daemon=True)
+            self.compactor.start()
+
+    def set_parallelism(self, workers, threshold=1_000_000):
+        # 开启（workers > 0）或关闭并行扫描；之后的查询对所有表生效
+        if self.scanner is not None:
+            self.scanner.close()
+        self.scanner = ParallelScanner(workers, threshold) if workers else None
+        for table in list(self.tables.values()):
+            table.scanner = self.scanner
+
+    @property
+    def default_storage(self):
+        return 'DISK' if self.data_dir is not None else 'ROW'
+
+    @property
+    def in_transaction(self):
+        return self.journal.active
 
     def begin_transaction(self):
         if self.in_transaction:
             raise ValueError("A transaction is already in progress.")
-        self.transaction_backup = copy.deepcopy(self.tables)
-        self.in_transaction = True
-        print("Transaction started.")
+        self.journal.begin()
 
     def commit(self):
         if not self.in_transaction:
             raise ValueError("No transaction in progress.")
-        self.transaction_backup = None
-        self.in_transaction = False
-        print("Transaction committed.")
+        self.journal.commit()
 
     def rollback(self):
         if not self.in_transaction:
             raise ValueError("No transaction in progress.")
-        self.tables = self.transaction_backup
-        self.transaction_backup = None
-        self.in_transaction = False
-        print("Transaction rolled back.")
+        self.journal.rollback()
 
-    def create_table(self, table_name, columns):
+    @contextlib.contextmanager
+    def locked(self, table_names, exclusive=True, timeout=None):
+        # 语句期间持有这些表的锁；在事务内时锁保持到事务结束
+        release = self.journal.lock(table_names, exclusive, timeout)
+        try:
+            yield
+        finally:
+            release()
+
+    def create_table(self, table_name, columns, storage=None):
+        with self.locked([table_name]):
+            self._create_table(table_name, columns, storage)
+
+    def _create_table(self, table_name, columns, storage):
         if table_name in self.tables:
             raise ValueError(f"Table '{table_name}' already exists.")
-        self.tables[table_name] = Table(table_name, columns)
-        print(f"Table '{table_name}' created with columns: {columns}")
+        storage = (storage or self.default_storage).upper()
+        if storage == 'DISK':
+            storage = self._new_disk_storage(table_name, list(columns.values()))
+        self.tables[table_name] = Table(table_name, columns, self.journal, storage, self.scanner)
+        self.journal.record(self._undo_create_table, table_name)
+        if self.tables[table_name].storage.storage_type == 'DISK':
+            self.journal.log('create_table', table_name, columns)
 
     def get_table(self, table_name):
         return self.tables.get(table_name)
 
+    def table_versions(self, table_names):
+        # 各表当前的版本（见 Table.version）；有表不存在时返回 None
+        versions = []
+        for table_name in table_names:
+            table = self.tables.get(table_name)
+            if table is None:
+                return None
+            versions.append(table.version)
+        return tuple(versions)
+
     def insert_into(self, table_name, values):
+        with self.locked([table_name]):
+            return self._table(table_name).insert_row(values)
+
+    def insert_many(self, table_name, rows):
+        with self.locked([table_name]):
+            return self._table(table_name).bulk_insert(rows)
+
+    def select_from(self, table_name, columns=None, where=None):
+        with self.locked([table_name], exclusive=False):
+            return self._table(table_name).select(columns, where)
+
+    def scan_from(self, table_name, columns=None, where=None):
         table = self.get_table(table_name)
         if not table:
             raise ValueError(f"Table '{table_name}' does not exist.")
-        table.insert_row(values)
+        return table.scan(columns, where)
 
-    def select_from(self, table_name, columns=None, where=None):
+    def scan_join(self, table_name, joins, columns=None, where=None):
+        return self._join_query(table_name, joins, columns, where).execute()
+
+    def aggregate_from(self, table_name, columns, where=None, group_by=(), having=None, joins=None):
+        # 返回 (列名, 结果行)；不分组的单表聚合直接从存储与元数据求值，其余经过散列聚合
+        query = AggregateQuery(columns, group_by, having)
+        if joins:
+            join = self._join_query(table_name, joins, query.input_columns, where)
+            query.bind(join.column_type)
+            _, rows = join.execute()
+            return query.execute(row_batches(rows, len(query.input_columns)))
         table = self.get_table(table_name)
         if not table:
             raise ValueError(f"Table '{table_name}' does not exist.")
-        return table.select(columns, where)
+        query.bind(table.column_type)
+        if not group_by:
+            return query.execute_ungrouped(table.aggregate(query.aggregates, where))
+        return query.execute(table.column_batches(query.input_columns, where, AGGREGATE_BATCH))
 
-    def delete_from(self, table_name, where=None):
+    def select_query(self, table_name, columns, where=None, joins=None, group_by=(), having=None,
+                     order_by=(), limit=None, offset=0):
+        # 完整的 SELECT，返回 (列名, 行迭代器)；order_by 为 [(列或聚合函数, 是否降序)]。
+        # 涉及的表加读锁，直到行被取完或游标关闭
+        release = self.journal.lock([table_name] + [join['table_name'] for join in joins or ()], exclusive=False)
+        try:
+            names, rows = self._select(table_name, columns, where, joins, group_by, having,
+                                       order_by, limit, offset)[:2]
+        except BaseException:
+            release()
+            raise
+        return names, LockedRows(rows, release)
+
+    def explain(self, table_name, columns=None, where=None, joins=None, group_by=(), having=None,
+                order_by=(), limit=None, offset=0):
+        with self.locked([table_name] + [join['table_name'] for join in joins or ()], exclusive=False):
+            return self._explain(table_name, columns, where, joins, group_by, having, order_by, limit, offset)
+
+    def _explain(self, table_name, columns=None, where=None, joins=None, group_by=(), having=None,
+                 order_by=(), limit=None, offset=0):
+        if order_by or limit is not None or offset:
+            # 执行查询得到实际行数；排序与 LIMIT 的各步自上而下列出，输入计划逐层缩进
+            _, rows, steps = self._select(table_name, columns, where, joins, group_by, having,
+                                          order_by, limit, offset)
+            actual_rows = sum(1 for _ in rows)
+            lines = self._explain(table_name, columns, where, joins, group_by, having)
+            for step in reversed(steps):
+                lines = [step] + ['  ' + line for line in lines]
+            return lines + [f"Returned rows: {actual_rows}"]
+        if group_by or having is not None or any(isinstance(column, Aggregate) for column in columns):
+            # 聚合的输入计划缩进列在聚合之下
+            query = AggregateQuery(columns, group_by, having)
+            lines = self._explain(table_name, query.input_columns or ["*"], where, joins)
+            return [query.describe()] + ['  ' + line for line in lines]
+        if joins:
+            query = self._join_query(table_name, joins, columns, where)
+            _, rows = query.execute()
+            return query.describe(sum(1 for _ in rows))
         table = self.get_table(table_name)
         if not table:
             raise ValueError(f"Table '{table_name}' does not exist.")
-        table.delete_rows(where)
+        return table.explain(columns, where)
 
-    def update(self, table_name, set_values, where=None):
+    def _select(self, table_name, columns, where, joins, group_by, having, order_by, limit, offset):
+        # 返回 (列名, 行生成器, EXPLAIN 中排序与 LIMIT 的步骤描述，自上而下)
+        aggregated = bool(group_by) or having is not None or any(isinstance(column, Aggregate) for column in columns)
+        if not order_by:
+            if aggregated:
+                names, rows = self.aggregate_from(table_name, columns, where, group_by, having, joins)
+            elif joins:
+                names, rows = self.scan_join(table_name, joins, columns, where)
+            else:
+                table = self._table(table_name)
+                plan = table.plan(columns, where)
+                names, rows = plan.columns, table.scan_plan(plan, limit=limit)
+            return names, limit_rows(rows, limit, offset), _limit_steps(limit, offset)
+        if not aggregated and not joins and len(order_by) == 1:
+            # 按单列排序且该列上有覆盖全部行的有序索引时沿索引读取，不排序；
+            # 带 WHERE 时只在有 LIMIT（可以提前结束）时才沿索引读取
+            table = self._table(table_name)
+            column, descending = order_by[0]
+            index = table.order_index(column)
+            if index is not None and (where is None or limit is not None):
+                plan = table.plan(columns, where)
+                rows = table.scan_plan(plan, order_by=index, descending=descending)
+                step = f"Index Order: {column}{' DESC' if descending else ''} using {index.name}"
+                return plan.columns, limit_rows(rows, limit, offset), _limit_steps(limit, offset) + [step]
+        # ORDER BY 中不在 SELECT 列表里的列作为隐藏列一起读取，排序后去掉
+        hidden = [] if columns == ["*"] else [item for item, _ in order_by if item not in columns]
+        names, rows = self._select(table_name, list(columns) + hidden, where, joins, group_by, having,
+                                   (), None, 0)[:2]
+        keys = [(_order_position(item, names), descending) for item, descending in order_by]
+        operator = Sort(rows, keys, limit, offset, names)
+        steps = [operator.describe()]
+        if hidden:
+            width = len(columns)
+            return names[:width], (row[:width] for row in operator), steps
+        return names, iter(operator), steps
+
+    def _table(self, table_name):
         table = self.get_table(table_name)
         if not table:
             raise ValueError(f"Table '{table_name}' does not exist.")
-        table.update_rows(set_values, where)
+        return table
+
+    def _join_query(self, table_name, joins, columns, where):
+        tables = []
+        for name in [table_name] + [join['table_name'] for join in joins]:
+            table = self.get_table(name)
+            if not table:
+                raise ValueError(f"Table '{name}' does not exist.")
+            tables.append(table)
+        return JoinQuery(tables, joins, columns, where, self.join_memory_rows, self.data_dir)
+
+    def delete_from(self, table_name, where=None):
+        with self.locked([table_name]):
+            return self._table(table_name).delete_rows(where)
+
+    def update(self, table_name, set_values, where=None):
+        with self.locked([table_name]):
+            return self._table(table_name).update_rows(set_values, where)
+
+    def alter_table(self, table_name, operation, column_name, column_type=None):
+        with self.locked([table_name]):
+            table = self._table(table_name)
+            # 返回表结构是否发生了变化（列已存在或不存在时不做任何事）
+            if operation == 'ADD COLUMN':
+                return table.add_column(column_name, column_type)
+            elif operation == 'DROP COLUMN':
+                return table.drop_column(column_name)
+            elif operation == 'MODIFY COLUMN':
+                return table.modify_column(column_name, column_type)
+            else:
+                raise ValueError(f"Unsupported ALTER TABLE operation: {operation}")
 
     def drop_table(self, table_name):
+        with self.locked([table_name]):
+            self._drop_table(table_name)
+
+    def _drop_table(self, table_name):
         if table_name not in self.tables:
             raise ValueError(f"Table '{table_name}' does not exist.")
+        table = self.tables.pop(table_name)
+        if table.storage.storage_type == 'DISK':
+            # 堆文件在检查点时才删除，回滚仍然可以恢复这张表
+            self.dropped_tables.append(table)
+            self.journal.log('drop_table', table_name)
+        self.journal.record(self._undo_drop_table, table_name, table)
+
+    def create_index(self, index_name, table_name, column_name, index_type='SORTED'):
+        with self.locked([table_name]):
+            table = self._table(table_name)
+            if self._find_index_table(index_name) is not None:
+                raise ValueError(f"Index '{index_name}' already exists.")
+            return table.create_index(index_name, column_name, index_type)
+
+    def drop_index(self, index_name, table_name=None):
+        if table_name is None:
+            table = self._find_index_table(index_name)
+            table_name = table.name if table is not None else None
+        with self.locked([] if table_name is None else [table_name]):
+            table = self._table(table_name) if table_name is not None else None
+            if table is None or index_name not in table.indexes:
+                raise ValueError(f"Index '{index_name}' does not exist.")
+            table.drop_index(index_name)
+
+    def _find_index_table(self, index_name):
+        for table in list(self.tables.values()):
+            if index_name in table.indexes:
+                return table
+        return None
+
+    def _new_disk_storage(self, table_name, column_types):
+        if self.data_dir is None:
+            raise ValueError("DISK storage requires a database directory.")
+        file_name = f"{table_name}_{self.next_file_id}"
+        self.next_file_id += 1
+        path = os.path.join(self.data_dir, file_name + '.heap')
+        if os.path.exists(path):
+            os.remove(path)  # 未被目录引用的残留文件
+        return DiskStorage(column_types, HeapFile(path), self.buffer_pool)
+
+    def _load_catalog(self):
+        # 返回检查点已包含的最后一个日志 LSN
+        path = os.path.join(self.data_dir, CATALOG_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            catalog = json.load(f)
+        self.checkpoint_id = catalog['checkpoint_id']
+        self.next_file_id = catalog['next_file_id']
+        for table_name, meta in catalog['tables'].items():
+            base = os.path.join(self.data_dir, meta['file'])
+            directory = load_directory(f"{base}.{self.checkpoint_id}.dir")
+            schema = Schema(meta['columns'], meta.get('positions'), meta.get('width'))
+            storage = DiskStorage(schema.slot_types(), HeapFile(base + '.heap'),
+                                  self.buffer_pool, directory, meta.get('full_width'))
+            table = Table(table_name, schema, self.journal, storage, self.scanner)
+            for index_name, column_name, index_type in meta['indexes']:
+                table._build_index(index_name, column_name, index_type)
+            self.tables[table_name] = table
+        return catalog.get('wal_lsn', 0)
+
+    def _recover(self, wal_lsn, group_commit_window):
+        # 重放检查点之后已提交的日志记录，然后做一次检查点并清空日志
+        path = os.path.join(self.data_dir, WAL_FILE)
+        last_lsn = wal_lsn
+        for lsn, ops in read_log(path, wal_lsn):
+            for op in ops:
+                self._replay(*op)
+            last_lsn = lsn
+        self.wal = WriteAheadLog(path, last_lsn + 1, group_commit_window)
+        self.journal.wal = self.wal
+        if os.path.getsize(path):
+            # 日志尾部可能有崩溃时写了一半的记录，新记录不能追加在它后面
+            self.checkpoint()
+
+    def _replay(self, kind, table_name, *args):
+        if kind == 'create_table':
+            self.create_table(table_name, args[0], 'DISK')
+            return
+        if kind == 'drop_table':
+            self.drop_table(table_name)
+            return
+        table = self.tables[table_name]
+        if kind == 'insert':
+            table.insert_row(args[0])
+        elif kind == 'bulk_insert':
+            table.bulk_insert(args[0])
+        elif kind == 'update':
+            # 日志中的值经过 JSON 编码（日期与时间为 ISO 格式的字符串），按列的类型转换回来
+            schema = table.schema
+            table._update_positions(args[0], [(schema.position(table_name, name), schema.convert(name, value))
+                                              for name, value in args[1]])
+        elif kind == 'delete':
+            table._delete_positions(args[0])
+        elif kind == 'add_column':
+            table.add_column(*args)
+        elif kind == 'drop_column':
+            table.drop_column(*args)
+        elif kind == 'modify_column':
+            table.modify_column(*args)
+        elif kind == 'create_index':
+            table.create_index(*args)
+        elif kind == 'drop_index':
+            table.drop_index(*args)
+        else:
+            raise ValueError(f"Unknown log record '{kind}'")
+
+    def checkpoint(self):
+        # 写回所有脏页和新的页目录，再原子地替换目录文件；旧检查点的页随后才允许复用。
+        # 期间持有所有表的排他锁，等待其他连接正在进行的写语句与事务结束
+        if self.data_dir is None:
+            return
+        if self.in_transaction:
+            raise ValueError("Cannot checkpoint while a transaction is in progress.")
+        with self.locked(list(self.tables)):
+            self._checkpoint()
+
+    def _checkpoint(self):
+        checkpoint_id = self.checkpoint_id + 1
+        tables = {}
+        for table_name, table in list(self.tables.items()):
+            if table.storage.storage_type != 'DISK':
+                continue  # 内存表不持久化
+            storage = table.storage
+            storage.flush()
+            base = os.path.splitext(storage.heap.path)[0]
+            _write_file(f"{base}.{checkpoint_id}.dir", storage.directory_bytes())
+            tables[table_name] = {
+                'file': os.path.basename(base),
+                'columns': table.columns,
+                'positions': table.schema.positions,
+                'width': table.schema.width,
+                'full_width': storage.full_width,
+                'indexes': [[index.name, index.column_name, index.index_type] for index in table.indexes.values()],
+            }
+        wal_lsn = self.wal.last_lsn if self.wal is not None else 0
+        catalog = {'checkpoint_id': checkpoint_id, 'next_file_id': self.next_file_id,
+                   'wal_lsn': wal_lsn, 'tables': tables}
+        _write_file(os.path.join(self.data_dir, CATALOG_FILE), json.dumps(catalog, ensure_ascii=False).encode('utf-8'))
+        self.checkpoint_id = checkpoint_id
+        if self.wal is not None:
+            # 日志中的记录都已包含在检查点中
+            self.wal.truncate()
+
+        live_files = {meta['file'] for meta in tables.values()}
+        for table in self.tables.values():
+            if table.storage.storage_type == 'DISK':
+                table.storage.mark_stable()
+        for table in self.dropped_tables:
+            if table not in self.tables.values():
+                self.buffer_pool.drop(table.storage.heap)
+                table.storage.heap.close()
+        self.dropped_tables = []
+        # 删除旧检查点的页目录以及已删除表的堆文件
+        for name in os.listdir(self.data_dir):
+            base, ext = os.path.splitext(name)
+            if ext == '.dir' and not base.endswith(f".{checkpoint_id}"):
+                os.remove(os.path.join(self.data_dir, name))
+            elif ext == '.heap' and base not in live_files:
+                os.remove(os.path.join(self.data_dir, name))
+
+    def save(self, path):
+        # 把所有表写入快照文件（见 src/snapshot.py），期间持有所有表的读锁；返回保存的表名
+        with self.locked(list(self.tables), exclusive=False):
+            tables = list(self.tables.values())
+            write_snapshot(path, tables)
+        return [table.name for table in tables]
+
+    def load(self, path):
+        # 从快照文件载入其中的所有表，作为内存中的列存储表；列数据在首次访问时才从文件中读取，
+        # 索引在载入时重建。与已有的表重名时报错，不载入任何表。返回载入的表名
+        snapshot = read_snapshot(path)
+        names = [name for name, *_ in snapshot]
+        with self.locked(names):
+            for name in names:
+                if name in self.tables:
+                    raise ValueError(f"Table '{name}' already exists.")
+            for name, columns, indexes, storage in snapshot:
+                table = Table(name, columns, self.journal, storage, self.scanner)
+                for index_name, column_name, index_type in indexes:
+                    table._build_index(index_name, column_name, index_type)
+                self.tables[name] = table
+                self.journal.record(self._undo_create_table, name)
+        return names
+
+    def compact(self, table_name=None):
+        # 把 ALTER TABLE 之后的表改写为紧凑布局（见 Table.compact），返回改写了的表名。
+        # 压缩不能回滚，因此不能在事务中执行
+        if self.in_transaction:
+            raise ValueError("Cannot compact while a transaction is in progress.")
+        names = [table_name] if table_name is not None else list(self.tables)
+        compacted = []
+        for name in names:
+            with self.locked([name]):
+                if self._table(name).compact():
+                    compacted.append(name)
+        return compacted
+
+    def _compact_periodically(self, interval):
+        # 后台压缩：只尝试获取锁，正在被使用的表跳过，下一轮再试
+        while not self.compactor_stop.wait(interval):
+            for name, table in list(self.tables.items()):
+                if not table.needs_compaction:
+                    continue
+                try:
+                    with self.locked([name], timeout=0):
+                        if self.tables.get(name) is table:
+                            table.compact()
+                except ValueError:
+                    continue
+
+    def close(self):
+        if self.compactor is not None:
+            self.compactor_stop.set()
+            self.compactor.join()
+        if self.scanner is not None:
+            self.scanner.close()
+        if self.data_dir is None:
+            return
+        if self.in_transaction:
+            self.journal.rollback()
+        self.checkpoint()
+        self.wal.close()
+        for table in self.tables.values():
+            if table.storage.storage_type == 'DISK':
+                table.storage.heap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _undo_create_table(self, table_name):
         del self.tables[table_name]
-        print(f"Dropped table '{table_name}'.")
+
+    def _undo_drop_table(self, table_name, table):
+        self.tables[table_name] = table
+
+# 表的版本号：所有表共用一个递增的序列，DROP 之后重建或载入的同名表不会得到用过的版本
+_TABLE_VERSIONS = itertools.count(1)
+
+def _write_file(path, data):
+    # 先写临时文件并 fsync，再用 rename 原子替换
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _order_position(item, names):
+    # ORDER BY 的列在结果列中的位置；连接的结果列带表名时，唯一匹配的不带表名的列名同样可以使用
+    name = str(item)
+    if name in names:
+        return names.index(name)
+    matches = [i for i, candidate in enumerate(names) if candidate.endswith('.' + name)]
+    if len(matches) == 1:
+        return matches[0]
+    if matches:
+        raise ValueError(f"Column '{name}' in ORDER BY is ambiguous.")
+    raise ValueError(f"Column '{name}' in ORDER BY is not in the result.")
+
+def _limit_steps(limit, offset):
+    if limit is None:
+        return [f"Offset: {offset}"] if offset else []
+    return [f"Limit: {limit}" + (f" (offset: {offset})" if offset else "")]
 
 class Table:
-    def __init__(self, name, columns):
+    def __init__(self, name, columns, journal=None, storage='ROW', scanner=None):
         self.name = name
-        self.columns = {col_name: col_type.upper() for col_name, col_type in columns.items()}
-        self.column_names = list(columns.keys())
-        self.rows = []
-        self.indexes = {}  # 未来可扩展索引功能
+        # columns 为 {列名: 类型}，或从目录恢复时带有槽位布局的 Schema
+        self.schema = columns if isinstance(columns, Schema) else Schema(columns)
+        if isinstance(storage, str):
+            storage = create_storage(storage, list(self.columns.values()))
+        self.storage = storage
+        self.indexes = {}  # 索引名 -> HashIndex / SortedIndex
+        self.journal = journal if journal is not None else UndoLog()
+        self.scanner = scanner  # ParallelScanner，None 表示只做串行扫描
+        # 查询规划用的统计信息，按需收集；modifications 累计写入、删除与更新的行数，用于判断统计信息是否过期
+        self.stats = None
+        self.modifications = 0
+        # 表的内容或结构每次变化（包括回滚）都换一个新的版本，缓存的查询结果按版本判断是否过期（见 src/result_cache.py）
+        self.version = next(_TABLE_VERSIONS)
+
+    @property
+    def columns(self):
+        return self.schema.columns
+
+    @property
+    def column_names(self):
+        return self.schema.names
+
+    @property
+    def rows(self):
+        # 拼装出的只读副本，每行是一个 list，按列的顺序排列
+        return self.storage.project(None, self.schema.slots)
+
+    @rows.setter
+    def rows(self, rows):
+        self.storage.load(rows)
+        self._rebuild_indexes()
+        self._changed()
+
+    def _changed(self):
+        self.version = next(_TABLE_VERSIONS)
 
     def insert_row(self, values):
-        if len(values) != len(self.column_names):
-            raise ValueError("Column count doesn't match value count.")
-        # 类型转换
-        converted_values = []
-        for value, col_name in zip(values, self.column_names):
-            col_type = self.columns[col_name]
-            try:
-                if value is None:
-                    converted_values.append(None)
-                elif col_type == 'INT':
-                    converted_values.append(int(value))
-                else:
-                    converted_values.append(str(value))
-            except ValueError:
-                raise ValueError(f"Invalid value for column '{col_name}': {value}")
-        self.rows.append(converted_values)
-        print(f"Inserted into '{self.name}': {converted_values}")
+        schema = self.schema
+        converted_values = schema.convert_row(values)
+        row = schema.physical_row(converted_values)
+        self.storage.append(row)
+        if self.indexes:
+            pos = len(self.storage) - 1
+            positions = schema.positions
+            for index in self.indexes.values():
+                index.add(row[positions[index.column_name]], pos)
+        self.modifications += 1
+        self._changed()
+        self.journal.record(self._undo_insert)
+        self._log('insert', converted_values)
+        return 1
+
+    def bulk_insert(self, rows):
+        # 批量插入：每列只做一次类型转换，索引在整批写入后统一更新；返回插入的行数
+        width = len(self.column_names)
+        for values in rows:
+            if len(values) != width:
+                raise ValueError("Column count doesn't match value count.")
+        if not rows:
+            return 0
+        schema = self.schema
+        columns = dict(zip(schema.names, map(self._convert_column, schema.names, zip(*rows))))
+        if schema.compact:
+            physical_rows = converted_rows = list(zip(*columns.values()))
+        else:
+            # 已删除列的槽位为 NULL
+            nulls = [None] * len(rows)
+            slots = [nulls] * schema.width
+            for name, slot in schema.positions.items():
+                slots[slot] = columns[name]
+            physical_rows = list(zip(*slots))
+            converted_rows = list(zip(*columns.values())) if self._logged else None
+        start = len(self.storage)
+        self.storage.extend(physical_rows)
+        for index in self.indexes.values():
+            index.extend(columns[index.column_name], start)
+        self.modifications += len(physical_rows)
+        self._changed()
+        self.journal.record(self._undo_bulk_insert, start)
+        self._log('bulk_insert', converted_rows)
+        return len(physical_rows)
+
+    def _convert_column(self, name, values):
+        converted, failures = convert_values(self.schema.converters[name], values)
+        if failures:
+            raise ValueError(f"Invalid value for column '{name}': {failures[0][1]}")
+        return converted
 
     def select(self, columns, where=None):
-        # 确认列是否存在
+        plan = self.plan(columns, where)
+        return self.storage.project(self._planned_positions(plan), plan.col_indices)
+
+    def scan(self, columns, where=None):
+        # 与 select 相同，但返回 (列名, 行生成器)；列检查与 WHERE 定位立即执行，行在迭代时才拼装
+        plan = self.plan(columns, where)
+        return plan.columns, self.scan_plan(plan)
+
+    def scan_plan(self, plan, order_by=None, descending=False, limit=None):
+        # order_by 为有序索引时按索引的键序（descending 时逆序）输出，NULL 不在索引中，不会输出；
+        # 供归并连接与 ORDER BY 使用。limit 不为 None 时调用方取够 limit 行即停止，
+        # 没有索引可用的 WHERE 改为按块求值，不必先对整张表求值
+        if limit is not None and order_by is None and plan.index is None and plan.steps:
+            return self._scan_chunks(plan, limit)
+        positions = self._planned_positions(plan)
+        if positions is None and order_by is None:
+            record_scan(len(self.storage))
+        if order_by is not None:
+            if positions is None:
+                positions = order_by.positions
+            else:
+                members = set(positions)
+                positions = [pos for pos in order_by.positions if pos in members]
+            if descending:
+                positions = positions[::-1]
+        return self.storage.scan(positions, plan.col_indices)
+
+    def _scan_chunks(self, plan, limit):
+        # 每块按计划的各步求值后输出命中的行；块的大小从 limit 起逐次翻倍，总工作量不超过全表扫描的两倍
+        start, size, row_count = 0, max(limit, SCAN_BATCH), len(self.storage)
+        while start < row_count:
+            positions = list(range(start, min(start + size, row_count)))
+            for expr, _ in plan.steps:
+                positions = self._evaluate(expr, positions)
+                if not positions:
+                    break
+            if positions:
+                yield from self.storage.scan(positions, plan.col_indices)
+            start += size
+            size *= 2
+
+    def order_index(self, column):
+        # ORDER BY column 可以沿着读取的有序索引：索引须覆盖全部行（列中没有 NULL）
+        index = self.sorted_index(column)
+        if index is not None and len(index.positions) == len(self.storage):
+            return index
+        return None
+
+    def column_batches(self, columns, where, batch_size):
+        # 按列分批读取 WHERE 命中的行，不拼装行；返回 (行数, [各列的值]) 的生成器
+        plan = self.plan(columns, where)
+        positions = self._planned_positions(plan)
+        if positions is None:
+            record_scan(len(self.storage))
+        return self.storage.column_batches(positions, plan.col_indices, batch_size)
+
+    def aggregate(self, aggregates, where=None):
+        # 不分组的聚合，返回各聚合值：COUNT(*) 直接取行数，无 WHERE 的 MIN / MAX 从有序索引的两端读取，
+        # 其余对整列或 WHERE 命中的行按列求值
+        for aggregate in aggregates:
+            if aggregate.column is not None and aggregate.column not in self.columns:
+                raise ValueError(f"Column '{aggregate.column}' does not exist in table '{self.name}'.")
+        positions = self._planned_positions(self.plan(None, where)) if where is not None else None
+        columns = {}
+        results = []
+        for function, column in aggregates:
+            if column is None:
+                results.append(len(self.storage) if positions is None else len(positions))
+                continue
+            index = self.sorted_index(column) if positions is None and function in ('MIN', 'MAX') else None
+            if index is not None:
+                keys = index.keys
+                results.append((keys[0] if function == 'MIN' else keys[-1]) if keys else None)
+                continue
+            values = columns.get(column)
+            if values is None:
+                col_idx = self.schema.positions[column]
+                values = columns[column] = (self.storage.column(col_idx) if positions is None
+                                            else self.storage.take(positions, col_idx))
+                if positions is None:
+                    record_scan(len(values))
+            try:
+                results.append(aggregate_values(function, values))
+            except TypeError:
+                raise ValueError(f"Cannot apply {function} to column '{column}'.")
+        return results
+
+    def sorted_index(self, column):
+        for index in self.indexes.values():
+            if index.column_name == column and index.index_type == 'SORTED':
+                return index
+        return None
+
+    @timed_phase('plan')
+    def plan(self, columns, where=None):
+        # columns 为 None 时只定位行（DELETE / UPDATE），不做投影
+        selected_columns = col_indices = None
+        if columns is not None:
+            selected_columns, col_indices = self._resolve_columns(columns)
+        if where is not None:
+            for column in columns_of(where):
+                if column not in self.columns:
+                    raise ValueError(f"Column '{column}' does not exist in table '{self.name}'.")
+            where = self._bind(where)
+        return plan_query(self, selected_columns, col_indices, where)
+
+    def _bind(self, where):
+        # 条件中的常量按列的类型转换一次，之后列中的值与常量类型一致，逐行比较时不再做任何转换
+        return bind_literals(where, self.schema.literal)
+
+    def column_type(self, column):
+        # 列的 ColumnType；列不存在时报错
+        self.schema.position(self.name, column)
+        return self.schema.types[column]
+
+    def explain(self, columns, where=None):
+        # 执行查询的定位部分，返回计划的各行描述，末行对比估计行数与实际行数
+        plan = self.plan(columns, where)
+        positions = self._planned_positions(plan)
+        plan.estimate(self.statistics(columns_of(where) if where is not None else ()))
+        return plan.describe(len(self.storage) if positions is None else len(positions))
+
+    def statistics(self, columns=None):
+        # 返回 TableStats，并确保其中含有 columns 中各列（None 表示所有列）的统计信息
+        if self.stats is None or self.stats.is_stale(self.modifications):
+            self.stats = TableStats(len(self.storage), self.modifications)
+        for column in self.column_names if columns is None else columns:
+            if column not in self.stats.columns:
+                self.stats.columns[column] = self._column_stats(column)
+        return self.stats
+
+    def analyze(self):
+        # 重新收集所有列的统计信息
+        self.stats = None
+        return self.statistics()
+
+    def _column_stats(self, column):
+        for index in self.indexes.values():
+            if index.column_name == column:
+                return index_stats(index, len(self.storage))
+        return column_stats(self.storage.column(self.schema.positions[column]))
+
+    def _resolve_columns(self, columns):
+        # 确认列是否存在，并获取列所在的槽位
         if columns == ["*"]:
-            selected_columns = self.column_names
-        else:
-            for col in columns:
-                if col not in self.column_names:
-                    raise ValueError(f"Column '{col}' does not exist in table '{self.name}'.")
-            selected_columns = columns
-
-        # 获取列索引
-        col_indices = [self.column_names.index(col) for col in selected_columns]
-
-        result = []
-        for row in self.rows:
-            if where:
-                where_col, operator, where_val = where
-                if where_col not in self.column_names:
-                    raise ValueError(f"Column '{where_col}' does not exist in table '{self.name}'.")
-                where_idx = self.column_names.index(where_col)
-                cell_value = row[where_idx]
-                if not self._evaluate_condition(cell_value, operator, where_val):
-                    continue
-            selected_row = [row[idx] for idx in col_indices]
-            result.append(selected_row)
-        return result
+            return list(self.column_names), list(self.schema.slots)
+        return columns, [self.schema.position(self.name, col) for col in columns]
 
     def delete_rows(self, where=None):
-        initial_count = len(self.rows)
-        if where:
-            where_col, operator, where_val = where
-            if where_col not in self.column_names:
-                raise ValueError(f"Column '{where_col}' does not exist in table '{self.name}'.")
-            where_idx = self.column_names.index(where_col)
-            new_rows = []
-            for row in self.rows:
-                cell_value = row[where_idx]
-                if not self._evaluate_condition(cell_value, operator, where_val):
-                    new_rows.append(row)
-            self.rows = new_rows
-        else:
-            # 删除所有行
-            self.rows = []
-        deleted_count = initial_count - len(self.rows)
-        print(f"Deleted {deleted_count} row(s) from '{self.name}'.")
+        positions = self._matching_positions(where) if where else None
+        return self._delete_positions(positions)
+
+    def _delete_positions(self, positions):
+        # positions 为 None 表示删除所有行；返回删除的行数
+        initial_count = len(self.storage)
+        if positions is None:
+            self.journal.record(self._undo_delete_all, self.storage.truncate())
+        elif positions:
+            if self.journal.active:
+                # 只记录被删除的行及其原位置
+                self.journal.record(self._undo_delete, [(pos, self.storage.get_row(pos)) for pos in positions])
+            self.storage.delete(positions)
+        deleted_count = initial_count - len(self.storage)
+        self.modifications += deleted_count
+        if deleted_count:
+            # 行位置发生了移动，重建索引
+            self._rebuild_indexes()
+            self._changed()
+            self._log('delete', positions)
+        return deleted_count
 
     def update_rows(self, set_values, where=None):
-        update_count = 0
-        for row in self.rows:
-            if where:
-                where_col, operator, where_val = where
-                if where_col not in self.column_names:
-                    raise ValueError(f"Column '{where_col}' does not exist in table '{self.name}'.")
-                where_idx = self.column_names.index(where_col)
-                cell_value = row[where_idx]
-                if not self._evaluate_condition(cell_value, operator, where_val):
-                    continue
-            for col, val in set_values.items():
-                if col not in self.column_names:
-                    raise ValueError(f"Column '{col}' does not exist in table '{self.name}'.")
-                idx = self.column_names.index(col)
-                col_type = self.columns[col]
-                try:
-                    if col_type == 'INT':
-                        row[idx] = int(val)
-                    else:
-                        row[idx] = str(val)
-                except ValueError:
-                    raise ValueError(f"Invalid value for column '{col}': {val}")
-            update_count += 1
-        print(f"Updated {update_count} row(s) in '{self.name}'.")
-
-    def _evaluate_condition(self, left, operator, right):
-        if isinstance(left, str) and isinstance(right, str):
-            pass  # 字符串比较
-        elif isinstance(left, int) and isinstance(right, int):
-            pass  # 整数比较
-        else:
-            # 尝试类型转换
-            try:
-                if isinstance(left, str):
-                    left = int(left)
-                if isinstance(right, str):
-                    right = int(right)
-            except ValueError:
-                pass  # 保持原有类型
-
-        if operator == '=':
-            return left == right
-        elif operator == '<':
-            return left < right
-        elif operator == '>':
-            return left > right
-        else:
-            raise ValueError(f"Unsupported operator '{operator}'")
+        # 每条语句只做一次列定位与类型转换
+        schema = self.schema
+        assignments = []
+        for col, val in set_values.items():
+            assignments.append((schema.position(self.name, col), schema.convert(col, val)))
+
+        positions = self._matching_positions(where) if where else range(len(self.storage))
+        self._update_positions(positions, assignments)
+        return len(positions)
+
+    def _update_positions(self, positions, assignments):
+        # assignments 为 [(列下标, 已转换的值)]
+        updated = {col_idx for col_idx, _ in assignments}
+        affected_indexes = [index for index in self.indexes.values()
+                            if self.schema.positions[index.column_name] in updated]
+        old_rows = None
+        if self.journal.active or affected_indexes:
+            old_rows = [(pos, self.storage.get_row(pos)) for pos in positions]
+        self.storage.assign(positions, assignments)
+        self.modifications += len(positions)
+        if positions:
+            self._changed()
+        if old_rows is not None:
+            self.journal.record(self._undo_update, old_rows)
+            if affected_indexes:
+                self._reindex_rows(affected_indexes, old_rows)
+        if positions and self._logged:
+            names = {slot: name for name, slot in self.schema.positions.items()}
+            self._log('update', positions, [(names[col_idx], value) for col_idx, value in assignments])
+
+    @property
+    def _logged(self):
+        # 只有磁盘表需要写预写日志
+        return self.journal.wal is not None and self.storage.storage_type == 'DISK'
+
+    def _log(self, *op):
+        # 日志记录按列名与列的顺序记录，与物理槽位无关：重放时的槽位布局可能不同（如回滚过的 ADD COLUMN 留下的空槽位）
+        if self._logged:
+            self.journal.log(op[0], self.name, *op[1:])
+
+    def _matching_positions(self, where):
+        # 返回满足 WHERE 条件的行位置（升序），按规划器选择的顺序与访问路径求值
+        return self._planned_positions(self.plan(None, where))
+
+    @timed_phase('filter')
+    def _planned_positions(self, plan):
+        # 返回 None 表示全部行
+        positions = None
+        for i, (expr, _) in enumerate(plan.steps):
+            positions = self._evaluate(expr, positions, use_index=i > 0 or plan.index is not None)
+            if not positions:
+                break
+        return positions
+
+    def _evaluate(self, where, candidates=None, use_index=True):
+        # where 为语法树节点或 (列, 运算符, 值) 三元组。candidates 为 None 时对整列求值；
+        # 否则只对候选位置上的值求值，返回其中满足条件的位置
+        kind = type(where)
+        if kind is And:
+            for item in where.items:
+                candidates = self._evaluate(item, candidates, use_index)
+                if not candidates:
+                    break
+            return candidates
+        if kind is Or:
+            return union_positions([self._evaluate(item, candidates, use_index) for item in where.items])
+        if kind is Not:
+            return self._evaluate(negate(where.item), candidates, use_index)
+        if kind is Between:
+            if not where.negated:
+                return self._evaluate(Range(where.column, where.low, where.high, True, True), candidates, use_index)
+            low = Comparison(where.column, '<', where.low)
+            high = Comparison(where.column, '>', where.high)
+            return self._evaluate(Or((low, high)), candidates, use_index)
+        if kind is Range:
+            if where.low is None or where.high is None:
+                return []  # 与 NULL 比较的结果不为真
+            if candidates is None and use_index:
+                positions = self._range_lookup(where)
+                if positions is not None:
+                    return positions
+            low = Comparison(where.column, '>=' if where.low_inclusive else '>', where.low)
+            high = Comparison(where.column, '<=' if where.high_inclusive else '<', where.high)
+            return self._evaluate(And((low, high)), candidates, use_index)
+        col_idx = self.schema.position(self.name, where[0])
+        if candidates is not None:
+            record_scan(len(candidates))
+            if kind is Comparison:
+                positions = self._compare_encoded(col_idx, where, candidates)
+                if positions is not None:
+                    return positions
+            hits = self._compile_leaf(where)(self.storage.take(candidates, col_idx))
+            return list(map(candidates.__getitem__, hits))
+        if kind is In:
+            return self._in_positions(where, use_index)
+        if kind is Like:
+            record_scan(len(self.storage))
+            return self._compile_leaf(where)(self.storage.column(col_idx))
+        return self._comparison_positions(where, use_index)
+
+    def _compile_leaf(self, where):
+        kind = type(where)
+        if kind is In:
+            return compile_in(where.values, where.negated)
+        if kind is Like:
+            return compile_like(where.pattern, where.negated)
+        where_col, operator, where_val = where
+        if where_val is None:
+            return lambda values: []  # 与 NULL 比较的结果不为真
+        return compile_predicate(operator, where_val)
+
+    def _in_positions(self, where, use_index=True):
+        column, values, negated = where
+        if use_index and not negated:
+            # 每个值都能走索引时合并各次等值查找的结果
+            lookups = [self._index_lookup((column, '=', value)) for value in values if value is not None]
+            if all(positions is not None for positions in lookups):
+                return union_positions(lookups)
+        record_scan(len(self.storage))
+        return self._compile_leaf(where)(self.storage.column(self.schema.positions[column]))
+
+    def _comparison_positions(self, where, use_index=True):
+        # 命中索引时不扫描全表
+        where_col, operator, where_val = where
+        if where_val is None:
+            return []  # 与 NULL 比较的结果不为真
+        if use_index:
+            positions = self._index_lookup(where)
+            if positions is not None:
+                return positions
+        col_idx = self.schema.positions[where_col]
+        record_scan(len(self.storage))
+        if self.scanner is not None:
+            positions = self.scanner.scan(self.storage, col_idx, operator, where_val)
+            if positions is not None:
+                return positions
+        positions = self._compare_encoded(col_idx, where)
+        if positions is not None:
+            return positions
+        scan = compile_predicate(operator, where_val)
+        return scan(self.storage.column(col_idx))
+
+    def _compare_encoded(self, col_idx, where, candidates=None):
+        # 列存储的定长列直接比较编码后的数组，不解码；其他情况返回 None
+        where_col, operator, where_val = where
+        if self.storage.storage_type != 'COLUMNAR':
+            return None
+        if where_val is None:
+            return []  # 与 NULL 比较的结果不为真
+        return self.storage.compare(col_idx, operator, where_val, candidates)
 
     def add_column(self, column_name, column_type):
-        if column_name in self.columns:
-            print(f"Column '{column_name}' already exists in table '{self.name}'.")
-            return
-        self.columns[column_name] = column_type.upper()
-        self.column_names.append(column_name)
-        # 为现有行添加默认值 None
-        for row in self.rows:
-            row.append(None)
-        print(f"Added column '{column_name}' of type '{column_type}' to table '{self.name}'.")
+        # 新列占用末尾的新槽位，已有的行不改写，读取时新列为 NULL
+        if column_name in self.schema:
+            return False
+        self.journal.record(self._undo_add_column, self.schema)
+        self.schema = self.schema.with_column(column_name, column_type)
+        self.storage.add_column(column_type.upper())
+        self.stats = None
+        self._changed()
+        self._log('add_column', column_name, column_type)
+        return True
 
     def drop_column(self, column_name):
-        if column_name not in self.columns:
-            print(f"Column '{column_name}' does not exist in table '{self.name}'.")
-            return
-        idx = self.column_names.index(column_name)
-        del self.columns[column_name]
-        self.column_names.remove(column_name)
-        for row in self.rows:
-            del row[idx]
-        print(f"Dropped column '{column_name}' from table '{self.name}'.")
+        # 只从表结构中去掉该列，行中的旧值留到压缩时才清除
+        if column_name not in self.schema:
+            return False
+        schema = self.schema
+        self.schema = schema.without_column(column_name)
+        self.stats = None
+        self._changed()
+        # 删除列上的索引随列一起删除
+        dropped_indexes = [index for index in self.indexes.values() if index.column_name == column_name]
+        for index in dropped_indexes:
+            del self.indexes[index.name]
+        self.journal.record(self._undo_drop_column, schema, dropped_indexes)
+        self._log('drop_column', column_name)
+        return True
+
+    @property
+    def needs_compaction(self):
+        # 有已删除列留下的槽位，或有 ADD COLUMN 之前写入的短行
+        return not self.schema.compact or self.storage.full_width < self.storage.width
+
+    def compact(self):
+        # 把所有行改写为当前表结构的紧凑布局，返回是否改写了；行的位置不变，索引不受影响。
+        # 压缩不改变表的内容，不写日志，也不记入撤销日志：调用方须在事务之外持有表的排他锁
+        if not self.needs_compaction:
+            return False
+        schema = self.schema
+        self.storage.compact(schema.slots, list(schema.columns.values()))
+        self.schema = schema.compacted()
+        return True
 
     def modify_column(self, column_name, new_column_type):
-        if column_name not in self.columns:
-            print(f"Column '{column_name}' does not exist in table '{self.name}'.")
+        # 对整列做一次类型转换；有无法转换的值时报告其个数与第一个值，表保持不变
+        if column_name not in self.schema:
+            return False
+        schema = self.schema
+        new_schema = schema.with_type(column_name, new_column_type)
+        slot = schema.positions[column_name]
+        old_values = self.storage.column(slot)
+        values, failures = convert_values(new_schema.converters[column_name], old_values)
+        if failures:
+            pos, value = failures[0]
+            raise ValueError(f"Cannot convert column '{column_name}' to {new_schema.columns[column_name]}: "
+                             f"{len(failures)} value(s) are invalid, the first is {value!r} at row {pos}.")
+        self.journal.record(self._undo_modify_column, schema, column_name, old_values)
+        self.schema = new_schema
+        self._replace_column(column_name, values)
+        self._log('modify_column', column_name, new_column_type)
+        return True
+
+    def _replace_column(self, column_name, values):
+        self.storage.replace_column(self.schema.positions[column_name], self.columns[column_name], values)
+        for index in self.indexes.values():
+            if index.column_name == column_name:
+                index.build(values)
+        self.stats = None
+        self._changed()
+
+    def create_index(self, index_name, column_name, index_type='SORTED'):
+        if column_name not in self.schema:
+            raise ValueError(f"Column '{column_name}' does not exist in table '{self.name}'.")
+        index = self._build_index(index_name, column_name, index_type)
+        self.journal.record(self._undo_create_index, index_name)
+        self._log('create_index', index_name, column_name, index.index_type)
+        return index
+
+    def _build_index(self, index_name, column_name, index_type):
+        index = create_index(index_name, column_name, index_type)
+        index.build(self.storage.column(self.schema.positions[column_name]))
+        self.indexes[index_name] = index
+        return index
+
+    def drop_index(self, index_name):
+        if index_name not in self.indexes:
+            raise ValueError(f"Index '{index_name}' does not exist.")
+        self.journal.record(self._undo_drop_index, self.indexes.pop(index_name))
+        self._log('drop_index', index_name)
+
+    def _index_lookup(self, where):
+        # 返回满足 WHERE 条件的行位置（升序），没有可用索引时返回 None
+        where_col, operator, where_val = where
+        index = self._usable_index(where_col, operator, where_val)
+        if index is None:
+            return None
+        record_index_hit()
+        return sorted(index.lookup(operator, where_val))
+
+    def _range_lookup(self, where):
+        # 有序索引上一次查找 Range 的两个边界之间的行（升序），没有可用索引时返回 None
+        index = self.index_for(where)
+        if index is None:
+            return None
+        record_index_hit()
+        return sorted(index.range_lookup(where.low, where.high, where.low_inclusive, where.high_inclusive))
+
+    def _usable_index(self, where_col, operator, where_val):
+        if where_val is None:
+            return None
+        usable = None
+        for index in self.indexes.values():
+            if index.column_name == where_col and operator in index.operators:
+                if index.index_type == 'HASH':
+                    return index  # 等值查询优先使用哈希索引
+                if usable is None:
+                    usable = index
+        return usable
+
+    def index_for(self, where):
+        # 规划器用：返回能直接回答该条件的索引，没有时返回 None
+        kind = type(where)
+        if kind is In:
+            if where.negated:
+                return None
+            indexes = [self._usable_index(where.column, '=', value) for value in where.values if value is not None]
+            return indexes[0] if indexes and None not in indexes else None
+        if kind is Range or kind is Between:
+            if kind is Between and where.negated:
+                return None
+            low = self._usable_index(where.column, '>=', where.low)
+            return low if low is not None and self._usable_index(where.column, '<=', where.high) else None
+        if kind in (And, Or, Not, Like):
+            return None
+        return self._usable_index(*where)
+
+    def _reindex_rows(self, indexes, old_rows):
+        # old_rows 为 [(位置, 改动前的行)]，行已改写
+        if len(old_rows) > len(self.storage) * REINDEX_FRACTION:
+            for index in indexes:
+                index.build(self.storage.column(self.schema.positions[index.column_name]))
             return
-        self.columns[column_name] = new_column_type.upper()
-        print(f"Modified column '{column_name}' to type '{new_column_type}' in table '{self.name}'.")
+        for pos, old_row in old_rows:
+            self._reindex_row(indexes, pos, old_row)
+
+    def _reindex_row(self, indexes, pos, old_row):
+        for index in indexes:
+            col_idx = self.schema.positions[index.column_name]
+            new_value = self.storage.get_cell(pos, col_idx)
+            if old_row[col_idx] != new_value:
+                index.remove(old_row[col_idx], pos)
+                index.add(new_value, pos)
+
+    def _rebuild_indexes(self):
+        for index in self.indexes.values():
+            index.build(self.storage.column(self.schema.positions[index.column_name]))
+
+    def storage_report(self):
+        # 报告实际占用的内存，以及同样的数据放在行存储中的估算值
+        used = self.storage.memory_usage()
+        if self.storage.storage_type == 'ROW':
+            row_store = used
+        else:
+            row_store = self.storage.row_store_estimate()
+        return {
+            'table': self.name,
+            'storage': self.storage.storage_type,
+            'rows': len(self.storage),
+            'bytes': used,
+            'row_store_bytes': row_store,
+            'saved_bytes': row_store - used,
+        }
+
+    # 以下为撤销日志的回放函数，按记录的逆序调用，调用时表的状态与写操作刚完成时一致
+
+    def _undo_insert(self):
+        self._changed()
+        row = self.storage.pop()
+        pos = len(self.storage)
+        for index in self.indexes.values():
+            index.remove(row[self.schema.positions[index.column_name]], pos)
+
+    def _undo_bulk_insert(self, start):
+        self.storage.delete(range(start, len(self.storage)))
+        self._rebuild_indexes()
+        self._changed()
+
+    def _undo_delete(self, deleted):
+        self.storage.insert_rows(deleted)
+        self._rebuild_indexes()
+        self._changed()
+
+    def _undo_delete_all(self, state):
+        self.storage.restore(state)
+        self._rebuild_indexes()
+        self._changed()
+
+    def _undo_update(self, changes):
+        self._changed()
+        replaced = []
+        for pos, old_row in reversed(changes):
+            replaced.append((pos, self.storage.get_row(pos)))
+            self.storage.set_row(pos, old_row)
+        self._reindex_rows(list(self.indexes.values()), replaced)
+
+    def _undo_add_column(self, schema):
+        self.storage.remove_column()
+        self.schema = schema
+        self._changed()
+
+    def _undo_drop_column(self, schema, dropped_indexes):
+        # 行中的值没有被改写，换回旧的表结构即可
+        self.schema = schema
+        self._changed()
+        for index in dropped_indexes:
+            self.indexes[index.name] = index
+
+    def _undo_modify_column(self, schema, column_name, values):
+        self.schema = schema
+        self._replace_column(column_name, values)
+
+    def _undo_create_index(self, index_name):
+        del self.indexes[index_name]
+
+    def _undo_drop_index(self, index):
+        self.indexes[index.name] = index
+        index.build(self.storage.column(self.schema.positions[index.column_name]))
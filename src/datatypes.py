@@ -0,0 +1,107 @@
+# src/datatypes.py
+
+import datetime
+
+# 列类型。每种类型给出：
+#   python_type  列中的值在 Python 中的类型
+#   convert      写入时把值转换为该类型，无法转换时抛出 ValueError / TypeError
+#   literal      WHERE 中的常量在规划查询时按列的类型转换一次，之后逐行比较时两侧类型一致，不再做任何转换
+#   typecode     定长类型在列存储中的 array 类型码；encode / decode 在值与定长表示之间转换，编码保持值的顺序，
+#                磁盘页中以对应的二进制标记存放（见 src/disk_storage.py 的 encode_row）
+# 未知的类型名（如 VARCHAR）按 TEXT 处理
+
+EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+class ColumnType:
+    __slots__ = ('name', 'python_type', 'convert', 'literal', 'typecode', 'encode', 'decode')
+
+    def __init__(self, name, python_type, convert, literal=None, typecode=None, encode=None, decode=None):
+        self.name = name
+        self.python_type = python_type
+        self.convert = convert
+        self.literal = literal or convert
+        self.typecode = typecode
+        self.encode = encode
+        self.decode = decode
+
+def _numeric_literal(value):
+    # INT 列与 2.5 比较时保留 2.5（float 的比较方法可以直接与 int 比较），字符串按数值解析
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value).strip()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+_BOOLEAN_NAMES = {'true': True, 't': True, 'yes': True, '1': True,
+                  'false': False, 'f': False, 'no': False, '0': False}
+
+def _to_bool(value):
+    if isinstance(value, str):
+        result = _BOOLEAN_NAMES.get(value.strip().lower())
+        if result is None:
+            raise ValueError(value)
+        return result
+    if value in (0, 1):
+        return bool(value)
+    raise ValueError(value)
+
+def _to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value).strip())
+
+def _to_timestamp(value):
+    # 带时区的时间换算为 UTC 后去掉时区，列中的值都是不带时区的时间
+    if isinstance(value, datetime.datetime):
+        timestamp = value
+    elif isinstance(value, datetime.date):
+        timestamp = datetime.datetime.combine(value, datetime.time())
+    else:
+        timestamp = datetime.datetime.fromisoformat(str(value).strip())
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def _encode_timestamp(value):
+    return (value - EPOCH) // _MICROSECOND
+
+def _decode_timestamp(micros):
+    return EPOCH + datetime.timedelta(microseconds=micros)
+
+INT = ColumnType('INT', int, int, _numeric_literal, 'q')
+FLOAT = ColumnType('FLOAT', float, float, typecode='d')
+BOOLEAN = ColumnType('BOOLEAN', bool, _to_bool, typecode='b', decode=bool)
+DATE = ColumnType('DATE', datetime.date, _to_date, typecode='i',
+                  encode=datetime.date.toordinal, decode=datetime.date.fromordinal)
+TIMESTAMP = ColumnType('TIMESTAMP', datetime.datetime, _to_timestamp, typecode='q',
+                       encode=_encode_timestamp, decode=_decode_timestamp)
+TEXT = ColumnType('TEXT', str, str)
+
+COLUMN_TYPES = {column_type.name: column_type for column_type in (INT, FLOAT, BOOLEAN, DATE, TIMESTAMP, TEXT)}
+COLUMN_TYPES.update({'INTEGER': INT, 'BIGINT': INT, 'REAL': FLOAT, 'DOUBLE': FLOAT,
+                     'BOOL': BOOLEAN, 'DATETIME': TIMESTAMP})
+
+def column_type(name):
+    return COLUMN_TYPES.get(name.upper(), TEXT) if name is not None else TEXT
+
+def convert_values(convert, values):
+    # 对一列整体做一次转换；返回 (转换后的值, 无法转换的 [(位置, 值)])，NULL 保持不变
+    try:
+        if None in values:
+            return [None if value is None else convert(value) for value in values], []
+        return list(map(convert, values)), []
+    except (ValueError, TypeError, OverflowError):
+        pass
+    converted, failures = [], []
+    for pos, value in enumerate(values):
+        try:
+            converted.append(None if value is None else convert(value))
+        except (ValueError, TypeError, OverflowError):
+            converted.append(None)
+            failures.append((pos, value))
+    return converted, failures
@@ -0,0 +1,556 @@
+# src/disk_storage.py
+
+import datetime
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from operator import itemgetter
+
+from src import datatypes
+
+PAGE_SIZE = 8192
+
+_PAGE_HEADER = struct.Struct('<H')  # 页内记录数
+_ROW_HEADER = struct.Struct('<H')   # 行内值的个数
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+_DATE = struct.Struct('<i')
+_LENGTH = struct.Struct('<I')
+
+TAG_NULL = 0
+TAG_INT = 1
+TAG_STR = 2
+TAG_BIGINT = 3  # 超出 64 位的整数以十进制文本存放
+TAG_FLOAT = 4
+TAG_BOOL = 5       # 1 字节
+TAG_DATE = 6       # 距公元 1 年 1 月 1 日的天数（int32）
+TAG_TIMESTAMP = 7  # 距 1970-01-01 00:00:00 的微秒数（int64）
+
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+def encode_row(row):
+    out = bytearray(_ROW_HEADER.pack(len(row)))
+    for value in row:
+        if value is None:
+            out.append(TAG_NULL)
+        elif type(value) is int and _INT_MIN <= value <= _INT_MAX:
+            out.append(TAG_INT)
+            out += _INT.pack(value)
+        elif type(value) is float:
+            out.append(TAG_FLOAT)
+            out += _FLOAT.pack(value)
+        elif type(value) is bool:
+            out.append(TAG_BOOL)
+            out.append(value)
+        elif type(value) is datetime.date:
+            out.append(TAG_DATE)
+            out += _DATE.pack(value.toordinal())
+        elif type(value) is datetime.datetime:
+            out.append(TAG_TIMESTAMP)
+            out += _INT.pack(datatypes.TIMESTAMP.encode(value))
+        else:
+            tag = TAG_BIGINT if type(value) is int else TAG_STR
+            data = str(value).encode('utf-8')
+            out.append(tag)
+            out += _LENGTH.pack(len(data))
+            out += data
+    return bytes(out)
+
+def encode_rows(rows):
+    # 与页内格式相同：记录数 + 逐行编码，decode_rows 可以直接解码
+    return _PAGE_HEADER.pack(len(rows)) + b''.join(map(encode_row, rows))
+
+def decode_rows(data):
+    count, = _PAGE_HEADER.unpack_from(data, 0)
+    offset = _PAGE_HEADER.size
+    rows = []
+    for _ in range(count):
+        width, = _ROW_HEADER.unpack_from(data, offset)
+        offset += _ROW_HEADER.size
+        row = []
+        for _ in range(width):
+            tag = data[offset]
+            offset += 1
+            if tag == TAG_NULL:
+                row.append(None)
+            elif tag == TAG_INT:
+                row.append(_INT.unpack_from(data, offset)[0])
+                offset += _INT.size
+            elif tag == TAG_FLOAT:
+                row.append(_FLOAT.unpack_from(data, offset)[0])
+                offset += _FLOAT.size
+            elif tag == TAG_BOOL:
+                row.append(bool(data[offset]))
+                offset += 1
+            elif tag == TAG_DATE:
+                row.append(datetime.date.fromordinal(_DATE.unpack_from(data, offset)[0]))
+                offset += _DATE.size
+            elif tag == TAG_TIMESTAMP:
+                row.append(datatypes.TIMESTAMP.decode(_INT.unpack_from(data, offset)[0]))
+                offset += _INT.size
+            else:
+                length, = _LENGTH.unpack_from(data, offset)
+                offset += _LENGTH.size
+                text = data[offset:offset + length].decode('utf-8')
+                offset += length
+                row.append(int(text) if tag == TAG_BIGINT else text)
+        rows.append(tuple(row))
+    return rows
+
+def row_size(row):
+    return len(encode_row(row))
+
+class Page:
+    __slots__ = ('page_id', 'rows', 'size', 'dirty')
+
+    def __init__(self, page_id, rows, size=None, dirty=False):
+        self.page_id = page_id
+        self.rows = rows
+        self.size = size if size is not None else _PAGE_HEADER.size + sum(map(row_size, rows))
+        self.dirty = dirty
+
+    def encode(self):
+        return encode_rows(self.rows).ljust(PAGE_SIZE, b'\0')
+
+class HeapFile:
+    # 每张表一个堆文件，由定长页组成，按页号用 pread / pwrite 读写
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        self.page_count = os.fstat(self.fd).st_size // PAGE_SIZE
+        self.free_pages = []
+        self.reads = 0
+        self.writes = 0
+
+    def allocate(self):
+        if self.free_pages:
+            return self.free_pages.pop()
+        page_id = self.page_count
+        self.page_count += 1
+        return page_id
+
+    def free(self, page_id):
+        self.free_pages.append(page_id)
+
+    def read_page(self, page_id):
+        self.reads += 1
+        if hasattr(os, 'pread'):
+            data = os.pread(self.fd, PAGE_SIZE, page_id * PAGE_SIZE)
+        else:
+            os.lseek(self.fd, page_id * PAGE_SIZE, os.SEEK_SET)
+            data = os.read(self.fd, PAGE_SIZE)
+        return Page(page_id, decode_rows(data))
+
+    def write_page(self, page):
+        self.writes += 1
+        data = page.encode()
+        if hasattr(os, 'pwrite'):
+            os.pwrite(self.fd, data, page.page_id * PAGE_SIZE)
+        else:
+            os.lseek(self.fd, page.page_id * PAGE_SIZE, os.SEEK_SET)
+            os.write(self.fd, data)
+        page.dirty = False
+
+    def sync(self):
+        os.fsync(self.fd)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+class BufferPool:
+    # 所有堆文件共享的有界 LRU 页缓存，淘汰脏页时写回磁盘
+    def __init__(self, capacity=1024):
+        if capacity < 2:
+            raise ValueError("Buffer pool needs at least 2 pages.")
+        self.capacity = capacity
+        self.pages = OrderedDict()  # (heap, page_id) -> Page
+        self.hits = 0
+        self.misses = 0
+        # 不同线程可能同时读写不同的表，它们共享这个缓冲池
+        self.lock = threading.RLock()
+
+    def get(self, heap, page_id):
+        key = (heap, page_id)
+        with self.lock:
+            page = self.pages.get(key)
+            if page is not None:
+                self.pages.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+            page = heap.read_page(page_id)
+            self._admit(key, page)
+            return page
+
+    def put(self, heap, page):
+        page.dirty = True
+        with self.lock:
+            self._admit((heap, page.page_id), page)
+
+    def discard(self, heap, page_id):
+        with self.lock:
+            self.pages.pop((heap, page_id), None)
+
+    def _admit(self, key, page):
+        self.pages[key] = page
+        self.pages.move_to_end(key)
+        while len(self.pages) > self.capacity:
+            (heap, _), victim = self.pages.popitem(last=False)
+            if victim.dirty:
+                heap.write_page(victim)
+
+    def flush(self, heap=None):
+        with self.lock:
+            for (page_heap, _), page in self.pages.items():
+                if page.dirty and (heap is None or page_heap is heap):
+                    page_heap.write_page(page)
+
+    def drop(self, heap):
+        with self.lock:
+            for key in [key for key in self.pages if key[0] is heap]:
+                del self.pages[key]
+
+class DiskStorage:
+    # 基于堆文件的存储：目录按逻辑顺序记录页号与每页行数，行位置通过累计行数二分定位到页。
+    # 上一个检查点引用的页（stable）不会被原地覆盖，修改时先复制到新页，
+    # 因此崩溃后磁盘上总有一个完整的检查点状态。
+    # 与行存储相同，ADD COLUMN 不改写已有的行：短于 width 的行缺少的槽位读作 NULL，full_width 为所有行都具有的槽位数
+    storage_type = 'DISK'
+
+    def __init__(self, column_types, heap, buffer_pool, directory=None, full_width=None):
+        self.heap = heap
+        self.pool = buffer_pool
+        self.width = len(column_types)
+        self.full_width = self.width if full_width is None else full_width
+        self.page_ids, self.counts = directory if directory is not None else ([], [])
+        self.mark_stable()
+        self._reindex()
+
+    def mark_stable(self):
+        # 检查点完成后调用：当前目录成为新的稳定状态，其余页都可以复用
+        self.stable = set(self.page_ids)
+        self.heap.free_pages = [pid for pid in range(self.heap.page_count - 1, -1, -1) if pid not in self.stable]
+
+    def _reindex(self):
+        self.starts = list(accumulate(self.counts[:-1], initial=0)) if self.counts else []
+        self.row_count = sum(self.counts)
+
+    def _page(self, i):
+        return self.pool.get(self.heap, self.page_ids[i])
+
+    def _pad(self, row):
+        return row + (None,) * (self.width - len(row)) if len(row) < self.width else row
+
+    def _page_rows(self, i, col_indices):
+        # 第 i 页的行；读取的槽位超出 full_width 时逐行补齐
+        rows = self._page(i).rows
+        if col_indices and max(col_indices) >= self.full_width:
+            return list(map(self._pad, rows))
+        return rows
+
+    def _row(self, pos):
+        i, offset = self._locate(pos)
+        return self._pad(self._page(i).rows[offset])
+
+    def _writable_page(self, i):
+        page = self._page(i)
+        if page.page_id in self.stable:
+            # 写时复制：稳定页保持原样，修改写到新分配的页
+            self.pool.discard(self.heap, page.page_id)
+            page = Page(self.heap.allocate(), page.rows, page.size)
+            self.pool.put(self.heap, page)
+            self.page_ids[i] = page.page_id
+        return page
+
+    def _locate(self, pos):
+        i = bisect_right(self.starts, pos) - 1
+        return i, pos - self.starts[i]
+
+    def _new_page(self, rows, i):
+        page = Page(self.heap.allocate(), rows)
+        self.pool.put(self.heap, page)
+        self.page_ids.insert(i, page.page_id)
+        self.counts.insert(i, len(rows))
+        return page
+
+    def _free_page(self, i):
+        page_id = self.page_ids.pop(i)
+        self.counts.pop(i)
+        self.pool.discard(self.heap, page_id)
+        if page_id not in self.stable:
+            self.heap.free(page_id)  # 稳定页要等下一个检查点之后才能复用
+
+    def _split(self, i):
+        # 页溢出时把后半部分的行移到紧随其后的新页，必要时继续拆分
+        page = self._writable_page(i)
+        while page.size > PAGE_SIZE:
+            half = len(page.rows) // 2
+            moved = page.rows[half:]
+            del page.rows[half:]
+            page.size = Page(page.page_id, page.rows).size
+            page.dirty = True
+            self.counts[i] = len(page.rows)
+            self._new_page(moved, i + 1)
+            if page.size <= PAGE_SIZE:
+                i += 1
+                page = self._writable_page(i)
+
+    def _check_size(self, row):
+        size = row_size(row)
+        if _PAGE_HEADER.size + size > PAGE_SIZE:
+            raise ValueError(f"Row is too large for a {PAGE_SIZE}-byte page.")
+        return size
+
+    def __len__(self):
+        return self.row_count
+
+    def append(self, values):
+        values = tuple(values)
+        size = self._check_size(values)
+        if self.page_ids:
+            page = self._page(-1)
+            if page.size + size <= PAGE_SIZE:
+                page = self._writable_page(len(self.page_ids) - 1)
+                page.rows.append(values)
+                page.size += size
+                page.dirty = True
+                self.counts[-1] += 1
+                self.row_count += 1
+                return
+        self.starts.append(self.row_count)
+        self._new_page([values], len(self.page_ids))
+        self.row_count += 1
+
+    def extend(self, rows):
+        # 批量追加：先填满最后一页，其余行依次装入新页
+        sizes = [self._check_size(row) for row in rows]
+        page = None
+        if self.page_ids and self._page(-1).size < PAGE_SIZE:
+            page = self._writable_page(len(self.page_ids) - 1)
+        for row, size in zip(rows, sizes):
+            if page is None or page.size + size > PAGE_SIZE:
+                self.starts.append(self.row_count)
+                page = self._new_page([], len(self.page_ids))
+            page.rows.append(tuple(row))
+            page.size += size
+            page.dirty = True
+            self.counts[-1] += 1
+            self.row_count += 1
+
+    def pop(self):
+        page = self._writable_page(len(self.page_ids) - 1)
+        row = page.rows.pop()
+        page.size -= row_size(row)
+        page.dirty = True
+        self.counts[-1] -= 1
+        self.row_count -= 1
+        if not page.rows:
+            self._free_page(len(self.page_ids) - 1)
+            self.starts.pop()
+        return self._pad(row)
+
+    def get_row(self, pos):
+        return list(self._row(pos))
+
+    def get_cell(self, pos, col_idx):
+        return self._row(pos)[col_idx]
+
+    def _replace_row(self, pos, row):
+        size = self._check_size(row)
+        i, offset = self._locate(pos)
+        page = self._writable_page(i)
+        page.size += size - row_size(page.rows[offset])
+        page.rows[offset] = row
+        page.dirty = True
+        if page.size > PAGE_SIZE:
+            self._split(i)
+            self._reindex()
+
+    def set_cell(self, pos, col_idx, value):
+        row = self.get_row(pos)
+        row[col_idx] = value
+        self._replace_row(pos, tuple(row))
+
+    def set_row(self, pos, values):
+        self._replace_row(pos, tuple(values))
+
+    def column(self, col_idx):
+        values = []
+        for i in range(len(self.page_ids)):
+            values.extend(row[col_idx] for row in self._page_rows(i, (col_idx,)))
+        return values
+
+    def project(self, positions, col_indices):
+        result = []
+        if positions is None:
+            for i in range(len(self.page_ids)):
+                result.extend([row[idx] for idx in col_indices] for row in self._page_rows(i, col_indices))
+            return result
+        # positions 升序，只读取命中的页
+        for pos in positions:
+            row = self._row(pos)
+            result.append([row[idx] for idx in col_indices])
+        return result
+
+    def column_batches(self, positions, col_indices, batch_size=None):
+        # 无 positions 时每页一批；否则按 batch_size（默认每页的平均行数）分批，只读取命中的页
+        if positions is None:
+            batches = (self._page_rows(i, col_indices) for i in range(len(self.page_ids)))
+        else:
+            batch_size = batch_size or max(1, self.row_count // max(1, len(self.page_ids)))
+            projected = list(col_indices)
+            batches = (self.project(positions[start:start + batch_size], projected)
+                       for start in range(0, len(positions), batch_size))
+            col_indices = range(len(projected))
+        for rows in batches:
+            yield len(rows), [list(map(itemgetter(idx), rows)) for idx in col_indices]
+
+    def take(self, positions, col_idx):
+        return [self._row(pos)[col_idx] for pos in positions]
+
+    def scan(self, positions, col_indices):
+        # 逐页读取并生成投影结果，任一时刻只引用一页
+        if positions is None:
+            for i in range(len(self.page_ids)):
+                rows = self._page_rows(i, col_indices)
+                yield from ([row[idx] for idx in col_indices] for row in rows)
+            return
+        for pos in positions:
+            row = self._row(pos)
+            yield [row[idx] for idx in col_indices]
+
+    def assign(self, positions, assignments):
+        for pos in positions:
+            row = self.get_row(pos)
+            for col_idx, value in assignments:
+                row[col_idx] = value
+            self._replace_row(pos, tuple(row))
+
+    def delete(self, positions):
+        by_page = {}
+        for pos in positions:
+            i, offset = self._locate(pos)
+            by_page.setdefault(i, set()).add(offset)
+        # 从后往前处理，释放空页不会影响前面页的下标
+        for i in sorted(by_page, reverse=True):
+            doomed = by_page[i]
+            page = self._writable_page(i)
+            page.rows = [row for offset, row in enumerate(page.rows) if offset not in doomed]
+            if page.rows:
+                page.size = Page(page.page_id, page.rows).size
+                page.dirty = True
+                self.counts[i] = len(page.rows)
+            else:
+                self._free_page(i)
+        self._reindex()
+
+    def insert_rows(self, entries):
+        for pos, row in entries:
+            row = tuple(row)
+            self._check_size(row)
+            if pos == self.row_count:
+                self.append(row)
+                continue
+            i, offset = self._locate(pos)
+            page = self._writable_page(i)
+            page.rows.insert(offset, row)
+            page.size += row_size(row)
+            page.dirty = True
+            self.counts[i] += 1
+            if page.size > PAGE_SIZE:
+                self._split(i)
+            self._reindex()
+
+    def truncate(self):
+        # 旧页保留在文件中以便回滚；提交后它们不再被目录引用，下一个检查点时回收
+        state = (self.page_ids, self.counts, self.full_width)
+        self.page_ids, self.counts = [], []
+        self.full_width = self.width
+        self._reindex()
+        return state
+
+    def restore(self, state):
+        self.page_ids, self.counts, self.full_width = state
+        self._reindex()
+
+    def load(self, rows):
+        while self.page_ids:
+            self._free_page(len(self.page_ids) - 1)
+        self._reindex()
+        self.full_width = self.width
+        for row in rows:
+            self.full_width = min(self.full_width, len(row))
+            self.append(row)
+
+    def to_rows(self):
+        return self.project(None, range(self.width))
+
+    def _rewrite(self, fn):
+        # 每一行替换为 fn(行) 后重新计算页大小，溢出的页就地拆分
+        i = 0
+        while i < len(self.page_ids):
+            page = self._writable_page(i)
+            page.rows = list(map(fn, page.rows))
+            page.size = Page(page.page_id, page.rows).size
+            page.dirty = True
+            page_count = len(self.page_ids)
+            if page.size > PAGE_SIZE:
+                self._split(i)
+            # 拆分出的页中的行已经替换过
+            i += 1 + len(self.page_ids) - page_count
+        self._reindex()
+
+    def add_column(self, column_type):
+        # 只增加槽位，不改写页
+        self.width += 1
+        if not self.row_count:
+            self.full_width = self.width
+
+    def remove_column(self):
+        self.width -= 1
+        self.full_width = min(self.full_width, self.width)
+
+    def compact(self, slots, column_types):
+        # 把所有行改写为按 slots 排列的紧凑布局
+        pad = self._pad
+        self._rewrite(lambda row: tuple(pad(row)[slot] for slot in slots))
+        self.width = self.full_width = len(slots)
+
+    def replace_column(self, col_idx, column_type, values):
+        # 值按自身类型编码，转换后的值按行的顺序写回
+        remaining = iter(values)
+        pad = self._pad
+
+        def replace(row):
+            row = pad(row)
+            return row[:col_idx] + (next(remaining),) + row[col_idx + 1:]
+        self._rewrite(replace)
+        if col_idx >= self.full_width:
+            self.full_width = self.width
+
+    def memory_usage(self):
+        return sys.getsizeof(self.page_ids) + sys.getsizeof(self.counts) + sys.getsizeof(self.starts)
+
+    def directory_bytes(self):
+        return array('q', self.page_ids).tobytes() + array('q', self.counts).tobytes()
+
+    def flush(self):
+        self.pool.flush(self.heap)
+        self.heap.sync()
+
+def load_directory(path):
+    if not os.path.exists(path):
+        return [], []
+    with open(path, 'rb') as f:
+        values = array('q')
+        values.frombytes(f.read())
+    half = len(values) // 2
+    return list(values[:half]), list(values[half:])
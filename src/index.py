@@ -0,0 +1,146 @@
+# src/index.py
+
+import bisect
+from itertools import chain
+
+class HashIndex:
+    index_type = 'HASH'
+    operators = ('=',)
+
+    def __init__(self, name, column_name):
+        self.name = name
+        self.column_name = column_name
+        self.buckets = {}
+
+    def build(self, values):
+        self.buckets = {}
+        for pos, value in enumerate(values):
+            self.add(value, pos)
+
+    def add(self, key, pos):
+        if key is None:
+            return  # NULL 不参与比较，不进入索引
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = [pos]
+        else:
+            bucket.append(pos)
+
+    def extend(self, keys, start):
+        # 批量加入位置 start, start + 1, ... 上的键
+        buckets = self.buckets
+        for pos, key in enumerate(keys, start):
+            if key is None:
+                continue
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [pos]
+            else:
+                bucket.append(pos)
+
+    def remove(self, key, pos):
+        if key is None:
+            return
+        bucket = self.buckets[key]
+        bucket.remove(pos)
+        if not bucket:
+            del self.buckets[key]
+
+    def key_stats(self):
+        # (不同键的个数, 非 NULL 的行数, 可以求最小与最大值的键集合)
+        return len(self.buckets), sum(map(len, self.buckets.values())), self.buckets.keys()
+
+    def lookup(self, operator, value):
+        if operator != '=':
+            raise ValueError(f"Index '{self.name}' does not support operator '{operator}'")
+        return list(self.buckets.get(value, ()))
+
+class SortedIndex:
+    index_type = 'SORTED'
+    operators = ('=', '<', '>', '<=', '>=')
+
+    def __init__(self, name, column_name):
+        self.name = name
+        self.column_name = column_name
+        # 条目按 (键, 位置) 排序：keys 有序，相同的键按位置排列，positions 与 keys 一一对应
+        self.keys = []
+        self.positions = []
+
+    def build(self, values):
+        entries = sorted((value, pos) for pos, value in enumerate(values) if value is not None)
+        self.keys = [key for key, _ in entries]
+        self.positions = [pos for _, pos in entries]
+
+    def _find(self, key, pos):
+        # (键, 位置) 应在的下标：先二分找到相同键的一段，再在其中按位置二分
+        keys = self.keys
+        lo = bisect.bisect_left(keys, key)
+        hi = bisect.bisect_right(keys, key, lo)
+        return bisect.bisect_left(self.positions, pos, lo, hi)
+
+    def add(self, key, pos):
+        if key is None:
+            return
+        i = self._find(key, pos)
+        self.keys.insert(i, key)
+        self.positions.insert(i, pos)
+
+    def extend(self, keys, start):
+        # 新的键先排序；都不小于已有的最大键时直接追加（按序装载的常见情况），
+        # 否则与已有的有序列表一起排序，Timsort 识别两段有序序列后只需线性归并
+        entries = sorted((key, pos) for pos, key in enumerate(keys, start) if key is not None)
+        if not entries:
+            return
+        if not self.keys or entries[0][0] >= self.keys[-1]:
+            self.keys.extend(key for key, _ in entries)
+            self.positions.extend(pos for _, pos in entries)
+            return
+        entries = sorted(chain(zip(self.keys, self.positions), entries))
+        self.keys = [key for key, _ in entries]
+        self.positions = [pos for _, pos in entries]
+
+    def remove(self, key, pos):
+        if key is None:
+            return
+        i = self._find(key, pos)
+        del self.keys[i]
+        del self.positions[i]
+
+    def key_stats(self):
+        keys = self.keys
+        return len(set(keys)), len(keys), keys[:1] + keys[-1:]
+
+    def lookup(self, operator, value):
+        if operator == '=':
+            lo = bisect.bisect_left(self.keys, value)
+            hi = bisect.bisect_right(self.keys, value)
+        elif operator == '<':
+            lo, hi = 0, bisect.bisect_left(self.keys, value)
+        elif operator == '>':
+            lo, hi = bisect.bisect_right(self.keys, value), len(self.keys)
+        elif operator == '<=':
+            lo, hi = 0, bisect.bisect_right(self.keys, value)
+        elif operator == '>=':
+            lo, hi = bisect.bisect_left(self.keys, value), len(self.keys)
+        else:
+            raise ValueError(f"Index '{self.name}' does not support operator '{operator}'")
+        return self.positions[lo:hi]
+
+    def range_lookup(self, low, high, low_inclusive=True, high_inclusive=True):
+        # 两个边界之间的键：两端各二分查找一次，只返回范围内的位置
+        keys = self.keys
+        lo = bisect.bisect_left(keys, low) if low_inclusive else bisect.bisect_right(keys, low)
+        hi = bisect.bisect_right(keys, high) if high_inclusive else bisect.bisect_left(keys, high)
+        return self.positions[lo:hi] if lo < hi else []
+
+INDEX_TYPES = {
+    'HASH': HashIndex,
+    'SORTED': SortedIndex,
+    'BTREE': SortedIndex,
+}
+
+def create_index(name, column_name, index_type='SORTED'):
+    index_cls = INDEX_TYPES.get(index_type.upper())
+    if index_cls is None:
+        raise ValueError(f"Unsupported index type '{index_type}'")
+    return index_cls(name, column_name)
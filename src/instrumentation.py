@@ -0,0 +1,244 @@
+# src/instrumentation.py
+
+import bisect
+import functools
+import sys
+import threading
+import time
+from collections import deque
+
+from src.cursor import Cursor
+
+# 语句计量：QueryExecutor(database, instrumentation=Instrumentation()) 开启。
+# 每条语句一个 StatementProfile，记录各阶段耗时、扫描与返回的行数、索引命中次数（以及可选的内存块净增量）；
+# 语句结束时汇总到 MetricsRegistry，超过阈值的记入慢查询日志，并交给注册的监听函数。
+# 执行中的语句记在线程局部变量上，表的扫描代码通过 record_scan 等函数上报；
+# 没有开启计量时这些函数只做一次线程局部变量的查找
+
+PHASES = ('parse', 'plan', 'filter', 'execute', 'fetch')
+LATENCY_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+
+_local = threading.local()
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+def record_scan(rows):
+    # 读取了 rows 行的值（全列求值、候选行求值或不带条件的全表扫描）
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        profile.rows_scanned += rows
+
+def record_index_hit():
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        profile.index_hits += 1
+
+def timed_phase(phase):
+    # 方法装饰器：开启计量时把方法的耗时计入 phase 阶段
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            profile = getattr(_local, 'profile', None)
+            if profile is None:
+                return method(*args, **kwargs)
+            token = profile.begin()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                profile.end(phase, token)
+        return wrapper
+    return decorate
+
+class StatementProfile:
+    # 一条语句的计量。各阶段的耗时互不重叠：外层阶段不含其中嵌套的阶段，total 为各阶段之和。
+    # parse 解析与绑定参数，plan 规划访问路径，filter 求 WHERE 命中的行，execute 其余的执行工作，
+    # fetch 调用方取行的时间（行在这时才拼装投影，不含调用方自己处理行的时间）
+    def __init__(self, sql, track_allocations=False):
+        self.sql = sql
+        self.action = None
+        self.started_at = time.time()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.rows_scanned = 0
+        self.rows_returned = 0
+        self.index_hits = 0
+        # 结束时加上当时的值，得到净增量；sys.getallocatedblocks() 要遍历所有内存池，默认不统计
+        self.allocated_blocks = -sys.getallocatedblocks() if track_allocations else None
+        self.error = None
+        self.nested = 0.0  # 已计入各阶段的时间，用于从外层阶段中扣除
+
+    def begin(self):
+        return time.perf_counter(), self.nested
+
+    def end(self, phase, token):
+        started, nested = token
+        elapsed = time.perf_counter() - started
+        self.phases[phase] += elapsed - (self.nested - nested)
+        self.nested = nested + elapsed
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def to_dict(self):
+        return {'sql': self.sql, 'action': self.action, 'started_at': self.started_at, 'total': self.total,
+                'phases': dict(self.phases), 'rows_scanned': self.rows_scanned,
+                'rows_returned': self.rows_returned, 'index_hits': self.index_hits,
+                'allocated_blocks': self.allocated_blocks, 'error': self.error}
+
+class MetricsRegistry:
+    # 进程内的语句指标：按语句类型累计的次数、错误数与延迟直方图，各阶段的总耗时，以及扫描 / 返回行数等总数。
+    # 每条语句结束时在一次加锁中更新；snapshot() 返回 {指标: 值}，render() 输出 Prometheus 文本格式，供外部定期抓取
+    TOTALS = ('dbms_rows_scanned_total', 'dbms_rows_returned_total', 'dbms_index_hits_total', 'dbms_slow_queries_total')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            # 语句类型 -> [次数, 错误数, 耗时之和, 各桶的计数..., 超出最大桶的计数]
+            self.statements = {}
+            self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+            self.totals = [0] * len(self.TOTALS)
+
+    def record_statement(self, profile, slow):
+        total = profile.total
+        with self.lock:
+            stats = self.statements.get(profile.action)
+            if stats is None:
+                stats = self.statements[profile.action] = [0, 0, 0.0] + [0] * (len(LATENCY_BUCKETS) + 1)
+            stats[0] += 1
+            if profile.error is not None:
+                stats[1] += 1
+            stats[2] += total
+            stats[3 + bisect.bisect_left(LATENCY_BUCKETS, total)] += 1
+            phase_seconds = self.phase_seconds
+            for phase, seconds in profile.phases.items():
+                phase_seconds[phase] += seconds
+            totals = self.totals
+            totals[0] += profile.rows_scanned
+            totals[1] += profile.rows_returned
+            totals[2] += profile.index_hits
+            totals[3] += slow
+
+    def snapshot(self):
+        values = {}
+        with self.lock:
+            for action, stats in self.statements.items():
+                label = (('action', action or 'UNKNOWN'),)
+                values[_metric_name('dbms_statements_total', label)] = stats[0]
+                values[_metric_name('dbms_statement_errors_total', label)] = stats[1]
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), stats[3:]):
+                    cumulative += count
+                    values[_metric_name('dbms_statement_seconds_bucket', label + (('le', str(bound)),))] = cumulative
+                values[_metric_name('dbms_statement_seconds_count', label)] = stats[0]
+                values[_metric_name('dbms_statement_seconds_sum', label)] = stats[2]
+            for phase, seconds in self.phase_seconds.items():
+                values[_metric_name('dbms_phase_seconds_total', (('phase', phase),))] = seconds
+            values.update(zip(self.TOTALS, self.totals))
+        return dict(sorted(values.items()))
+
+    def render(self):
+        return ''.join(f"{name} {value}\n" for name, value in self.snapshot().items())
+
+def _metric_name(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+class Instrumentation:
+    # slow_query_threshold 为慢查询的阈值（秒），最近 slow_log_size 条慢查询保存在 slow_queries 中；
+    # listeners 为监听函数，每条语句结束时以 StatementProfile 调用；track_allocations 时统计内存块的净增量
+    def __init__(self, slow_query_threshold=0.1, slow_log_size=100, listeners=(), registry=None,
+                 track_allocations=False):
+        self.slow_query_threshold = slow_query_threshold
+        self.track_allocations = track_allocations
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.listeners = list(listeners)
+        self.registry = registry if registry is not None else MetricsRegistry()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def start(self, sql):
+        profile = StatementProfile(sql, self.track_allocations)
+        _local.profile = profile
+        return profile
+
+    def track(self, profile, result):
+        # 语句已执行完；查询的结果换成计量取行时间的游标，行取完或关闭时语句才结束
+        _local.profile = None
+        if result.columns is None:
+            self.finish(profile, max(result.rowcount, 0))
+            return result
+        return ProfiledCursor(result, profile, self)
+
+    def finish(self, profile, rows_returned=0, error=None):
+        # 游标被回收时可能正在执行另一条语句，只清除属于这条语句的线程局部变量
+        if getattr(_local, 'profile', None) is profile:
+            _local.profile = None
+        profile.rows_returned = rows_returned
+        if profile.allocated_blocks is not None:
+            profile.allocated_blocks += sys.getallocatedblocks()
+        profile.error = error
+        slow = profile.total >= self.slow_query_threshold
+        self.registry.record_statement(profile, slow)
+        if slow:
+            self.slow_queries.append(profile)
+        for listener in self.listeners:
+            listener(profile)
+
+class ProfiledCursor(Cursor):
+    # 开启计量时查询返回的游标：取行的时间计入 fetch 阶段，期间的扫描计入这条语句。
+    # 行取完、关闭、取行出错或游标被回收（没有取完就丢弃）时语句结束，因此每条执行过的语句都会计入指标
+    def __init__(self, cursor, profile, instrumentation):
+        super().__init__(cursor.columns, cursor.rows, cursor.rowcount, cursor.message)
+        self.elapsed = cursor.elapsed
+        self.profile = profile
+        self.instrumentation = instrumentation
+
+    def _timed(self, method, *args):
+        profile = self.profile
+        if profile is None:
+            return method(*args)
+        _local.profile = profile
+        token = profile.begin()
+        try:
+            result = method(*args)
+        except Exception as e:
+            profile.end('fetch', token)
+            _local.profile = None
+            self._finish(None if isinstance(e, StopIteration) else str(e))  # StopIteration 表示行已取完
+            raise
+        profile.end('fetch', token)
+        _local.profile = None
+        if self.rowcount >= 0:
+            self._finish()
+        return result
+
+    def _finish(self, error=None):
+        profile, self.profile = self.profile, None
+        if profile is not None:
+            self.instrumentation.finish(profile, self.rownumber, error)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+    def close(self):
+        super().close()
+        self._finish()
+
+    def __del__(self):
+        if getattr(self, 'profile', None) is not None:
+            self._finish()
@@ -0,0 +1,292 @@
+# src/join.py
+
+import struct
+import tempfile
+from itertools import chain
+
+from src.disk_storage import decode_rows, encode_rows
+from src.sql_ast import And, columns_of, rename_columns
+
+# 溢出时的分区个数；分区仍超出内存预算时换一个散列种子再分区，最多分 MAX_SPILL_DEPTH 层
+SPILL_PARTITIONS = 16
+MAX_SPILL_DEPTH = 3
+_SPILL_BATCH = 256
+_CHUNK = struct.Struct('<I')
+
+class SpillFile:
+    # 溢出到磁盘的行：每 _SPILL_BATCH 行按页格式编码后追加到临时文件，读取时逐批解码
+    def __init__(self, directory=None):
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.buffer = []
+        self.count = 0
+
+    def append(self, row):
+        self.buffer.append(row)
+        self.count += 1
+        if len(self.buffer) >= _SPILL_BATCH:
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            data = encode_rows(self.buffer)
+            self.file.write(_CHUNK.pack(len(data)) + data)
+            self.buffer = []
+
+    def __iter__(self):
+        self._flush()
+        self.file.seek(0)
+        while True:
+            header = self.file.read(_CHUNK.size)
+            if not header:
+                return
+            size, = _CHUNK.unpack(header)
+            # decode_rows 按页内格式返回 tuple，连接的行是 list
+            yield from map(list, decode_rows(self.file.read(size)))
+
+    def close(self):
+        self.file.close()
+
+class HashJoin:
+    # 等值内连接：build 一侧按连接键建散列表，probe 一侧逐行探测并流式输出，NULL 键不参与连接。
+    # build 一侧超过 memory_rows 行时转为 Grace 散列连接：两侧按键的散列值分区写入临时文件，再逐对分区连接。
+    # 输出行总是 左侧行 + 右侧行，build_is_left 表示 build 一侧是左侧输入。
+    def __init__(self, build, build_key, probe, probe_key, build_is_left=False,
+                 memory_rows=1_000_000, spill_dir=None):
+        self.build = build
+        self.build_key = build_key
+        self.probe = probe
+        self.probe_key = probe_key
+        self.build_is_left = build_is_left
+        self.memory_rows = memory_rows
+        self.spill_dir = spill_dir
+        self.spilled_partitions = 0
+
+    def __iter__(self):
+        return self._join(iter(self.build), iter(self.probe), 0)
+
+    def _join(self, build, probe, depth):
+        build_key = self.build_key
+        table = {}
+        count = 0
+        for row in build:
+            key = row[build_key]
+            if key is None:
+                continue
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = [row]
+            else:
+                bucket.append(row)
+            count += 1
+            if count > self.memory_rows and depth < MAX_SPILL_DEPTH:
+                buffered = [row for bucket in table.values() for row in bucket]
+                table = None
+                yield from self._spill(chain(buffered, build), probe, depth)
+                return
+        probe_key = self.probe_key
+        no_match = ()
+        if self.build_is_left:
+            for row in probe:
+                for match in table.get(row[probe_key], no_match):
+                    yield match + row
+        else:
+            for row in probe:
+                for match in table.get(row[probe_key], no_match):
+                    yield row + match
+
+    def _spill(self, build, probe, depth):
+        partitions = [(SpillFile(self.spill_dir), SpillFile(self.spill_dir)) for _ in range(SPILL_PARTITIONS)]
+        self.spilled_partitions += SPILL_PARTITIONS
+        try:
+            for side, rows, key_idx in ((0, build, self.build_key), (1, probe, self.probe_key)):
+                for row in rows:
+                    key = row[key_idx]
+                    if key is not None:
+                        # 每一层使用不同的散列种子，同一分区的行在下一层会被重新打散
+                        partitions[hash((depth, key)) % SPILL_PARTITIONS][side].append(row)
+            for build_file, probe_file in partitions:
+                if build_file.count and probe_file.count:
+                    yield from self._join(iter(build_file), iter(probe_file), depth + 1)
+        finally:
+            for build_file, probe_file in partitions:
+                build_file.close()
+                probe_file.close()
+
+class MergeJoin:
+    # 等值内连接：两侧输入都已按连接键升序且不含 NULL 键（如按有序索引读出）；键相同的行分组后两两组合
+    def __init__(self, left, left_key, right, right_key):
+        self.left = left
+        self.left_key = left_key
+        self.right = right
+        self.right_key = right_key
+
+    def __iter__(self):
+        left, right = iter(self.left), iter(self.right)
+        left_key, right_key = self.left_key, self.right_key
+        l_row, r_row = next(left, None), next(right, None)
+        while l_row is not None and r_row is not None:
+            key = l_row[left_key]
+            if key < r_row[right_key]:
+                l_row = next(left, None)
+            elif key > r_row[right_key]:
+                r_row = next(right, None)
+            else:
+                group = []
+                while r_row is not None and r_row[right_key] == key:
+                    group.append(r_row)
+                    r_row = next(right, None)
+                while l_row is not None and l_row[left_key] == key:
+                    for match in group:
+                        yield l_row + match
+                    l_row = next(left, None)
+
+class JoinQuery:
+    # SELECT ... FROM t0 JOIN t1 ON ... [JOIN t2 ON ...] [WHERE ...]，按 FROM 的顺序构成左深连接树。
+    # WHERE 中的每个 AND 条件只能涉及一张表，下推到该表的扫描；每张表只读取输出与连接需要的列。
+    # 第一次连接的两侧在连接列上都有有序索引时使用归并连接，否则使用散列连接，build 一侧为估计行数较少的一侧。
+    def __init__(self, tables, joins, columns, where=None, memory_rows=1_000_000, spill_dir=None):
+        self.tables = tables
+        self.memory_rows = memory_rows
+        self.spill_dir = spill_dir
+        names = [table.name for table in tables]
+        for name in names:
+            if names.count(name) > 1:
+                raise ValueError(f"Table '{name}' appears more than once in the query.")
+
+        # 输出列与连接键都解析为 (表序号, 列名)
+        if columns == ["*"]:
+            self.outputs = [(i, col) for i, table in enumerate(tables) for col in table.column_names]
+            self.column_names = [f"{tables[i].name}.{col}" for i, col in self.outputs]
+        else:
+            self.outputs = [self._resolve(ref) for ref in columns]
+            self.column_names = list(columns)
+        self.keys = []
+        for k, join in enumerate(joins):
+            left, right = self._resolve(join['left']), self._resolve(join['right'])
+            if right[0] != k + 1:
+                left, right = right, left
+            if right[0] != k + 1 or left[0] > k:
+                raise ValueError(f"Join condition {join['left']} = {join['right']} must relate "
+                                 f"'{tables[k + 1].name}' to a preceding table.")
+            self.keys.append((left, right))
+
+        # WHERE 条件按表分组，列名去掉表名限定
+        filters = [[] for _ in tables]
+        conjuncts = [] if where is None else where.items if type(where) is And else [where]
+        for expr in conjuncts:
+            refs = {self._resolve(column) for column in columns_of(expr)}
+            positions = {i for i, _ in refs}
+            if len(positions) != 1:
+                raise ValueError("Each WHERE condition in a JOIN must reference a single table.")
+            filters[positions.pop()].append(rename_columns(expr, lambda ref: self._resolve(ref)[1]))
+        self.wheres = [None if not items else items[0] if len(items) == 1 else And(tuple(items))
+                       for items in filters]
+
+        # 投影下推：每张表需要的列，以及各表的列在连接结果中的起始位置
+        self.needed = [[] for _ in tables]
+        for i, col in self.outputs + [ref for pair in self.keys for ref in pair]:
+            if col not in self.needed[i]:
+                self.needed[i].append(col)
+        self.offsets = [0]
+        for needed in self.needed[:-1]:
+            self.offsets.append(self.offsets[-1] + len(needed))
+        self.plans = [table.plan(needed, where) for table, needed, where in zip(tables, self.needed, self.wheres)]
+        for table, plan, where in zip(tables, self.plans, self.wheres):
+            plan.estimate(table.statistics(columns_of(where) if where is not None else ()))
+        self.strategies = [self._choose(k) for k in range(len(self.keys))]
+        self.operators = []
+
+    def _resolve(self, ref):
+        if '.' in ref:
+            table_name, column = ref.split('.', 1)
+            for i, table in enumerate(self.tables):
+                if table.name == table_name:
+                    if column not in table.columns:
+                        raise ValueError(f"Column '{column}' does not exist in table '{table_name}'.")
+                    return i, column
+            raise ValueError(f"Table '{table_name}' is not part of the query.")
+        matches = [i for i, table in enumerate(self.tables) if ref in table.columns]
+        if not matches:
+            raise ValueError(f"Column '{ref}' does not exist in any joined table.")
+        if len(matches) > 1:
+            raise ValueError(f"Column '{ref}' is ambiguous.")
+        return matches[0], ref
+
+    def column_type(self, ref):
+        # 列的 ColumnType，列名可以用表名限定
+        i, column = self._resolve(ref)
+        return self.tables[i].column_type(column)
+
+    def _choose(self, k):
+        # 返回 ('MERGE', 左侧有序索引, 右侧有序索引) 或 ('HASH', build 一侧是否为左侧)
+        (left_pos, left_col), (right_pos, right_col) = self.keys[k]
+        left_table, right_table = self.tables[left_pos], self.tables[right_pos]
+        if k == 0 and left_table.columns[left_col] == right_table.columns[right_col]:
+            left_index, right_index = left_table.sorted_index(left_col), right_table.sorted_index(right_col)
+            if left_index is not None and right_index is not None:
+                return 'MERGE', left_index, right_index
+        # 之后的连接左侧是前一次连接的结果，没有行数估计，总是用新加入的表建散列表
+        build_left = k == 0 and self.plans[0].estimated_rows < self.plans[1].estimated_rows
+        return 'HASH', build_left
+
+    def _key_index(self, ref):
+        i, col = ref
+        return self.offsets[i] + self.needed[i].index(col)
+
+    def execute(self):
+        # 返回 (列名, 行生成器)；各表的 WHERE 定位立即执行，连接在取行时进行
+        strategy = self.strategies[0] if self.strategies else None
+        if strategy is not None and strategy[0] == 'MERGE':
+            stream = self.tables[0].scan_plan(self.plans[0], order_by=strategy[1])
+        else:
+            stream = self.tables[0].scan_plan(self.plans[0])
+        for k, ((left_ref, right_ref), strategy) in enumerate(zip(self.keys, self.strategies)):
+            left_key = self._key_index(left_ref)
+            right_key = self.needed[k + 1].index(right_ref[1])
+            table, plan = self.tables[k + 1], self.plans[k + 1]
+            if strategy[0] == 'MERGE':
+                operator = MergeJoin(stream, left_key, table.scan_plan(plan, order_by=strategy[2]), right_key)
+            elif strategy[1]:
+                operator = HashJoin(stream, left_key, table.scan_plan(plan), right_key, True,
+                                    self.memory_rows, self.spill_dir)
+            else:
+                operator = HashJoin(table.scan_plan(plan), right_key, stream, left_key, False,
+                                    self.memory_rows, self.spill_dir)
+            self.operators.append(operator)
+            stream = operator
+        indices = [self._key_index(ref) for ref in self.outputs]
+        return self.column_names, ([row[idx] for idx in indices] for row in stream)
+
+    def estimated_rows(self):
+        # 等值连接的经典估计：|L| * |R| / max(左键不同值个数, 右键不同值个数)
+        rows = self.plans[0].estimated_rows
+        for (left_ref, right_ref), plan in zip(self.keys, self.plans[1:]):
+            distinct = max(self._distinct(left_ref), self._distinct(right_ref), 1)
+            rows = rows * plan.estimated_rows / distinct
+        return round(rows)
+
+    def _distinct(self, ref):
+        i, col = ref
+        return self.tables[i].statistics([col]).columns[col].distinct
+
+    def describe(self, actual_rows=None):
+        # 连接按执行顺序列出，其下是各表的扫描计划（Project 为下推后读取的列）
+        lines = [f"Project: {', '.join(self.column_names)}"]
+        for k, ((left_ref, right_ref), strategy) in enumerate(zip(self.keys, self.strategies)):
+            condition = f"{self._name(left_ref)} = {self._name(right_ref)}"
+            if strategy[0] == 'MERGE':
+                lines.append(f"Merge Join: {condition} (using {strategy[1].name}, {strategy[2].name})")
+            else:
+                build = self.tables[0].name if strategy[1] else self.tables[k + 1].name
+                lines.append(f"Hash Join: {condition} (build: {build})")
+        for table, plan in zip(self.tables, self.plans):
+            lines.append(f"  Scan {table.name}:")
+            lines.extend('    ' + line for line in plan.describe()[:-1])
+        summary = f"Estimated rows: {self.estimated_rows()}"
+        if actual_rows is not None:
+            summary += f", actual rows: {actual_rows}"
+        lines.append(summary)
+        return lines
+
+    def _name(self, ref):
+        return f"{self.tables[ref[0]].name}.{ref[1]}"
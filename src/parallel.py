@@ -0,0 +1,89 @@
+# src/parallel.py
+
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from src.predicate import compile_predicate
+
+class ParallelScanner:
+    # 把一列的 WHERE 过滤切分到进程池中并行执行。
+    # 列的定长表示（array('q') 的整数或字典编码）复制到共享内存中，子进程按名字挂接，不需要序列化行；
+    # 各分片返回命中的位置，按顺序拼接。行数低于 threshold 或列不能用定长表示时返回 None，由调用方串行扫描。
+    def __init__(self, workers=None, threshold=1_000_000):
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        self.scans = 0
+
+    def scan(self, storage, col_idx, operator, value):
+        if len(storage) < self.threshold:
+            return None
+        source = _fixed_width_source(storage, col_idx, operator, value)
+        if source is None:
+            return None
+        values, value = source
+        if values is None:
+            return []  # 字典中不存在的字符串，不会有匹配
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.workers)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(values) * values.itemsize))
+        try:
+            shm.buf[:len(values) * values.itemsize] = memoryview(values).cast('B')
+            chunk = -(-len(values) // self.workers)
+            futures = [
+                self.pool.submit(_scan_chunk, shm.name, values.typecode, start, min(start + chunk, len(values)),
+                                 operator, value)
+                for start in range(0, len(values), chunk)
+            ]
+            positions = []
+            for future in futures:
+                positions.extend(future.result())
+        finally:
+            shm.close()
+            shm.unlink()
+        self.scans += 1
+        return positions
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+def _fixed_width_source(storage, col_idx, operator, value):
+    # 返回 (定长数组, 用于比较的常量)；无法并行时返回 None
+    if storage.storage_type == 'COLUMNAR':
+        column = storage.columns[col_idx]
+        if hasattr(column, 'codes'):
+            # 字典编码只保留相等关系，= 可以直接比较编码
+            if operator != '=' or not isinstance(value, str):
+                return None
+            code = column.lookup.get(value)
+            return (column.codes, code) if code is not None else (None, None)
+        if column.null_count:
+            return None
+        # 常量已按列的类型转换（见 Table._bind），与数组中的值做同样的编码后直接比较
+        encode = column.type.encode
+        return column.data, value if encode is None else encode(value)
+    if type(value) is not int:
+        return None
+    try:
+        # 行存储与磁盘存储的 INT 列在这里转换为定长数组；含 NULL 或非整数时退回串行
+        return array('q', storage.column(col_idx)), value
+    except (TypeError, OverflowError):
+        return None
+
+def _scan_chunk(name, typecode, start, stop, operator, value):
+    # 子进程与父进程共用资源跟踪器，挂接时的重复登记不影响父进程 unlink 时的注销
+    shm = shared_memory.SharedMemory(name=name)
+    values = array(typecode)
+    try:
+        values.frombytes(shm.buf[start * values.itemsize:stop * values.itemsize])
+    finally:
+        shm.close()
+    positions = compile_predicate(operator, value)(values)
+    return array('q', map(start.__add__, positions))
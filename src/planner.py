@@ -0,0 +1,276 @@
+# src/planner.py
+
+import datetime
+import operator as op
+from collections import namedtuple
+
+from src.sql_ast import And, Between, Comparison, In, Like, Not, Or, Range, columns_of, format_expr
+
+# 每列的统计信息：不同值个数、NULL 个数、最小值与最大值（列中的值无法比较大小时为 None）
+ColumnStats = namedtuple('ColumnStats', 'distinct nulls low high')
+
+# 自上次收集以来修改的行数超过收集时行数的这一比例时，统计信息视为过期
+STALE_FRACTION = 0.1
+# 无法从统计信息推算时使用的默认选择率
+DEFAULT_EQUAL_SELECTIVITY = 0.1
+DEFAULT_RANGE_SELECTIVITY = 1 / 3
+DEFAULT_LIKE_SELECTIVITY = 0.1
+# 索引查找每返回一行的代价（查找、位置排序与之后按位置取值），以全表扫描中求值一行的代价为单位
+INDEX_ROW_COST = 4
+
+_RANGE = {'<': op.lt, '<=': op.le, '>': op.gt, '>=': op.ge}
+# 范围条件的运算符 -> 是否包含边界
+_LOWER_BOUNDS = {'>': False, '>=': True}
+_UPPER_BOUNDS = {'<': False, '<=': True}
+
+class TableStats:
+    # 各列的统计信息按需收集：查询只为 WHERE 中出现的列收集，列上有索引时直接从索引推算，不读取表数据
+    def __init__(self, row_count, modifications):
+        self.row_count = row_count
+        self.columns = {}
+        # 收集时表的修改计数，用于判断统计信息是否过期
+        self.modifications = modifications
+
+    def is_stale(self, modifications):
+        return modifications - self.modifications > self.row_count * STALE_FRACTION
+
+def column_stats(values):
+    # 扫描一列，统计不同值个数、NULL 个数与取值范围
+    distinct = set(values)
+    nulls = values.count(None) if None in distinct else 0
+    distinct.discard(None)
+    return ColumnStats(len(distinct), nulls, *_bounds(distinct))
+
+def index_stats(index, row_count):
+    distinct, count, keys = index.key_stats()
+    return ColumnStats(distinct, row_count - count, *_bounds(keys))
+
+def _bounds(keys):
+    try:
+        return (min(keys), max(keys)) if keys else (None, None)
+    except TypeError:
+        return None, None  # 列中混有无法比较的类型
+
+def estimate_selectivity(expr, stats):
+    # 估计满足条件的行所占的比例，各条件之间视为相互独立
+    kind = type(expr)
+    if kind is And:
+        selectivity = 1.0
+        for item in expr.items:
+            selectivity *= estimate_selectivity(item, stats)
+        return selectivity
+    if kind is Or:
+        miss = 1.0
+        for item in expr.items:
+            miss *= 1 - estimate_selectivity(item, stats)
+        return 1 - miss
+    if kind is Not:
+        # NULL 在取反前后都不满足条件
+        base = 1.0 if type(expr.item) in (And, Or, Not) else _non_null_fraction(stats, expr.item[0])
+        return max(0.0, base - estimate_selectivity(expr.item, stats))
+    column_stats = stats.columns.get(expr[0])
+    non_null = _non_null_fraction(stats, expr[0])
+    if kind is In:
+        if expr.negated and None in expr.values:
+            return 0.0
+        selectivity = min(non_null, sum(_equal_selectivity(column_stats, non_null, value)
+                                        for value in set(expr.values) if value is not None))
+        return non_null - selectivity if expr.negated else selectivity
+    if kind is Between:
+        if expr.low is None or expr.high is None:
+            return 0.0
+        selectivity = max(0.0, _range_selectivity(column_stats, non_null, '>=', expr.low)
+                          + _range_selectivity(column_stats, non_null, '<=', expr.high) - non_null)
+        return non_null - selectivity if expr.negated else selectivity
+    if kind is Range:
+        if expr.low is None or expr.high is None:
+            return 0.0
+        return max(0.0, _range_selectivity(column_stats, non_null, '>=' if expr.low_inclusive else '>', expr.low)
+                   + _range_selectivity(column_stats, non_null, '<=' if expr.high_inclusive else '<', expr.high)
+                   - non_null)
+    if kind is Like:
+        if expr.pattern is None:
+            return 0.0
+        pattern = str(expr.pattern)
+        if '%' in pattern or '_' in pattern:
+            selectivity = DEFAULT_LIKE_SELECTIVITY * non_null
+        else:
+            selectivity = _equal_selectivity(column_stats, non_null, pattern)
+        return non_null - selectivity if expr.negated else selectivity
+    _, operator, value = expr
+    if value is None:
+        return 0.0
+    if operator == '=':
+        return _equal_selectivity(column_stats, non_null, value)
+    if operator == '!=':
+        return non_null - _equal_selectivity(column_stats, non_null, value)
+    return _range_selectivity(column_stats, non_null, operator, value)
+
+def _non_null_fraction(stats, column):
+    column_stats = stats.columns.get(column)
+    if column_stats is None or not stats.row_count:
+        return 1.0
+    return 1 - column_stats.nulls / stats.row_count
+
+def _equal_selectivity(column_stats, non_null, value):
+    if column_stats is None:
+        return DEFAULT_EQUAL_SELECTIVITY
+    if not column_stats.distinct:
+        return 0.0
+    try:
+        if column_stats.low is not None and not column_stats.low <= value <= column_stats.high:
+            return 0.0
+    except TypeError:
+        pass  # 常量与列中的值无法比较大小时不用取值范围判断
+    return non_null / column_stats.distinct
+
+def _range_selectivity(column_stats, non_null, operator, value):
+    if column_stats is None:
+        return DEFAULT_RANGE_SELECTIVITY
+    low, high = column_stats.low, column_stats.high
+    if low is None:
+        return 0.0 if not column_stats.distinct else DEFAULT_RANGE_SELECTIVITY * non_null
+    compare = _RANGE[operator]
+    try:
+        if compare(low, value) and compare(high, value):
+            return non_null  # 整个取值范围都满足条件
+        if not compare(low, value) and not compare(high, value):
+            return 0.0
+    except TypeError:
+        return DEFAULT_RANGE_SELECTIVITY * non_null
+    if not (all(isinstance(bound, (int, float)) for bound in (low, high, value))
+            or type(low) is type(high) is type(value) in (datetime.date, datetime.datetime)):
+        return DEFAULT_RANGE_SELECTIVITY * non_null
+    # 数值、日期与时间列按取值范围线性插值（日期相减得到 timedelta，相除得到比例）
+    fraction = (value - low) / (high - low)
+    if operator in ('>', '>='):
+        fraction = 1 - fraction
+    return min(1.0, max(0.0, fraction)) * non_null
+
+class Plan:
+    # 一条查询的执行计划：steps 为 [(条件, 选择率)]，按执行顺序排列。
+    # 第一步对整张表求值，index 不为 None 时通过该索引查找；之后的步骤只对前面留下的候选行求值。
+    def __init__(self, table_name, columns, col_indices, steps, index, row_count):
+        self.table_name = table_name
+        self.columns = columns
+        self.col_indices = col_indices
+        self.steps = steps
+        self.index = index
+        self.row_count = row_count
+
+    def estimate(self, stats):
+        # 为规划时未估计选择率的步骤补上估计值
+        self.steps = [(expr, estimate_selectivity(expr, stats) if selectivity is None else selectivity)
+                      for expr, selectivity in self.steps]
+
+    @property
+    def estimated_rows(self):
+        selectivity = 1.0
+        for _, step_selectivity in self.steps:
+            selectivity *= step_selectivity
+        return round(self.row_count * selectivity)
+
+    def describe(self, actual_rows=None):
+        lines = []
+        if self.columns is not None:
+            lines.append(f"Project: {', '.join(self.columns)}")
+        if self.index is not None:
+            access = f"Index Scan on {self.table_name} using {self.index.name} ({self.index.index_type})"
+        else:
+            access = f"Full Scan on {self.table_name}"
+        rows = self.row_count
+        if not self.steps:
+            lines.append(f"{access} (estimated rows: {rows})")
+        for i, (expr, selectivity) in enumerate(self.steps):
+            rows *= selectivity
+            prefix = f"{access}: " if i == 0 else "Filter: "
+            lines.append(f"{prefix}{format_expr(expr)} (selectivity: {selectivity:.3f}, estimated rows: {round(rows)})")
+        summary = f"Estimated rows: {self.estimated_rows}"
+        if actual_rows is not None:
+            summary += f", actual rows: {actual_rows}"
+        lines.append(summary)
+        return lines
+
+def plan_query(table, columns, col_indices, where):
+    # 按选择率从低到高排列 AND 的各个条件；最选择性的可索引条件足够便宜时用索引查找代替第一遍全表扫描
+    row_count = len(table.storage)
+    conjuncts = [] if where is None else list(where.items) if type(where) is And else [where]
+    conjuncts = merge_ranges(conjuncts)
+    indexes = [table.index_for(expr) for expr in conjuncts]
+    if not any(indexes) and len(conjuncts) < 2:
+        # 只有一种执行方式，不需要统计信息；EXPLAIN 时再估计行数
+        return Plan(table.name, columns, col_indices, [(expr, None) for expr in conjuncts], None, row_count)
+    stats = table.statistics(columns_of(where))
+    steps = sorted(((_order_conjuncts(expr, stats), estimate_selectivity(expr, stats), index)
+                    for expr, index in zip(conjuncts, indexes)), key=lambda step: step[1])
+    index = None
+    best_cost = row_count
+    for i, (expr, selectivity, candidate) in enumerate(steps):
+        if candidate is None:
+            continue
+        cost = selectivity * row_count * INDEX_ROW_COST
+        if cost < best_cost:
+            index, best_cost, best = candidate, cost, i
+    if index is not None:
+        steps.insert(0, steps.pop(best))
+    steps = [(expr, selectivity) for expr, selectivity, _ in steps]
+    return Plan(table.name, columns, col_indices, steps, index, row_count)
+
+def merge_ranges(conjuncts):
+    # 同一列上既有下界又有上界时（如 a >= 1 AND a < 5，或 BETWEEN），合并为一个 Range 条件，
+    # 放在该列第一个范围条件的位置；同一侧有多个边界时取最紧的一个
+    bounds = {}  # 列 -> ([下界], [上界])，边界为 (值, 是否包含)
+    for expr in conjuncts:
+        column_bounds = _range_bounds(expr)
+        if column_bounds is not None:
+            column, low, high = column_bounds
+            lows, highs = bounds.setdefault(column, ([], []))
+            lows.extend(low)
+            highs.extend(high)
+    ranges = {}
+    for column, (lows, highs) in bounds.items():
+        if not lows or not highs:
+            continue
+        try:
+            # 值相同时不包含边界的一侧更紧
+            low = max(lows, key=lambda bound: (bound[0], not bound[1]))
+            high = min(highs, key=lambda bound: (bound[0], bound[1]))
+        except TypeError:
+            continue  # 边界之间无法比较大小，保持原样
+        ranges[column] = Range(column, low[0], high[0], low[1], high[1])
+    if not ranges:
+        return conjuncts
+    merged = []
+    for expr in conjuncts:
+        column_bounds = _range_bounds(expr)
+        if column_bounds is None or column_bounds[0] not in ranges:
+            merged.append(expr)
+        elif ranges[column_bounds[0]] is not None:
+            merged.append(ranges[column_bounds[0]])
+            ranges[column_bounds[0]] = None
+    return merged
+
+def _range_bounds(expr):
+    # 范围条件给出的 (列, [下界], [上界])；其他条件返回 None
+    kind = type(expr)
+    if kind is Between:
+        if expr.negated or expr.low is None or expr.high is None:
+            return None
+        return expr.column, [(expr.low, True)], [(expr.high, True)]
+    if kind is not Comparison or expr.value is None:
+        return None
+    if expr.operator in _LOWER_BOUNDS:
+        return expr.column, [(expr.value, _LOWER_BOUNDS[expr.operator])], []
+    if expr.operator in _UPPER_BOUNDS:
+        return expr.column, [], [(expr.value, _UPPER_BOUNDS[expr.operator])]
+    return None
+
+def _order_conjuncts(expr, stats):
+    # 嵌套的 AND（如 OR 的分支中）同样按选择率排序
+    kind = type(expr)
+    if kind is And:
+        return And(tuple(sorted((_order_conjuncts(item, stats) for item in expr.items),
+                                key=lambda item: estimate_selectivity(item, stats))))
+    if kind is Or:
+        return Or(tuple(_order_conjuncts(item, stats) for item in expr.items))
+    return expr
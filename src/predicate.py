@@ -0,0 +1,91 @@
+# src/predicate.py
+
+import operator as op
+import re
+from itertools import compress, count, repeat
+
+# cell < value 等价于 value > cell，因此可以直接使用常量的绑定比较方法，整列扫描都在 C 层完成
+_REFLECTED = {'=': '__eq__', '<': '__gt__', '>': '__lt__', '<=': '__ge__', '>=': '__le__', '!=': '__ne__'}
+_COMPARE = {'=': op.eq, '<': op.lt, '>': op.gt, '<=': op.le, '>=': op.ge, '!=': op.ne}
+
+def compile_predicate(operator, value):
+    # 每条语句编译一次，返回 values -> 满足条件的行位置列表（升序）。
+    # 常量已按列的类型转换（见 src/sql_ast.py 的 bind_literals），逐行比较时不做任何类型转换
+    if operator not in _COMPARE:
+        raise ValueError(f"Unsupported operator '{operator}'")
+    if operator == '=':
+        def scan(values):
+            return _equal_positions(values, value)
+        return scan
+
+    if operator == '!=':
+        def scan(values):
+            # NULL != value 的结果不为真，需要同时排除 NULL
+            return list(compress(count(), map(op.and_, map(op.ne, values, repeat(value)),
+                                              map(op.is_not, values, repeat(None)))))
+        return scan
+
+    compare = _COMPARE[operator]
+    test = getattr(value, _REFLECTED[operator])
+
+    def scan(values):
+        try:
+            return list(compress(count(), map(compare, values, repeat(value))))
+        except TypeError:
+            # 列中含有 NULL：比较结果为 NotImplemented，只保留结果恰为 True 的位置
+            return list(compress(count(), map(op.is_, map(test, values), repeat(True))))
+    return scan
+
+def _equal_positions(values, value):
+    # values 为 list 或 array；== 对 NULL 返回 False，不需要特殊处理
+    # 匹配较少时用 C 层的 index 直接跳到下一个匹配位置，匹配过多时剩余部分改为批量比较
+    positions = []
+    pos = -1
+    limit = len(values) >> 3
+    try:
+        while len(positions) < limit:
+            pos = values.index(value, pos + 1)
+            positions.append(pos)
+    except ValueError:
+        return positions
+    start = pos + 1
+    positions.extend(compress(count(start), map(op.eq, values[start:], repeat(value))))
+    return positions
+
+def compile_in(values, negated=False):
+    # column [NOT] IN (v1, v2, ...)；列表中的 NULL 永远不匹配，NOT IN 的列表含 NULL 时结果为空
+    if negated and None in values:
+        return lambda column: []
+    member_set = {value for value in values if value is not None}
+    contains = member_set.__contains__
+    if not negated:
+        return lambda column: list(compress(count(), map(contains, column)))
+    return lambda column: [pos for pos, cell in enumerate(column) if cell is not None and cell not in member_set]
+
+def compile_like(pattern, negated=False):
+    # % 匹配任意长度的字符串，_ 匹配单个字符；只对字符串值求值
+    if pattern is None:
+        return lambda column: []
+    regex = re.compile(''.join(
+        '.*' if ch == '%' else '.' if ch == '_' else re.escape(ch) for ch in str(pattern)
+    ), re.DOTALL)
+    match = regex.fullmatch
+
+    def scan(column):
+        return [pos for pos, cell in enumerate(column)
+                if cell is not None and (match(str(cell)) is not None) != negated]
+    return scan
+
+def intersect_positions(lists):
+    # 各列表均为升序的位置列表
+    lists = sorted(lists, key=len)
+    result = lists[0]
+    for other in lists[1:]:
+        if not result:
+            break
+        members = set(other)
+        result = [pos for pos in result if pos in members]
+    return result
+
+def union_positions(lists):
+    return sorted(set().union(*lists))
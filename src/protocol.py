@@ -0,0 +1,51 @@
+# src/protocol.py
+
+import asyncio
+import json
+import struct
+
+# 网络协议：每帧为 4 字节大端长度 + UTF-8 编码的 JSON 对象。
+# 请求:  {"id": n, "sql": "...", "params": [...]}
+# 响应:  {"id": n, "columns": [...], "rows": [...], "done": false}  第一帧带列名，之后每帧一批行
+#        {"id": n, "rows": [...], "done": true, "rowcount": k}    最后一帧；k 为结果行数
+#        {"id": n, "rows": [], "done": true, "rowcount": k, "message": "..."}
+#                                                                 非查询语句只有这一帧，k 为影响的行数
+#        {"id": n, "error": "..."}                                出错，之后不再有该请求的帧
+# 最后一帧与出错的帧还带有 "transaction": true / false，表示语句之后该连接是否有未结束的事务
+# 同一连接上的请求按发送顺序执行、按顺序响应，客户端可以不等响应连续发送多个请求（流水线）
+
+_LENGTH = struct.Struct('>I')
+MAX_FRAME = 64 * 1024 * 1024
+DEFAULT_PORT = 7432
+
+def encode_frame(message):
+    payload = json.dumps(message, ensure_ascii=False, default=str).encode('utf-8')
+    return _LENGTH.pack(len(payload)) + payload
+
+def _frame_length(header):
+    length, = _LENGTH.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit.")
+    return length
+
+async def read_frame(reader):
+    # 对端正常关闭时返回 None
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("Connection closed in the middle of a frame.")
+        return None
+    payload = await reader.readexactly(_frame_length(header))
+    return json.loads(payload)
+
+def recv_frame(stream):
+    # stream 为 socket.makefile('rb') 返回的缓冲读取对象
+    header = stream.read(_LENGTH.size)
+    if len(header) < _LENGTH.size:
+        raise ConnectionError("Connection closed by the server.")
+    length = _frame_length(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        raise ConnectionError("Connection closed in the middle of a frame.")
+    return json.loads(payload)
@@ -1,133 +1,319 @@
 # src/query_executor.py
 
+import time
+
+from src.cursor import Cursor
 from src.database import Database, Table
-from src.sql_parser import SQLParser
+from src.sql_parser import PLACEHOLDER, SQLParser, bind_parameters, normalize_sql
+
+class PreparedStatement:
+    # prepare() 返回的语句句柄：只解析一次，每次执行时绑定 ? 参数
+    def __init__(self, executor, sql, parsed):
+        self.executor = executor
+        self.sql = sql
+        self.parsed = parsed
+        self.param_count = parsed['param_count']
+
+    def execute(self, params=()):
+        executor = self.executor
+        if executor.instrumentation is not None:
+            return executor._profiled(self.sql, lambda: bind_parameters(self.parsed, params),
+                                      lambda parsed: executor._run(parsed, self.sql, params))
+        return executor._run(bind_parameters(self.parsed, params), self.sql, params)
 
 class QueryExecutor:
-    def __init__(self, database=None):
+    # 执行语句，返回 Cursor：查询的列名与行、其他语句影响的行数与状态说明、执行用时。
+    # 执行过程不向标准输出写任何内容，结果如何展示由调用方（如 main.py）决定。
+    # instrumentation 为 Instrumentation 时计量每条语句（见 src/instrumentation.py），为 None 时不计量；
+    # result_cache 为 ResultCache 时缓存 SELECT 的结果（见 src/result_cache.py），为 None 时不缓存
+    def __init__(self, database=None, instrumentation=None, result_cache=None):
         if database is None:
             self.database = Database()
         else:
             self.database = database
         self.parser = SQLParser()
+        self.instrumentation = instrumentation
+        self.result_cache = result_cache
 
-    def execute(self, sql):
+    def execute(self, sql, params=()):
         # 去除首尾空白并忽略大小写
         sql = sql.strip()
+        if self.instrumentation is not None:
+            return self._profiled(sql, lambda: bind_parameters(self.parser.parse(sql), params),
+                                  lambda parsed: self._run(parsed, sql, params))
 
-        # 解析 SQL 语句
+        # 解析 SQL 语句（相同的语句直接命中解析缓存）
         parsed = self.parser.parse(sql)
-        if parsed is None:
-            return  # 解析失败
+        return self._run(bind_parameters(parsed, params), sql, params)
+
+    def prepare(self, sql):
+        return PreparedStatement(self, sql, self.parser.parse(sql))
+
+    def executemany(self, sql, seq_of_params):
+        # 单行的参数化 INSERT 把所有参数组绑定成一批，走批量插入路径；返回的 rowcount 为各组影响行数之和。
+        # 计量时整批算作一条语句
+        sql = sql.strip()
+        if self.instrumentation is not None:
+            return self._profiled(sql, lambda: self.parser.parse(sql),
+                                  lambda parsed: self._executemany(parsed, sql, seq_of_params))
+        return self._executemany(self.parser.parse(sql), sql, seq_of_params)
+
+    def _executemany(self, parsed, sql, seq_of_params):
+        started = time.perf_counter()
+        if parsed['action'] == 'INSERT INTO' and len(parsed['rows']) == 1:
+            template = parsed['rows'][0]
+            slots = [i for i, value in enumerate(template) if value is PLACEHOLDER]
+            rows = []
+            for params in seq_of_params:
+                if len(params) != len(slots):
+                    raise ValueError(f"Statement expects {len(slots)} parameter(s), got {len(params)}.")
+                row = list(template)
+                for slot, value in zip(slots, params):
+                    row[slot] = value
+                rows.append(row)
+            result = self._execute_insert_into(dict(parsed, rows=rows))
+        else:
+            rowcount = 0
+            for params in seq_of_params:
+                rowcount += max(self._dispatch(bind_parameters(parsed, params), sql).rowcount, 0)
+            result = _status(f"{rowcount} row(s) affected.", rowcount)
+        result.elapsed = time.perf_counter() - started
+        return result
 
+    def _profiled(self, sql, parse, run):
+        # 开启计量时的执行路径：parse() 返回绑定参数后的解析结果，run(parsed) 执行并返回 Cursor
+        instrumentation = self.instrumentation
+        profile = instrumentation.start(sql)
+        try:
+            token = profile.begin()
+            try:
+                parsed = parse()
+            finally:
+                profile.end('parse', token)
+            profile.action = parsed.get('action')
+            token = profile.begin()
+            try:
+                result = run(parsed)
+            finally:
+                profile.end('execute', token)
+        except Exception as e:
+            instrumentation.finish(profile, error=str(e))
+            raise
+        return instrumentation.track(profile, result)
+
+    def _run(self, parsed, sql, params=()):
+        started = time.perf_counter()
+        if self.result_cache is not None and parsed.get('action') == 'SELECT':
+            result = self._cached_select(parsed, sql, params)
+        else:
+            result = self._dispatch(parsed, sql)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def _cached_select(self, parsed, sql, params):
+        # 命中要求涉及的各表的版本与缓存时相同。版本在执行前读取：执行期间有其他连接提交了修改时，
+        # 缓存项的版本已经过期，不会被命中。缓存的结果是物化的行，不再流式读取。
+        # 事务中的结果可能含有本事务尚未提交的修改，不写入缓存
+        try:
+            key = (normalize_sql(sql), tuple(params))
+            hash(key)
+        except TypeError:
+            return self._execute_select(parsed)  # 参数不能作为键
+        names = [parsed['table_name']] + [join['table_name'] for join in parsed.get('joins') or ()]
+        versions = self.database.table_versions(names)
+        if versions is None:
+            return self._execute_select(parsed)  # 表不存在，由执行路径报错
+        cached = self.result_cache.get(key, versions)
+        if cached is not None:
+            columns, rows = cached
+            return Cursor(columns, map(list, rows))
+        result = self._execute_select(parsed)
+        if self.database.in_transaction:
+            return result
+        rows = result.fetchall()
+        self.result_cache.put(key, versions, result.columns, rows)
+        return Cursor(result.columns, rows)
+
+    def _dispatch(self, parsed, sql):
         action = parsed.get('action')
 
         if action == 'CREATE TABLE':
-            self._execute_create_table(parsed)
+            return self._execute_create_table(parsed)
         elif action == 'INSERT INTO':
-            self._execute_insert_into(parsed)
+            return self._execute_insert_into(parsed)
         elif action == 'SELECT':
-            self._execute_select(parsed)
+            return self._execute_select(parsed)
+        elif action == 'EXPLAIN':
+            return self._execute_explain(parsed)
         elif action == 'ALTER TABLE':
-            self._execute_alter_table(parsed)
+            return self._execute_alter_table(parsed)
         elif action == 'DELETE FROM':
-            self._execute_delete_from(parsed)
+            return self._execute_delete_from(parsed)
         elif action == 'UPDATE':
-            self._execute_update(parsed)
+            return self._execute_update(parsed)
         elif action == 'DROP TABLE':
-            self._execute_drop_table(parsed)
+            return self._execute_drop_table(parsed)
+        elif action == 'CREATE INDEX':
+            return self._execute_create_index(parsed)
+        elif action == 'DROP INDEX':
+            return self._execute_drop_index(parsed)
         elif action == 'BEGIN TRANSACTION':
-            self._execute_begin_transaction()
+            return self._execute_begin_transaction()
         elif action == 'COMMIT':
-            self._execute_commit()
+            return self._execute_commit()
         elif action == 'ROLLBACK':
-            self._execute_rollback()
+            return self._execute_rollback()
+        elif action == 'SAVE':
+            return self._execute_save(parsed)
+        elif action == 'LOAD':
+            return self._execute_load(parsed)
+        elif action == 'SHOW STATS':
+            return self._execute_show_stats()
+        elif action == 'SHOW SLOW QUERIES':
+            return self._execute_show_slow_queries()
         else:
             raise ValueError(f"Unsupported SQL statement: {sql}")
 
     def _execute_create_table(self, parsed):
         table_name = parsed['table_name']
         columns = parsed['columns']
-        self.database.create_table(table_name, columns)
+        self.database.create_table(table_name, columns, parsed.get('storage'))
+        return _status(f"Table '{table_name}' created with columns: {columns}")
 
     def _execute_insert_into(self, parsed):
         table_name = parsed['table_name']
         columns = parsed.get('columns')
-        values = parsed['values']
+        rows = parsed['rows']
         
         table = self.database.get_table(table_name)
         if not table:
             raise ValueError(f"Table '{table_name}' does not exist.")
         
         if columns and columns != table.column_names:
-            ordered_values = [None] * len(table.column_names)
-            for col, val in zip(columns, values):
-                if col not in table.column_names:
-                    raise ValueError(f"Column '{col}' does not exist in table '{table_name}'.")
-                idx = table.column_names.index(col)
-                ordered_values[idx] = val
-            # 填充未指定的列为 None
-            for i in range(len(ordered_values)):
-                if ordered_values[i] is None:
-                    ordered_values[i] = None  # 使用 None 而不是 "None"
-            self.database.insert_into(table_name, ordered_values)
+            # 列名只查找一次，未指定的列填充为 None
+            col_indices = [table.schema.position(table_name, col) for col in columns]
+            width = len(table.column_names)
+            ordered_rows = []
+            for values in rows:
+                ordered_values = [None] * width
+                for idx, val in zip(col_indices, values):
+                    ordered_values[idx] = val
+                ordered_rows.append(ordered_values)
+            rows = ordered_rows
+        if len(rows) == 1:
+            count = self.database.insert_into(table_name, rows[0])
         else:
-            self.database.insert_into(table_name, values)
-
+            count = self.database.insert_many(table_name, rows)
+        return _status(f"Inserted {count} row(s) into '{table_name}'.", count)
     def _execute_select(self, parsed):
         table_name = parsed['table_name']
         columns = parsed['columns']
         where = parsed.get('where')
-        results = self.database.select_from(table_name, columns, where)
-        # 打印结果
-        if columns == ["*"]:
-            print("\t".join(self.database.get_table(table_name).column_names))
-        else:
-            print("\t".join(columns))
-        for row in results:
-            print("\t".join(map(str, row)))
+        # 返回游标，行在取用时才生成；结果的输出由调用方（如 main.py）负责
+        selected_columns, rows = self.database.select_query(
+            table_name, columns, where, parsed.get('joins'), parsed.get('group_by', ()), parsed.get('having'),
+            parsed.get('order_by', ()), parsed.get('limit'), parsed.get('offset', 0))
+        return Cursor(selected_columns, rows)
+
+    def _execute_explain(self, parsed):
+        # 查询计划每行一条，列名与 PostgreSQL 一致
+        query = parsed['query']
+        lines = self.database.explain(query['table_name'], query['columns'], query.get('where'), query.get('joins'),
+                                      query.get('group_by', ()), query.get('having'), query.get('order_by', ()),
+                                      query.get('limit'), query.get('offset', 0))
+        return Cursor(['QUERY PLAN'], [[line] for line in lines])
 
     def _execute_alter_table(self, parsed):
         table_name = parsed['table_name']
         operation = parsed['operation']
-        table = self.database.get_table(table_name)
-        if not table:
-            raise ValueError(f"Table '{table_name}' does not exist.")
-
+        column_name = parsed['column_name']
+        column_type = parsed.get('column_type')
+        changed = self.database.alter_table(table_name, operation, column_name, column_type)
+        if not changed:
+            if operation == 'ADD COLUMN':
+                return _status(f"Column '{column_name}' already exists in table '{table_name}'.")
+            return _status(f"Column '{column_name}' does not exist in table '{table_name}'.")
         if operation == 'ADD COLUMN':
-            column_name = parsed['column_name']
-            column_type = parsed['column_type']
-            table.add_column(column_name, column_type)
-        elif operation == 'DROP COLUMN':
-            column_name = parsed['column_name']
-            table.drop_column(column_name)
-        elif operation == 'MODIFY COLUMN':
-            column_name = parsed['column_name']
-            new_column_type = parsed['column_type']
-            table.modify_column(column_name, new_column_type)
-        else:
-            raise ValueError(f"Unsupported ALTER TABLE operation: {operation}")
+            return _status(f"Added column '{column_name}' of type '{column_type}' to table '{table_name}'.")
+        if operation == 'DROP COLUMN':
+            return _status(f"Dropped column '{column_name}' from table '{table_name}'.")
+        return _status(f"Modified column '{column_name}' to type '{column_type}' in table '{table_name}'.")
 
     def _execute_delete_from(self, parsed):
         table_name = parsed['table_name']
         where = parsed.get('where')
-        self.database.delete_from(table_name, where)
+        count = self.database.delete_from(table_name, where)
+        return _status(f"Deleted {count} row(s) from '{table_name}'.", count)
 
     def _execute_update(self, parsed):
         table_name = parsed['table_name']
         set_values = parsed['set_values']
         where = parsed.get('where')
-        self.database.update(table_name, set_values, where)
+        count = self.database.update(table_name, set_values, where)
+        return _status(f"Updated {count} row(s) in '{table_name}'.", count)
 
     def _execute_drop_table(self, parsed):
         table_name = parsed['table_name']
         self.database.drop_table(table_name)
+        return _status(f"Dropped table '{table_name}'.")
+
+    def _execute_create_index(self, parsed):
+        index = self.database.create_index(parsed['index_name'], parsed['table_name'],
+                                           parsed['column_name'], parsed['index_type'])
+        return _status(f"Index '{index.name}' ({index.index_type}) created on "
+                       f"'{parsed['table_name']}' ({parsed['column_name']}).")
+
+    def _execute_drop_index(self, parsed):
+        self.database.drop_index(parsed['index_name'], parsed.get('table_name'))
+        return _status(f"Dropped index '{parsed['index_name']}'.")
 
     def _execute_begin_transaction(self):
         self.database.begin_transaction()
+        return _status("Transaction started.")
 
     def _execute_commit(self):
         self.database.commit()
+        return _status("Transaction committed.")
 
     def _execute_rollback(self):
         self.database.rollback()
+        return _status("Transaction rolled back.")
+
+    def _execute_save(self, parsed):
+        path = _snapshot_path(parsed)
+        names = self.database.save(path)
+        return _status(f"Saved {len(names)} table(s) to '{path}'.")
+
+    def _execute_load(self, parsed):
+        path = _snapshot_path(parsed)
+        names = self.database.load(path)
+        return _status(f"Loaded {len(names)} table(s) from '{path}': {', '.join(names)}")
+
+    def _execute_show_stats(self):
+        # 累计的语句指标，每个指标一行（与 MetricsRegistry.render() 的内容相同）；开启结果缓存时附上缓存的命中情况
+        instrumentation = self._require_instrumentation()
+        rows = [[name, value] for name, value in instrumentation.registry.snapshot().items()]
+        if self.result_cache is not None:
+            rows += [[f'result_cache.{name}', value] for name, value in self.result_cache.cache_info().items()]
+        return Cursor(['metric', 'value'], rows)
+
+    def _execute_show_slow_queries(self):
+        instrumentation = self._require_instrumentation()
+        rows = [[profile.sql, profile.action, profile.total, profile.rows_scanned, profile.rows_returned,
+                 profile.index_hits] for profile in instrumentation.slow_queries]
+        return Cursor(['sql', 'action', 'seconds', 'rows_scanned', 'rows_returned', 'index_hits'], rows)
+
+    def _require_instrumentation(self):
+        if self.instrumentation is None:
+            raise ValueError("Statement instrumentation is not enabled.")
+        return self.instrumentation
+
+def _snapshot_path(parsed):
+    path = parsed['path']
+    if not isinstance(path, str):
+        raise ValueError("SAVE and LOAD expect a file path string.")
+    return path
+
+def _status(message, rowcount=-1):
+    # 非查询语句的结果：没有列和行，只有影响的行数与状态说明
+    return Cursor(None, (), rowcount, message)
@@ -0,0 +1,72 @@
+# src/result_cache.py
+
+import sys
+import threading
+from collections import OrderedDict
+
+class ResultCache:
+    # SELECT 结果的缓存（可选，QueryExecutor(result_cache=ResultCache(...))）。
+    # 键为规范化后的语句文本与 ? 参数；每项记下结果涉及的各表在执行前的版本（Table.version）。
+    # 表的内容或结构的任何变化（INSERT、UPDATE、DELETE、ALTER、回滚）都会换一个新的版本，
+    # DROP 之后重建的同名表也是新的版本，因此查找时只需比较版本，写操作不需要主动清除缓存。
+    # 缓存的结果按估计的字节数计入 max_bytes，超出时淘汰最久未使用的项；单个结果超过 max_bytes 时不缓存
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # 键 -> (各表的版本, 列名, 行, 字节数)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, versions):
+        # 返回 (列名, 行)；没有缓存或表已经变化时返回 None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            if entry is not None:
+                self._remove(key)  # 过期的结果不会再命中
+            self.misses += 1
+            return None
+
+    def put(self, key, versions, columns, rows):
+        rows = [tuple(row) for row in rows]
+        size = _result_size(columns, rows)
+        if size > self.max_bytes:
+            return False
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (versions, columns, rows, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+        return True
+
+    def _remove(self, key):
+        self.bytes -= self.entries.pop(key)[3]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def cache_info(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'size': len(self.entries),
+                    'bytes': self.bytes, 'max_bytes': self.max_bytes}
+
+def _result_size(columns, rows):
+    # 结果占用内存的估计：行列表、每行的 tuple 与其中的值（与存储共享的值同样计入，偏大）
+    getsizeof = sys.getsizeof
+    size = getsizeof(columns) + getsizeof(rows) + sum(map(getsizeof, rows))
+    for row in rows:
+        size += sum(map(getsizeof, row))
+    return size
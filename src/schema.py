@@ -0,0 +1,99 @@
+# src/schema.py
+
+import sys
+
+from src.datatypes import column_type
+
+# 表的列定义。创建后不再修改：ALTER TABLE 生成新的 Schema 替换表上的旧对象，撤销时换回旧对象即可。
+# 列名驻留（sys.intern），所有表与各版本的 Schema 共享同一个列名字符串。
+#
+# 逻辑列与行中的物理槽位分开：positions 为列名到槽位的映射，width 为行的物理宽度。
+#   ADD COLUMN   新列占用末尾的新槽位，已有的行不改写：比 width 短的行读取时把缺少的槽位视为 NULL
+#   DROP COLUMN  只从映射中去掉该列，槽位中的旧值留在行里，读取时不再引用
+# 因此行的长度就是它写入时所用的版本，ALTER 的耗时与行数无关。
+# Table.compact() 把所有行改写为紧凑的布局（去掉空槽位、补齐短行），之后 positions 与列的顺序一致。
+# version 在每次 ALTER 与压缩时加一
+class Schema:
+    __slots__ = ('columns', 'names', 'positions', 'slots', 'types', 'converters', 'width', 'version', 'compact')
+
+    def __init__(self, columns, positions=None, width=None, version=0):
+        self.columns = {sys.intern(name): declared.upper() for name, declared in columns.items()}  # 列名 -> 类型
+        self.names = list(self.columns)
+        if positions is None:
+            positions = {name: idx for idx, name in enumerate(self.names)}
+        self.positions = {name: positions[name] for name in self.names}  # 列名 -> 槽位
+        self.slots = [self.positions[name] for name in self.names]   # 按列的顺序排列的槽位
+        self.width = len(self.names) if width is None else width
+        self.types = {name: column_type(declared) for name, declared in self.columns.items()}  # 列名 -> ColumnType
+        self.converters = {name: declared.convert for name, declared in self.types.items()}
+        self.version = version
+        # 槽位与列一一对应且顺序一致：逻辑行就是物理行，不需要映射
+        self.compact = self.slots == list(range(self.width))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def position(self, table_name, name):
+        # 列的槽位；列不存在时报错
+        idx = self.positions.get(name)
+        if idx is None:
+            raise ValueError(f"Column '{name}' does not exist in table '{table_name}'.")
+        return idx
+
+    def convert(self, name, value):
+        # 按列的类型转换一个值，NULL 保持不变
+        if value is None:
+            return None
+        try:
+            return self.converters[name](value)
+        except (ValueError, TypeError, OverflowError):
+            raise ValueError(f"Invalid value for column '{name}': {value}")
+
+    def literal(self, name, value):
+        # WHERE 中与该列比较的常量，转换为可以与列中的值直接比较的类型
+        if value is None:
+            return None
+        try:
+            return self.types[name].literal(value)
+        except (ValueError, TypeError, OverflowError):
+            raise ValueError(f"Invalid value for column '{name}': {value}")
+
+    def convert_row(self, values):
+        # 按列的顺序转换一行，返回 tuple
+        if len(values) != len(self.names):
+            raise ValueError("Column count doesn't match value count.")
+        return tuple(map(self.convert, self.names, values))
+
+    def physical_row(self, values):
+        # 按列的顺序排列的值放到各自的槽位上，已删除列的槽位为 NULL
+        if self.compact:
+            return values
+        row = [None] * self.width
+        for slot, value in zip(self.slots, values):
+            row[slot] = value
+        return tuple(row)
+
+    def slot_types(self):
+        # 各槽位的类型，已删除列的槽位为 None
+        types = [None] * self.width
+        for name, slot in self.positions.items():
+            types[slot] = self.columns[name]
+        return types
+
+    def with_column(self, name, column_type):
+        return Schema({**self.columns, name: column_type}, {**self.positions, name: self.width},
+                      self.width + 1, self.version + 1)
+
+    def without_column(self, name):
+        return Schema({col: column_type for col, column_type in self.columns.items() if col != name},
+                      self.positions, self.width, self.version + 1)
+
+    def with_type(self, name, column_type):
+        return Schema({col: column_type if col == name else old for col, old in self.columns.items()},
+                      self.positions, self.width, self.version + 1)
+
+    def compacted(self):
+        return Schema(self.columns, version=self.version + 1)
@@ -0,0 +1,172 @@
+# src/server.py
+# 用法: python -m src.server [数据目录] [--host 127.0.0.1] [--port 7432] [--slow-query-ms 100]
+
+import argparse
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.database import Database
+from src.instrumentation import Instrumentation
+from src.protocol import DEFAULT_PORT, encode_frame, read_frame
+from src.query_executor import QueryExecutor
+
+# 查询结果每帧发送的行数
+BATCH_ROWS = 1000
+
+class DatabaseServer:
+    # asyncio TCP 服务器，协议见 src/protocol.py。
+    # 每个连接有一个专用的工作线程执行语句与取行：连接即会话（事务状态按线程区分），
+    # 事件循环只负责收发帧。连接断开时回滚其未提交的事务。instrumentation 不为 None 时计量所有连接的语句
+    def __init__(self, database, host='127.0.0.1', port=DEFAULT_PORT, batch_rows=BATCH_ROWS, instrumentation=None):
+        self.database = database
+        self.executor = QueryExecutor(database, instrumentation)
+        self.host = host
+        self.port = port
+        self.batch_rows = batch_rows
+        self.server = None
+        self.connections = 0
+        self.requests = 0
+        self._loop = None
+        self._thread = None
+        self._handlers = {}  # 连接处理任务 -> 该连接的 StreamWriter
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        # port 为 0 时由系统分配端口
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start_background(self):
+        # 在后台线程的事件循环中运行，返回时已开始监听（供测试与压测脚本使用）
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._close())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name='dbms-server', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    async def _close(self):
+        # 停止监听，断开仍在进行的连接（回滚它们未提交的事务）
+        self.server.close()
+        for writer in list(self._handlers.values()):
+            writer.close()  # 处理任务读到连接关闭后自行退出
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        worker = ThreadPoolExecutor(1, thread_name_prefix='dbms-connection')
+        handler = asyncio.current_task()
+        self._handlers[handler] = writer
+        self.connections += 1
+        try:
+            while True:
+                request = await read_frame(reader)
+                if request is None:
+                    break
+                self.requests += 1
+                await self._respond(request, writer, loop, worker)
+        except (ConnectionError, ValueError):
+            pass  # 对端断开或发来无法解析的帧
+        finally:
+            self.connections -= 1
+            await loop.run_in_executor(worker, self._disconnect)
+            worker.shutdown(wait=False)
+            writer.close()
+            self._handlers.pop(handler, None)
+
+    async def _respond(self, request, writer, loop, worker):
+        request_id = request.get('id')
+        try:
+            result, transaction = await loop.run_in_executor(worker, self._execute, request)
+        except Exception as e:
+            transaction = await loop.run_in_executor(worker, self._in_transaction)
+            writer.write(encode_frame({'id': request_id, 'error': str(e), 'transaction': transaction}))
+            await writer.drain()
+            return
+        if result.columns is None:
+            writer.write(encode_frame({'id': request_id, 'rows': [], 'done': True, 'rowcount': result.rowcount,
+                                       'message': result.message, 'transaction': transaction}))
+            await writer.drain()
+            return
+        message = {'id': request_id, 'columns': result.columns}
+        while True:
+            try:
+                rows = await loop.run_in_executor(worker, result.fetchmany, self.batch_rows)
+            except Exception as e:
+                await loop.run_in_executor(worker, result.close)
+                writer.write(encode_frame({'id': request_id, 'error': str(e), 'transaction': transaction}))
+                await writer.drain()
+                return
+            message['rows'] = rows
+            message['done'] = len(rows) < self.batch_rows
+            if message['done']:
+                message['rowcount'] = result.rowcount
+                message['transaction'] = transaction
+            writer.write(encode_frame(message))
+            # 客户端读得慢时在这里等待，结果按批流式发送，不在服务器端物化
+            await writer.drain()
+            if message['done']:
+                return
+            message = {'id': request_id}
+
+    def _execute(self, request):
+        sql = request.get('sql')
+        if not isinstance(sql, str):
+            raise ValueError("Request must contain an 'sql' string.")
+        # 同时返回语句之后连接是否在事务中（查询取行期间不会改变）
+        return self.executor.execute(sql, tuple(request.get('params') or ())), self.database.in_transaction
+
+    def _in_transaction(self):
+        return self.database.in_transaction
+
+    def _disconnect(self):
+        # 在连接的工作线程中执行：回滚该连接未提交的事务，释放它持有的锁
+        if self.database.in_transaction:
+            self.database.rollback()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a database over TCP.")
+    parser.add_argument('data_dir', nargs='?', help="数据目录，不指定时数据只在内存中")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--slow-query-ms', type=float, help="开启语句计量，耗时超过这么多毫秒的语句记为慢查询")
+    args = parser.parse_args(argv)
+    database = Database(args.data_dir)
+    instrumentation = Instrumentation(args.slow_query_ms / 1000) if args.slow_query_ms is not None else None
+    server = DatabaseServer(database, args.host, args.port, instrumentation=instrumentation)
+    try:
+        asyncio.run(_serve(server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        database.close()
+
+async def _serve(server):
+    await server.start()
+    print(f"Listening on {server.host}:{server.port}")
+    await server.serve_forever()
+
+if __name__ == '__main__':
+    main()
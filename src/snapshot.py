@@ -0,0 +1,218 @@
+# src/snapshot.py
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from src.datatypes import column_type
+from src.storage import ColumnarStorage, DictColumn, FixedColumn, NullColumn, _make_column
+
+# 快照文件：所有表按列存放在一个二进制文件中，打开时只读取目录，列数据通过 mmap 按需载入。
+#   文件头   8 字节魔数 + 目录的偏移与长度（各 8 字节）
+#   列数据   定长类型的列为定长编码的数组 + NULL 位图（INT 为 int64，FLOAT 为 double，BOOLEAN 为 int8，
+#            DATE 为 int32 的天数，TIMESTAMP 为 int64 的微秒数）；其他列为 int32 编码数组 + 字典（字符串池）
+#   目录     JSON，每张表一项（列定义、行数、索引与各列数据段的位置），写在文件末尾
+# 每段数据按 8 字节对齐，映射后可以直接按类型解释，不需要解码
+MAGIC = b'DBSNAP01'
+_HEADER = struct.Struct('<8sQQ')
+_ALIGN = 8
+
+def write_snapshot(path, tables):
+    # tables 为 Table 列表；先写临时文件并 fsync，再原子替换，写到一半失败不影响原有的快照
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        writer = _SegmentWriter(f)
+        f.write(bytes(_HEADER.size))
+        entries = [_write_table(writer, table) for table in tables]
+        catalog = json.dumps({'byteorder': sys.byteorder, 'tables': entries}, ensure_ascii=False).encode('utf-8')
+        catalog_offset = writer.offset
+        f.write(catalog)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, catalog_offset, len(catalog)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class _SegmentWriter:
+    def __init__(self, f):
+        self.f = f
+        self.offset = _HEADER.size
+
+    def write(self, data):
+        # 返回 [偏移, 字节数]，之后补齐到 8 字节边界
+        data = memoryview(data).cast('B')
+        segment = [self.offset, len(data)]
+        self.f.write(data)
+        padding = -len(data) % _ALIGN
+        self.f.write(bytes(padding))
+        self.offset += len(data) + padding
+        return segment
+
+def _write_table(writer, table):
+    storage = table.storage
+    columns = []
+    # 按列的顺序写出各列所在的槽位，快照中的表总是紧凑的
+    for slot, column_type in zip(table.schema.slots, table.columns.values()):
+        if storage.storage_type == 'COLUMNAR':
+            column = storage.columns[slot]
+        else:
+            # 行存储与磁盘存储逐列转换为列存储的表示再写出
+            column = _make_column(column_type, storage.column(slot))
+        columns.append(_write_column(writer, column))
+    return {
+        'name': table.name,
+        'columns': table.columns,
+        'row_count': len(storage),
+        'indexes': [[index.name, index.column_name, index.index_type] for index in table.indexes.values()],
+        'segments': columns,
+    }
+
+def _write_column(writer, column):
+    if isinstance(column, _MappedColumn):
+        if column.column is None:
+            # 尚未载入的快照列直接复制映射的数据段
+            return column.write(writer)
+        column = column.column
+    if isinstance(column, NullColumn):
+        column = _make_column(column.column_type, column.values()) if column.column is None else column.column
+    if isinstance(column, FixedColumn):
+        return {'kind': 'fixed', 'type': column.type.name, 'null_count': column.null_count,
+                'data': writer.write(column.data), 'nulls': writer.write(column.nulls)}
+    segment = {'kind': 'dict', 'codes': writer.write(column.codes)}
+    segment.update(_write_pool(writer, column.pool))
+    return segment
+
+def _write_pool(writer, pool):
+    if all(type(value) is str for value in pool):
+        encoded = [value.encode('utf-8') for value in pool]
+        offsets = array('q', [0])
+        total = 0
+        for value in encoded:
+            total += len(value)
+            offsets.append(total)
+        return {'pool': 'str', 'offsets': writer.write(offsets), 'blob': writer.write(b''.join(encoded))}
+    # 含非字符串的值（超出 64 位的整数）时整体以 JSON 存放
+    return {'pool': 'json', 'blob': writer.write(json.dumps(pool, ensure_ascii=False).encode('utf-8'))}
+
+def read_snapshot(path):
+    # 只读取文件头与目录；返回 [(表名, 列定义, 索引定义, 存储)]，存储中的列在首次访问时才载入
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{path}' is not a database snapshot.")
+        _, catalog_offset, catalog_length = _HEADER.unpack(header)
+        f.seek(catalog_offset)
+        catalog = json.loads(f.read(catalog_length).decode('utf-8'))
+        if catalog['byteorder'] != sys.byteorder:
+            raise ValueError(f"Snapshot '{path}' was written on a machine with a different byte order.")
+        # 映射在文件关闭后仍然有效；所有列都不再引用时由垃圾回收释放
+        mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    tables = []
+    for entry in catalog['tables']:
+        storage = ColumnarStorage(entry['columns'].values())
+        storage.columns = [_mapped_column(mapped, segment, entry['row_count']) for segment in entry['segments']]
+        storage.row_count = entry['row_count']
+        tables.append((entry['name'], entry['columns'], entry['indexes'], storage))
+    return tables
+
+def _mapped_column(mapped, segment, length):
+    if segment['kind'] in ('fixed', 'int'):  # 'int' 为只有 INT 一种定长类型时写出的快照
+        return MappedFixedColumn(mapped, segment, length)
+    return MappedDictColumn(mapped, segment, length)
+
+def _view(mapped, segment, typecode='B'):
+    offset, size = segment
+    view = mapped[offset:offset + size]
+    return view.cast(typecode) if typecode != 'B' else view
+
+class _MappedColumn:
+    # 快照中的一列：按位置读取直接访问映射的页，只有被访问的页才从文件载入；
+    # 整列读取、切片与修改等其他操作先把整列复制为内存中的 FixedColumn / DictColumn（之后都由它完成）。
+    # 快照文件本身不会被修改
+    def __init__(self, mapped, segment, length):
+        self.mapped = mapped
+        self.segment = segment
+        self.length = length
+        self.column = None  # 载入后的内存列
+
+    def __len__(self):
+        return self.length if self.column is None else len(self.column)
+
+    def __getattr__(self, name):
+        # 实例上没有的属性（values、slice、set、delete 等）转交给载入后的内存列
+        column = self.__dict__['column']
+        if column is None:
+            column = self.column = self.load()
+        return getattr(column, name)
+
+    def memory_usage(self):
+        # 映射的页属于操作系统的页缓存，不计入
+        return 0 if self.column is None else self.column.memory_usage()
+
+    def write(self, writer):
+        segment = dict(self.segment)
+        for key in ('data', 'nulls', 'codes', 'offsets', 'blob'):
+            if key in segment:
+                segment[key] = writer.write(_view(self.mapped, segment[key]))
+        return segment
+
+class MappedFixedColumn(_MappedColumn):
+    def __init__(self, mapped, segment, length):
+        super().__init__(mapped, segment, length)
+        self.type = column_type(segment.get('type', 'INT'))
+        self._data = _view(mapped, segment['data'], self.type.typecode)
+        self._nulls = _view(mapped, segment['nulls'])
+
+    def get(self, pos):
+        if self.column is not None:
+            return self.column.get(pos)
+        if self.segment['null_count'] and self._nulls[pos >> 3] >> (pos & 7) & 1:
+            return None
+        decode = self.type.decode
+        return self._data[pos] if decode is None else decode(self._data[pos])
+
+    def load(self):
+        column = FixedColumn(self.type)
+        column.data.frombytes(_view(self.mapped, self.segment['data']))
+        column.nulls = bytearray(self._nulls)
+        column.null_count = self.segment['null_count']
+        return column
+
+class MappedDictColumn(_MappedColumn):
+    def __init__(self, mapped, segment, length):
+        super().__init__(mapped, segment, length)
+        self._codes = _view(mapped, segment['codes'], 'i')
+        self._offsets = _view(mapped, segment['offsets'], 'q') if segment['pool'] == 'str' else None
+        self._pool = None  # 整体解码后的字典池
+
+    def get(self, pos):
+        if self.column is not None:
+            return self.column.get(pos)
+        code = self._codes[pos]
+        if code < 0:
+            return None
+        if self._pool is None and self._offsets is not None:
+            # 只解码这一个字符串
+            start = self.segment['blob'][0]
+            return str(self.mapped[start + self._offsets[code]:start + self._offsets[code + 1]], 'utf-8')
+        return self._decode_pool()[code]
+
+    def _decode_pool(self):
+        if self._pool is None:
+            if self._offsets is not None:
+                offsets = self._offsets
+                blob = bytes(_view(self.mapped, self.segment['blob']))
+                self._pool = [blob[start:stop].decode('utf-8') for start, stop in zip(offsets, offsets[1:])]
+            else:
+                self._pool = json.loads(bytes(_view(self.mapped, self.segment['blob'])).decode('utf-8'))
+        return self._pool
+
+    def load(self):
+        column = DictColumn()
+        column.codes.frombytes(_view(self.mapped, self.segment['codes']))
+        column.pool = self._decode_pool()
+        column.lookup = {value: code for code, value in enumerate(column.pool)}
+        return column
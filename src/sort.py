@@ -0,0 +1,90 @@
+# src/sort.py
+
+import heapq
+from itertools import islice
+from operator import itemgetter
+
+# ORDER BY 与 LIMIT / OFFSET。NULL 视为最小值：升序时排在最前，降序时排在最后
+
+class _Descending:
+    # 混合升降序时包装降序的键，使元组比较对该列取反
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+def sort_key(keys):
+    # Top-N 使用的排序键。keys 为 [(列下标, 是否降序)]；返回 (行的排序键函数, 是否整体反转)
+    descending = {desc for _, desc in keys}
+    mixed = len(descending) > 1
+    indices = [idx for idx, _ in keys]
+    if len(keys) == 1:
+        idx = indices[0]
+        key = lambda row: (row[idx] is not None, row[idx])
+    elif not mixed:
+        key = lambda row: tuple((row[idx] is not None, row[idx]) for idx in indices)
+    else:
+        key = lambda row: tuple(_Descending((row[idx] is not None, row[idx])) if desc
+                                else (row[idx] is not None, row[idx]) for idx, desc in keys)
+    return key, descending == {True}
+
+def sort_rows(rows, keys):
+    # 整体排序：从最后一个键起逐键做稳定排序，每一趟先把 NULL 分出来，其余按列值在 C 层比较
+    rows = list(rows)
+    for idx, descending in reversed(keys):
+        nulls = [row for row in rows if row[idx] is None]
+        if nulls:
+            rows = [row for row in rows if row[idx] is not None]
+        rows.sort(key=itemgetter(idx), reverse=descending)
+        rows = rows + nulls if descending else nulls + rows
+    return rows
+
+def check_limit(limit, offset):
+    for name, value in (('LIMIT', limit), ('OFFSET', offset)):
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+            raise ValueError(f"{name} must be a non-negative integer.")
+
+def limit_rows(rows, limit=None, offset=0):
+    # 行是惰性生成的，取够 offset + limit 行后不再读取输入
+    check_limit(limit, offset)
+    if limit is None and not offset:
+        return rows
+    return islice(rows, offset or 0, None if limit is None else (offset or 0) + limit)
+
+class Sort:
+    # 排序算子：有 LIMIT 时用大小为 offset + limit 的堆只保留前 k 行（Top-N），否则整体排序。
+    # keys 为 [(列下标, 是否降序)]，names 为输入的列名，只用于 EXPLAIN
+    def __init__(self, rows, keys, limit=None, offset=0, names=None):
+        check_limit(limit, offset)
+        self.rows = rows
+        self.keys = keys
+        self.limit = limit
+        self.offset = offset or 0
+        self.names = names
+
+    def __iter__(self):
+        try:
+            if self.limit is None:
+                rows = sort_rows(self.rows, self.keys)
+            else:
+                key, reverse = sort_key(self.keys)
+                select = heapq.nlargest if reverse else heapq.nsmallest
+                rows = select(self.offset + self.limit, self.rows, key=key)
+        except TypeError:
+            raise ValueError(f"Cannot sort by {', '.join(self._key_names())}: values are not comparable.")
+        return islice(rows, self.offset, None) if self.offset else iter(rows)
+
+    def _key_names(self):
+        return [self.names[idx] if self.names else str(idx) for idx, _ in self.keys]
+
+    def describe(self):
+        keys = ', '.join(f"{name} DESC" if desc else name for name, (_, desc) in zip(self._key_names(), self.keys))
+        if self.limit is None:
+            return f"Sort: {keys}"
+        return f"Top-N Sort: {keys} (keep {self.offset + self.limit} rows)"
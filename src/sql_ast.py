@@ -0,0 +1,114 @@
+# src/sql_ast.py
+
+import datetime
+from collections import namedtuple
+
+# WHERE 表达式的语法树节点。节点都是不可变的 namedtuple，可以放进解析缓存，
+# 绑定参数时按字段重建；Comparison 与旧的 (列, 运算符, 值) 三元组兼容。
+Comparison = namedtuple('Comparison', 'column operator value')
+And = namedtuple('And', 'items')
+Or = namedtuple('Or', 'items')
+Not = namedtuple('Not', 'item')
+In = namedtuple('In', 'column values negated')
+Between = namedtuple('Between', 'column low high negated')
+Like = namedtuple('Like', 'column pattern negated')
+# 规划器把同一列上的下界与上界（含 BETWEEN）合并成的范围，由有序索引一次查找；不出现在解析结果中
+Range = namedtuple('Range', 'column low high low_inclusive high_inclusive')
+
+
+class Aggregate(namedtuple('Aggregate', 'function column')):
+    # SELECT 列表或 HAVING 中的聚合函数调用；column 为 None 表示 COUNT(*)
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.function}({self.column or '*'})"
+
+# NOT (a < 1) 等价于 a >= 1；与 NULL 比较的结果在取反前后都不为真
+NEGATED_OPERATORS = {'=': '!=', '!=': '=', '<': '>=', '>=': '<', '>': '<=', '<=': '>'}
+# 1 < a 等价于 a > 1
+FLIPPED_OPERATORS = {'=': '=', '!=': '!=', '<': '>', '>': '<', '<=': '>=', '>=': '<='}
+
+def negate(expr):
+    # 把 NOT 下推到叶子节点，结果中不再含有 Not
+    kind = type(expr)
+    if kind is Not:
+        return expr.item
+    if kind is And:
+        return Or(tuple(negate(item) for item in expr.items))
+    if kind is Or:
+        return And(tuple(negate(item) for item in expr.items))
+    if kind in (In, Between, Like):
+        return expr._replace(negated=not expr.negated)
+    column, operator, value = expr
+    return Comparison(column, NEGATED_OPERATORS[operator], value)
+
+def bind_literals(expr, literal):
+    # 把条件中的常量换成 literal(列, 常量) 的结果（按所比较的列的类型转换）；LIKE 的模式保持原样
+    kind = type(expr)
+    if kind in (And, Or):
+        return kind(tuple(bind_literals(item, literal) for item in expr.items))
+    if kind is Not:
+        return Not(bind_literals(expr.item, literal))
+    if kind is In:
+        return expr._replace(values=tuple(literal(expr.column, value) for value in expr.values))
+    if kind is Between:
+        return expr._replace(low=literal(expr.column, expr.low), high=literal(expr.column, expr.high))
+    if kind is Like:
+        return expr
+    column, operator, value = expr
+    return Comparison(column, operator, literal(column, value))
+
+def columns_of(expr):
+    # 表达式引用的所有列名
+    kind = type(expr)
+    if kind in (And, Or):
+        return {column for item in expr.items for column in columns_of(item)}
+    if kind is Not:
+        return columns_of(expr.item)
+    return {expr[0]}
+
+def format_value(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, datetime.date):
+        value = value.isoformat(' ') if isinstance(value, datetime.datetime) else value.isoformat()
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+def format_expr(expr):
+    # 把表达式还原为 SQL 文本，用于 EXPLAIN 输出
+    kind = type(expr)
+    if kind in (And, Or):
+        joiner = ' AND ' if kind is And else ' OR '
+        return joiner.join(f"({format_expr(item)})" if type(item) in (And, Or) else format_expr(item)
+                           for item in expr.items)
+    if kind is Not:
+        return f"NOT ({format_expr(expr.item)})"
+    negation = ' NOT' if kind in (In, Between, Like) and expr.negated else ''
+    if kind is In:
+        return f"{expr.column}{negation} IN ({', '.join(map(format_value, expr.values))})"
+    if kind is Between:
+        return f"{expr.column}{negation} BETWEEN {format_value(expr.low)} AND {format_value(expr.high)}"
+    if kind is Like:
+        return f"{expr.column}{negation} LIKE {format_value(expr.pattern)}"
+    if kind is Range:
+        if expr.low_inclusive and expr.high_inclusive:
+            return f"{expr.column} BETWEEN {format_value(expr.low)} AND {format_value(expr.high)}"
+        return (f"{expr.column} {'>=' if expr.low_inclusive else '>'} {format_value(expr.low)} AND "
+                f"{expr.column} {'<=' if expr.high_inclusive else '<'} {format_value(expr.high)}")
+    column, operator, value = expr
+    return f"{column} {operator} {format_value(value)}"
+
+def rename_columns(expr, rename):
+    # 返回把每个列名替换为 rename(列名) 后的表达式
+    kind = type(expr)
+    if kind in (And, Or):
+        return kind(tuple(rename_columns(item, rename) for item in expr.items))
+    if kind is Not:
+        return Not(rename_columns(expr.item, rename))
+    if kind is tuple:
+        return (rename(expr[0]),) + expr[1:]
+    return expr._replace(column=rename(expr.column))
@@ -1,148 +1,427 @@
 # src/sql_parser.py
 
 import re
+import threading
+from collections import OrderedDict
+
+from src.sql_ast import FLIPPED_OPERATORS, Aggregate, And, Between, Comparison, In, Like, Not, Or
+
+class Placeholder:
+    # 预编译语句中的 ? 参数，执行时按出现顺序绑定
+    def __repr__(self):
+        return '?'
+
+PLACEHOLDER = Placeholder()
+
+# 单遍词法分析：一次 findall 在 C 层切出全部词法单元（名字、数字、运算符与标点、字符串），
+# 其余非空白字符单独成为一个单元，由解析器报错。数字在标点之前匹配，.5 不会被拆成 . 与 5
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z_0-9]*|\d+(?:\.\d*)?|\.\d+|<=|>=|!=|<>|[=<>(),*;.?-]|'(?:[^']|'')*'|\S")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(sql):
+    # 解析缓存的键：去掉首尾空白与结尾分号，折叠引号外的连续空白，引号内的字符串原样保留
+    sql = sql.strip().rstrip(';').strip()
+    if "'" not in sql:
+        return ' '.join(sql.split())
+    parts = sql.split("'")
+    parts[::2] = [_WHITESPACE.sub(' ', part) for part in parts[::2]]
+    return "'".join(parts)
+
+def count_parameters(node):
+    if node is PLACEHOLDER:
+        return 1
+    if isinstance(node, dict):
+        return sum(count_parameters(value) for value in node.values())
+    if isinstance(node, (list, tuple)):
+        return sum(count_parameters(value) for value in node)
+    return 0
+
+def bind_parameters(parsed, params):
+    # 按 ? 在语句中出现的顺序代入参数，返回新的解析结果，缓存中的结果保持不变
+    expected = parsed.get('param_count')
+    if expected is None:
+        expected = count_parameters(parsed)
+    if len(params) != expected:
+        raise ValueError(f"Statement expects {expected} parameter(s), got {len(params)}.")
+    if not expected:
+        return parsed
+    return _substitute(parsed, iter(params))
+
+def _substitute(node, params):
+    if node is PLACEHOLDER:
+        return next(params)
+    if isinstance(node, dict):
+        return {key: _substitute(value, params) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_substitute(value, params) for value in node]
+    if isinstance(node, tuple):
+        values = [_substitute(value, params) for value in node]
+        # 语法树节点是 namedtuple，按字段重建以保留节点类型
+        return type(node)(*values) if hasattr(node, '_fields') else tuple(values)
+    return node
 
 class SQLParser:
+    def __init__(self, cache_size=256):
+        # 解析结果的 LRU 缓存，键为规范化后的 SQL；缓存的结果是只读的
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # 多个线程共享同一个解析器时保护缓存；解析本身在锁外进行
+        self.cache_lock = threading.Lock()
+
     def parse(self, sql):
-        sql = sql.strip().rstrip(';')
-        
-        # 使用正则表达式时忽略大小写
-        if re.match(r'^CREATE\s+TABLE', sql, re.IGNORECASE):
-            return self._parse_create_table(sql)
-        elif re.match(r'^INSERT\s+INTO', sql, re.IGNORECASE):
-            return self._parse_insert_into(sql)
-        elif re.match(r'^SELECT', sql, re.IGNORECASE):
-            return self._parse_select(sql)
-        elif re.match(r'^ALTER\s+TABLE', sql, re.IGNORECASE):
-            return self._parse_alter_table(sql)
-        elif re.match(r'^DELETE\s+FROM', sql, re.IGNORECASE):
-            return self._parse_delete_from(sql)
-        elif re.match(r'^UPDATE', sql, re.IGNORECASE):
-            return self._parse_update(sql)
-        elif re.match(r'^DROP\s+TABLE', sql, re.IGNORECASE):
-            return self._parse_drop_table(sql)
-        elif re.match(r'^BEGIN\s+TRANSACTION$', sql, re.IGNORECASE):
-            return {"action": "BEGIN TRANSACTION"}
-        elif re.match(r'^COMMIT$', sql, re.IGNORECASE):
-            return {"action": "COMMIT"}
-        elif re.match(r'^ROLLBACK$', sql, re.IGNORECASE):
-            return {"action": "ROLLBACK"}
-        else:
-            raise ValueError(f"Unable to parse SQL statement: {sql}")
-
-    def _parse_create_table(self, sql):
-        pattern = r"CREATE\s+TABLE\s+(\w+)\s*\((.+)\)"
-        match = re.match(pattern, sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("CREATE TABLE syntax error.")
-        table_name = match.group(1)
-        columns_str = match.group(2)
-        columns = {}
-        for col_def in columns_str.split(','):
-            parts = col_def.strip().split()
-            if len(parts) != 2:
-                raise ValueError(f"Invalid column definition: {col_def}")
-            col_name, col_type = parts
-            columns[col_name] = col_type
-        return {"action": "CREATE TABLE", "table_name": table_name, "columns": columns}
-
-    def _parse_insert_into(self, sql):
-        pattern = r"INSERT\s+INTO\s+(\w+)\s*\((.+)\)\s+VALUES\s*\((.+)\)"
-        match = re.match(pattern, sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("INSERT INTO syntax error.")
-        table_name = match.group(1)
-        columns = [col.strip() for col in match.group(2).split(',')]
-        values = [val.strip().strip("'") for val in match.group(3).split(',')]
-        return {"action": "INSERT INTO", "table_name": table_name, "columns": columns, "values": values}
-
-    def _parse_select(self, sql):
-        pattern = r"SELECT\s+(.+)\s+FROM\s+(\w+)(?:\s+WHERE\s+(.+))?"
-        match = re.match(pattern, sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("SELECT syntax error.")
-        columns = [col.strip() for col in match.group(1).split(',')]
-        table_name = match.group(2)
-        where_clause = match.group(3)
-        where = None
-        if where_clause:
-            where = self._parse_where(where_clause)
-        return {"action": "SELECT", "columns": columns, "table_name": table_name, "where": where}
-
-    def _parse_alter_table(self, sql):
-        pattern_add = r"ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+(\w+)\s+(\w+)"
-        pattern_drop = r"ALTER\s+TABLE\s+(\w+)\s+DROP\s+COLUMN\s+(\w+)"
-        pattern_modify = r"ALTER\s+TABLE\s+(\w+)\s+MODIFY\s+COLUMN\s+(\w+)\s+(\w+)"
-        if re.search(r'ADD\s+COLUMN', sql, re.IGNORECASE):
-            match = re.match(pattern_add, sql, re.IGNORECASE)
-            if not match:
-                raise ValueError("ALTER TABLE ADD COLUMN syntax error.")
-            table_name, column_name, column_type = match.groups()
-            return {"action": "ALTER TABLE", "operation": "ADD COLUMN", "table_name": table_name, "column_name": column_name, "column_type": column_type}
-        elif re.search(r'DROP\s+COLUMN', sql, re.IGNORECASE):
-            match = re.match(pattern_drop, sql, re.IGNORECASE)
-            if not match:
-                raise ValueError("ALTER TABLE DROP COLUMN syntax error.")
-            table_name, column_name = match.groups()
-            return {"action": "ALTER TABLE", "operation": "DROP COLUMN", "table_name": table_name, "column_name": column_name}
-        elif re.search(r'MODIFY\s+COLUMN', sql, re.IGNORECASE):
-            match = re.match(pattern_modify, sql, re.IGNORECASE)
-            if not match:
-                raise ValueError("ALTER TABLE MODIFY COLUMN syntax error.")
-            table_name, column_name, column_type = match.groups()
-            return {"action": "ALTER TABLE", "operation": "MODIFY COLUMN", "table_name": table_name, "column_name": column_name, "column_type": column_type}
+        key = normalize_sql(sql)
+        with self.cache_lock:
+            parsed = self.cache.get(key)
+            if parsed is not None:
+                self.cache_hits += 1
+                self.cache.move_to_end(key)
+                return parsed
+            self.cache_misses += 1
+        parsed = self._parse(key)
+        # 参数个数只在解析时统计一次；语句中没有 ? 时不必遍历
+        parsed['param_count'] = count_parameters(parsed) if '?' in key else 0
+        if self.cache_size > 0:
+            with self.cache_lock:
+                self.cache[key] = parsed
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return parsed
+
+    def cache_info(self):
+        return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                'size': len(self.cache), 'capacity': self.cache_size}
+
+    def _parse(self, sql):
+        return _Parser(tokenize(sql), sql).statement()
+
+def tokenize(sql):
+    return _TOKEN.findall(sql)
+
+class _Parser:
+    # 递归下降解析器：每种语句一个方法，WHERE 表达式按 OR < AND < NOT < 谓词 的优先级解析。
+    # tokens 为词法单元原文，keys 为其大写形式，用于匹配关键字与符号；末尾的空串表示语句结束。
+    def __init__(self, tokens, sql):
+        tokens.append('')
+        self.tokens = tokens
+        self.keys = [key if key != '<>' else '!=' for key in map(str.upper, tokens)]
+        self.pos = 0
+        self.sql = sql
+
+    def statement(self):
+        method = self._STATEMENTS.get(self.keys[0])
+        if method is None:
+            raise ValueError(f"Unable to parse SQL statement: {self.sql}")
+        self.pos = 1
+        parsed = method(self)
+        self.accept(';')
+        if self.tokens[self.pos]:
+            self.error('end of statement')
+        return parsed
+
+    # ---- 词法单元操作 ----
+    def peek(self):
+        return self.keys[self.pos]
+
+    def accept(self, key):
+        if self.keys[self.pos] == key:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, key):
+        if self.keys[self.pos] != key:
+            self.error(key)
+        self.pos += 1
+
+    def name(self):
+        token = self.tokens[self.pos]
+        if not (token[:1].isalpha() or token[:1] == '_'):
+            self.error('a name')
+        self.pos += 1
+        return token
+
+    def error(self, expected):
+        token = self.tokens[self.pos]
+        if token == "'":
+            raise ValueError(f"Unterminated string literal in SQL statement: {self.sql}")
+        near = f"'{token}'" if token else 'end of statement'
+        raise ValueError(f"SQL syntax error near {near}: expected {expected}.")
+
+    def comma_list(self, item):
+        items = [item()]
+        while self.keys[self.pos] == ',':
+            self.pos += 1
+            items.append(item())
+        return items
+
+    # ---- 语句 ----
+    def create(self):
+        if self.accept('TABLE'):
+            table_name = self.name()
+            self.expect('(')
+            columns = {}
+            for col_name, col_type in self.comma_list(self.column_definition):
+                columns[col_name] = col_type
+            self.expect(')')
+            storage = None
+            if self.accept('STORAGE'):
+                self.accept('=')
+                storage = self.name().upper()
+            return {"action": "CREATE TABLE", "table_name": table_name, "columns": columns, "storage": storage}
+        if self.accept('INDEX'):
+            index_name = self.name()
+            self.expect('ON')
+            table_name = self.name()
+            self.expect('(')
+            column_name = self.name()
+            self.expect(')')
+            index_type = self.name().upper() if self.accept('USING') else 'SORTED'
+            return {"action": "CREATE INDEX", "index_name": index_name, "table_name": table_name,
+                    "column_name": column_name, "index_type": index_type}
+        self.error('TABLE or INDEX')
+
+    def column_definition(self):
+        return self.name(), self.name()
+
+    def drop(self):
+        if self.accept('TABLE'):
+            return {"action": "DROP TABLE", "table_name": self.name()}
+        if self.accept('INDEX'):
+            index_name = self.name()
+            table_name = self.name() if self.accept('ON') else None
+            return {"action": "DROP INDEX", "index_name": index_name, "table_name": table_name}
+        self.error('TABLE or INDEX')
+
+    def insert(self):
+        self.expect('INTO')
+        table_name = self.name()
+        columns = None
+        if self.accept('('):
+            columns = self.comma_list(self.name)
+            self.expect(')')
+        self.expect('VALUES')
+        rows = self.comma_list(self.value_row)
+        return {"action": "INSERT INTO", "table_name": table_name, "columns": columns, "rows": rows}
+
+    def value_row(self):
+        self.expect('(')
+        values = self.comma_list(self.value)
+        self.expect(')')
+        return values
+
+    def select(self):
+        if self.accept('*'):
+            columns = ["*"]
         else:
-            raise ValueError("Unsupported ALTER TABLE operation.")
-
-    def _parse_delete_from(self, sql):
-        pattern = r"DELETE\s+FROM\s+(\w+)(?:\s+WHERE\s+(.+))?"
-        match = re.match(pattern, sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("DELETE FROM syntax error.")
-        table_name = match.group(1)
-        where_clause = match.group(2)
-        where = None
-        if where_clause:
-            where = self._parse_where(where_clause)
-        return {"action": "DELETE FROM", "table_name": table_name, "where": where}
-
-    def _parse_update(self, sql):
-        pattern = r"UPDATE\s+(\w+)\s+SET\s+(.+?)(?:\s+WHERE\s+(.+))?$"
-        match = re.match(pattern, sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("UPDATE syntax error.")
-        table_name = match.group(1)
-        set_clause = match.group(2)
-        where_clause = match.group(3)
+            columns = self.comma_list(self.select_item)
+        self.expect('FROM')
+        table_name = self.name()
+        joins = []
+        while self.keys[self.pos] in ('JOIN', 'INNER'):
+            self.accept('INNER')
+            self.expect('JOIN')
+            join_table = self.name()
+            self.expect('ON')
+            left = self.column_ref()
+            self.expect('=')
+            joins.append({"table_name": join_table, "left": left, "right": self.column_ref()})
+        where = self.where()
+        group_by = []
+        if self.accept('GROUP'):
+            self.expect('BY')
+            group_by = self.comma_list(self.column_ref)
+        having = self.expression() if self.accept('HAVING') else None
+        order_by = []
+        if self.accept('ORDER'):
+            self.expect('BY')
+            order_by = self.comma_list(self.order_item)
+        limit = self.value() if self.accept('LIMIT') else None
+        offset = self.value() if self.accept('OFFSET') else 0
+        return {"action": "SELECT", "columns": columns, "table_name": table_name, "joins": joins, "where": where,
+                "group_by": group_by, "having": having, "order_by": order_by, "limit": limit, "offset": offset}
+
+    def order_item(self):
+        # (列或聚合函数, 是否降序)
+        item = self.select_item()
+        if self.accept('DESC'):
+            return item, True
+        self.accept('ASC')
+        return item, False
+
+    def select_item(self):
+        return self.aggregate() if self.is_aggregate() else self.column_ref()
+
+    def is_aggregate(self):
+        return self.keys[self.pos] in AGGREGATE_FUNCTIONS and self.keys[self.pos + 1] == '('
+
+    def aggregate(self):
+        function = self.keys[self.pos]
+        self.pos += 2
+        column = None
+        if not (function == 'COUNT' and self.accept('*')):
+            column = self.column_ref()
+        self.expect(')')
+        return Aggregate(function, column)
+
+    def column_ref(self):
+        # 列名，可以带表名限定：table.column
+        name = self.name()
+        if self.keys[self.pos] == '.':
+            self.pos += 1
+            return f"{name}.{self.name()}"
+        return name
+
+    def alter(self):
+        self.expect('TABLE')
+        table_name = self.name()
+        parsed = {"action": "ALTER TABLE", "table_name": table_name}
+        for operation in ('ADD', 'DROP', 'MODIFY'):
+            if self.accept(operation):
+                self.accept('COLUMN')
+                parsed["operation"] = f"{operation} COLUMN"
+                parsed["column_name"] = self.name()
+                if operation != 'DROP':
+                    parsed["column_type"] = self.name()
+                return parsed
+        self.error('ADD, DROP or MODIFY')
+
+    def delete(self):
+        self.expect('FROM')
+        table_name = self.name()
+        return {"action": "DELETE FROM", "table_name": table_name, "where": self.where()}
+
+    def update(self):
+        table_name = self.name()
+        self.expect('SET')
         set_values = {}
-        for assignment in set_clause.split(','):
-            parts = assignment.strip().split('=')
-            if len(parts) != 2:
-                raise ValueError(f"Invalid SET assignment: {assignment}")
-            col, val = parts
-            set_values[col.strip()] = val.strip().strip("'")
-        where = None
-        if where_clause:
-            where = self._parse_where(where_clause)
-        return {"action": "UPDATE", "table_name": table_name, "set_values": set_values, "where": where}
-
-    def _parse_drop_table(self, sql):
-        pattern = r"DROP\s+TABLE\s+(\w+)"
-        match = re.match(pattern, sql, re.IGNORECASE)
-        if not match:
-            raise ValueError("DROP TABLE syntax error.")
-        table_name = match.group(1)
-        return {"action": "DROP TABLE", "table_name": table_name}
-
-    def _parse_where(self, clause):
-        # 简单的WHERE子句解析器，支持 "column operator value"
-        pattern = r"(\w+)\s*(=|<|>)\s*('?[\w\s]+'?)"
-        match = re.match(pattern, clause, re.IGNORECASE)
-        if not match:
-            raise ValueError("WHERE clause syntax error.")
-        column, operator, value = match.groups()
-        value = value.strip("'")  # 去除引号
-        # 尝试转换为整数
-        if value.isdigit():
-            value = int(value)
-        return (column, operator, value)
+        for col, val in self.comma_list(self.assignment):
+            set_values[col] = val
+        return {"action": "UPDATE", "table_name": table_name, "set_values": set_values, "where": self.where()}
+
+    def assignment(self):
+        col = self.name()
+        self.expect('=')
+        return col, self.value()
+
+    def explain(self):
+        self.expect('SELECT')
+        return {"action": "EXPLAIN", "query": self.select()}
+
+    def begin(self):
+        self.accept('TRANSACTION')
+        return {"action": "BEGIN TRANSACTION"}
+
+    def commit(self):
+        self.accept('TRANSACTION')
+        return {"action": "COMMIT"}
+
+    def rollback(self):
+        self.accept('TRANSACTION')
+        return {"action": "ROLLBACK"}
+
+    def save(self):
+        return {"action": "SAVE", "path": self.value()}
+
+    def load(self):
+        return {"action": "LOAD", "path": self.value()}
+
+    def show(self):
+        if self.accept('STATS'):
+            return {"action": "SHOW STATS"}
+        self.expect('SLOW')
+        self.expect('QUERIES')
+        return {"action": "SHOW SLOW QUERIES"}
+
+    _STATEMENTS = {
+        'CREATE': create, 'DROP': drop, 'INSERT': insert, 'SELECT': select, 'ALTER': alter,
+        'DELETE': delete, 'UPDATE': update, 'BEGIN': begin, 'COMMIT': commit, 'ROLLBACK': rollback,
+        'EXPLAIN': explain, 'SAVE': save, 'LOAD': load,
+        'SHOW': show,
+    }
+
+    # ---- 表达式 ----
+    def where(self):
+        return self.expression() if self.accept('WHERE') else None
+
+    def expression(self):
+        items = [self.conjunction()]
+        while self.accept('OR'):
+            items.append(self.conjunction())
+        return items[0] if len(items) == 1 else Or(tuple(items))
+
+    def conjunction(self):
+        items = [self.negation()]
+        while self.accept('AND'):
+            items.append(self.negation())
+        return items[0] if len(items) == 1 else And(tuple(items))
+
+    def negation(self):
+        if self.accept('NOT'):
+            return Not(self.negation())
+        if self.accept('('):
+            expr = self.expression()
+            self.expect(')')
+            return expr
+        return self.predicate()
+
+    def predicate(self):
+        left_is_column, left = self.operand()
+        key = self.keys[self.pos]
+        if key in FLIPPED_OPERATORS:
+            self.pos += 1
+            right_is_column, right = self.operand()
+            if left_is_column and not right_is_column:
+                return Comparison(left, key, right)
+            if right_is_column and not left_is_column:
+                return Comparison(right, FLIPPED_OPERATORS[key], left)
+            raise ValueError("Comparisons must be between a column and a value.")
+        if not left_is_column:
+            self.error('a column')
+        negated = self.accept('NOT')
+        if self.accept('IN'):
+            return In(left, tuple(self.value_row()), negated)
+        if self.accept('BETWEEN'):
+            low = self.value()
+            self.expect('AND')
+            return Between(left, low, self.value(), negated)
+        if self.accept('LIKE'):
+            return Like(left, self.value(), negated)
+        self.error('a comparison operator, IN, BETWEEN or LIKE')
+
+    def operand(self):
+        # 返回 (是否为列, 列名或值)
+        token = self.tokens[self.pos]
+        if (token[:1].isalpha() or token[:1] == '_') and self.keys[self.pos] not in _LITERAL_NAMES:
+            # HAVING 中的聚合函数与列一样作为比较的左侧
+            return True, self.aggregate() if self.is_aggregate() else self.column_ref()
+        return False, self.value()
+
+    def value(self):
+        token = self.tokens[self.pos]
+        first = token[:1]
+        if first == "'" and len(token) > 1:
+            self.pos += 1
+            return token[1:-1].replace("''", "'")
+        if _is_number(token):
+            self.pos += 1
+            return float(token) if '.' in token else int(token)
+        key = self.keys[self.pos]
+        if key == '?':
+            self.pos += 1
+            return PLACEHOLDER
+        if key in _LITERAL_NAMES:
+            self.pos += 1
+            return _LITERAL_NAMES[key]
+        if key == '-' and _is_number(self.tokens[self.pos + 1]):
+            self.pos += 1
+            return -self.value()
+        self.error('a value')
+
+def _is_number(token):
+    # 数字单元以数字开头，或是 . 后接数字（单独的 . 是标点）
+    return token[:1].isdigit() or (token[:1] == '.' and len(token) > 1)
+
+_LITERAL_NAMES = {'NULL': None, 'TRUE': True, 'FALSE': False}
+AGGREGATE_FUNCTIONS = ('COUNT', 'SUM', 'MIN', 'MAX', 'AVG')
@@ -0,0 +1,588 @@
+# src/storage.py
+
+import sys
+from array import array
+from operator import itemgetter
+
+from src import datatypes
+from src.predicate import compile_predicate
+
+# 流式扫描每批拼装的行数
+SCAN_BATCH = 1024
+
+def _merge_rows(rows, entries):
+    # entries 为按原位置升序排列的 (pos, row)，与剩余行归并得到删除前的顺序
+    merged = []
+    remaining = iter(rows)
+    for pos, row in entries:
+        while len(merged) < pos:
+            merged.append(next(remaining))
+        merged.append(row)
+    merged.extend(remaining)
+    return merged
+
+def _without_positions(seq, positions):
+    # positions 升序；按区间切片拼接剩余元素，list 与 array 都适用
+    result = seq[:0]
+    prev = 0
+    for pos in positions:
+        if pos > prev:
+            result += seq[prev:pos]
+        prev = pos + 1
+    result += seq[prev:]
+    return result
+
+def row_store_bytes(rows):
+    # 估算以行存储（tuple 的 list）存放这些行所需的内存；None 与小整数是共享对象，不计入
+    total = sys.getsizeof([])
+    for row in rows:
+        total += 8 + sys.getsizeof(tuple(row))
+        for value in row:
+            if value is None or (type(value) is int and -5 <= value <= 256):
+                continue
+            total += sys.getsizeof(value)
+    return total
+
+class RowStorage:
+    # 默认的行存储：每行是一个 tuple，比 list 少一次分配与预留的空位；
+    # 修改时整行替换为新的 tuple，不原地修改。
+    # ADD COLUMN 只增加 width，不改写已有的行：行的长度是它写入时的宽度，比 width 短的行缺少的槽位读作 NULL。
+    # full_width 为所有行都具有的槽位数，只读取其中槽位的查询走不补齐的快速路径；compact() 把所有行补齐
+    storage_type = 'ROW'
+
+    def __init__(self, column_types):
+        self.rows = []
+        self.width = self.full_width = len(column_types)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _pad(self, row):
+        return row + (None,) * (self.width - len(row)) if len(row) < self.width else row
+
+    def _source(self, col_indices):
+        # 读取 col_indices 时使用的行：含有短行缺少的槽位时逐行补齐
+        if col_indices and max(col_indices) >= self.full_width:
+            return list(map(self._pad, self.rows))
+        return self.rows
+
+    def append(self, values):
+        self.rows.append(tuple(values))
+
+    def extend(self, rows):
+        self.rows.extend(map(tuple, rows))
+
+    def pop(self):
+        return self._pad(self.rows.pop())
+
+    def get_row(self, pos):
+        return list(self._pad(self.rows[pos]))
+
+    def get_cell(self, pos, col_idx):
+        row = self.rows[pos]
+        return row[col_idx] if col_idx < len(row) else None
+
+    def set_cell(self, pos, col_idx, value):
+        row = self._pad(self.rows[pos])
+        self.rows[pos] = row[:col_idx] + (value,) + row[col_idx + 1:]
+
+    def set_row(self, pos, values):
+        self.rows[pos] = tuple(values)
+
+    def column(self, col_idx):
+        if col_idx >= self.full_width:
+            return [row[col_idx] if col_idx < len(row) else None for row in self.rows]
+        return list(map(itemgetter(col_idx), self.rows))
+
+    def project(self, positions, col_indices):
+        rows = self._source(col_indices)
+        if positions is None:
+            return [[row[idx] for idx in col_indices] for row in rows]
+        return [[rows[pos][idx] for idx in col_indices] for pos in positions]
+
+    def column_batches(self, positions, col_indices, batch_size=SCAN_BATCH):
+        # 按批生成 (行数, [各列的值])，供按列处理的算子（如散列聚合）使用，不拼装行
+        rows = self._source(col_indices)
+        count = len(rows) if positions is None else len(positions)
+        for start in range(0, count, batch_size):
+            if positions is None:
+                batch = rows[start:start + batch_size]
+            else:
+                batch = list(map(rows.__getitem__, positions[start:start + batch_size]))
+            yield len(batch), [list(map(itemgetter(idx), batch)) for idx in col_indices]
+
+    def take(self, positions, col_idx):
+        # 一列在给定位置上的值，用于只对候选行求值的过滤条件
+        rows = self.rows
+        if col_idx >= self.full_width:
+            return [self.get_cell(pos, col_idx) for pos in positions]
+        return [rows[pos][col_idx] for pos in positions]
+
+    def scan(self, positions, col_indices):
+        # 逐行生成投影结果，不物化整个结果集；需要补齐时逐行补齐
+        rows = self.rows
+        source = rows if positions is None else map(rows.__getitem__, positions)
+        if col_indices and max(col_indices) >= self.full_width:
+            source = map(self._pad, source)
+        for row in source:
+            yield [row[idx] for idx in col_indices]
+
+    def assign(self, positions, assignments):
+        rows = self.rows
+        for pos in positions:
+            row = list(self._pad(rows[pos]))
+            for col_idx, value in assignments:
+                row[col_idx] = value
+            rows[pos] = tuple(row)
+
+    def delete(self, positions):
+        self.rows = _without_positions(self.rows, positions)
+
+    def insert_rows(self, entries):
+        self.rows = _merge_rows(self.rows, [(pos, tuple(row)) for pos, row in entries])
+
+    def truncate(self):
+        state, self.rows = (self.rows, self.full_width), []
+        self.full_width = self.width
+        return state
+
+    def restore(self, state):
+        self.rows, self.full_width = state
+
+    def load(self, rows):
+        self.rows = list(map(tuple, rows))
+        self.full_width = min(map(len, self.rows), default=self.width)
+
+    def to_rows(self):
+        return list(map(list, map(self._pad, self.rows)))
+
+    def add_column(self, column_type):
+        # 只增加槽位，已有的行在读取时补齐
+        self.width += 1
+        if not self.rows:
+            self.full_width = self.width
+
+    def remove_column(self):
+        # 撤销 add_column：去掉末尾的槽位，其后写入的行已先行撤销，留在行中的值都是 NULL
+        self.width -= 1
+        self.full_width = min(self.full_width, self.width)
+
+    def compact(self, slots, column_types):
+        # 把所有行改写为按 slots 排列的紧凑布局：去掉不再引用的槽位，补齐短行
+        source = self._source(slots)
+        if len(slots) > 1:
+            self.rows = list(map(itemgetter(*slots), source))
+        else:
+            self.rows = [tuple(row[slot] for slot in slots) for row in source]
+        self.width = self.full_width = len(slots)
+
+    def replace_column(self, col_idx, column_type, values):
+        # MODIFY COLUMN：values 为转换后的整列
+        rows = self._source((col_idx,))
+        if rows is not self.rows:
+            self.full_width = self.width
+        self.rows = [row[:col_idx] + (value,) + row[col_idx + 1:] for row, value in zip(rows, values)]
+
+    def memory_usage(self):
+        return row_store_bytes(self.rows)
+
+class FixedColumn:
+    # 定长类型（INT、FLOAT、BOOLEAN、DATE、TIMESTAMP）的列：值的定长编码存放在 array 中，NULL 由位图标记。
+    # INT 与 FLOAT 的编码就是值本身；其他类型写入时编码、读取时解码（见 src/datatypes.py）
+    def __init__(self, column_type, values=()):
+        self.type = column_type
+        if not isinstance(values, (list, array)):
+            values = list(values)
+        null_positions = [pos for pos, value in enumerate(values) if value is None]
+        self.data = array(column_type.typecode, self._encoded(values, bool(null_positions)))
+        self.nulls = bytearray((len(values) + 7) >> 3)  # 第 pos 位为 1 表示该行为 NULL
+        for pos in null_positions:
+            self.nulls[pos >> 3] |= 1 << (pos & 7)
+        self.null_count = len(null_positions)
+
+    def __len__(self):
+        return len(self.data)
+
+    def _encoded(self, values, has_nulls=True):
+        # NULL 的位置存 0
+        encode = self.type.encode
+        if encode is None:
+            return [0 if value is None else value for value in values] if has_nulls else values
+        return [0 if value is None else encode(value) for value in values]
+
+    def _decoded(self, data):
+        decode = self.type.decode
+        return data if decode is None else list(map(decode, data))
+
+    def _is_null(self, pos):
+        return self.nulls[pos >> 3] >> (pos & 7) & 1
+
+    def append(self, value):
+        pos = len(self.data)
+        encode = self.type.encode
+        # 先写数据，超出 64 位时在修改位图前抛出 OverflowError
+        self.data.append(0 if value is None else value if encode is None else encode(value))
+        if pos & 7 == 0:
+            self.nulls.append(0)
+        if value is None:
+            self.nulls[pos >> 3] |= 1 << (pos & 7)
+            self.null_count += 1
+
+    def extend(self, values):
+        start = len(self.data)
+        null_positions = [i for i, value in enumerate(values) if value is None]
+        # 先构造完整的数组，超出 64 位时在修改任何状态前抛出 OverflowError
+        self.data += array(self.type.typecode, self._encoded(values, bool(null_positions)))
+        self.nulls.extend(bytes(((len(self.data) + 7) >> 3) - len(self.nulls)))
+        for i in null_positions:
+            pos = start + i
+            self.nulls[pos >> 3] |= 1 << (pos & 7)
+        self.null_count += len(null_positions)
+
+    def pop(self):
+        pos = len(self.data) - 1
+        value = self.get(pos)
+        del self.data[pos]
+        if value is None:
+            self.nulls[pos >> 3] &= ~(1 << (pos & 7))
+            self.null_count -= 1
+        if pos & 7 == 0:
+            del self.nulls[-1]
+        return value
+
+    def compare(self, operator, value, positions=None):
+        # 在编码后的数组上比较，不解码（编码保持值的顺序）；positions 为候选位置，None 表示整列。
+        # NULL 的位置存 0，需要排除
+        encode = self.type.encode
+        data = self.data if positions is None else list(map(self.data.__getitem__, positions))
+        hits = compile_predicate(operator, value if encode is None else encode(value))(data)
+        if positions is not None:
+            hits = list(map(positions.__getitem__, hits))
+        if self.null_count:
+            hits = [pos for pos in hits if not self._is_null(pos)]
+        return hits
+
+    def get(self, pos):
+        if self.null_count and self._is_null(pos):
+            return None
+        decode = self.type.decode
+        return self.data[pos] if decode is None else decode(self.data[pos])
+
+    def set(self, pos, value):
+        was_null = self._is_null(pos)
+        if value is None:
+            self.data[pos] = 0
+            self.nulls[pos >> 3] |= 1 << (pos & 7)
+            self.null_count += not was_null
+        else:
+            encode = self.type.encode
+            self.data[pos] = value if encode is None else encode(value)
+            self.nulls[pos >> 3] &= ~(1 << (pos & 7))
+            self.null_count -= was_null
+
+    def delete(self, positions):
+        if self.null_count:
+            rebuilt = FixedColumn(self.type, _without_positions(self.values(), positions))
+            self.data, self.nulls, self.null_count = rebuilt.data, rebuilt.nulls, rebuilt.null_count
+        else:
+            self.data = _without_positions(self.data, positions)
+            self.nulls = bytearray((len(self.data) + 7) >> 3)
+
+    def values(self):
+        # INT / FLOAT 列没有 NULL 时直接返回底层数组，调用方只读
+        return self.slice(0, len(self.data))
+
+    def slice(self, start, stop):
+        data = self.data[start:stop] if start or stop < len(self.data) else self.data
+        if not self.null_count:
+            return self._decoded(data)
+        nulls = self.nulls
+        decode = self.type.decode
+        return [None if nulls[i >> 3] >> (i & 7) & 1 else value if decode is None else decode(value)
+                for i, value in enumerate(data, start)]
+
+    def memory_usage(self):
+        return sys.getsizeof(self.data) + sys.getsizeof(self.nulls)
+
+class DictColumn:
+    # 字典编码列：每行存一个编码，-1 表示 NULL，不同的值只在字符串池中存放一次
+    def __init__(self, values=()):
+        self.codes = array('i')
+        self.pool = []
+        self.lookup = {}
+        for value in values:
+            self.append(value)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _encode(self, value):
+        if value is None:
+            return -1
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.pool)
+            self.pool.append(value)
+            self.lookup[value] = code
+        return code
+
+    def append(self, value):
+        self.codes.append(self._encode(value))
+
+    def extend(self, values):
+        self.codes.extend(map(self._encode, values))
+
+    def pop(self):
+        code = self.codes.pop()
+        return None if code < 0 else self.pool[code]
+
+    def get(self, pos):
+        code = self.codes[pos]
+        return None if code < 0 else self.pool[code]
+
+    def set(self, pos, value):
+        self.codes[pos] = self._encode(value)
+
+    def delete(self, positions):
+        # 编码池保持不变，删除后未被引用的值在重建列时才会被回收
+        self.codes = _without_positions(self.codes, positions)
+
+    def values(self):
+        pool = self.pool
+        return [None if code < 0 else pool[code] for code in self.codes]
+
+    def slice(self, start, stop):
+        pool = self.pool
+        return [None if code < 0 else pool[code] for code in self.codes[start:stop]]
+
+    def memory_usage(self):
+        return (sys.getsizeof(self.codes) + sys.getsizeof(self.pool) + sys.getsizeof(self.lookup)
+                + sum(sys.getsizeof(value) for value in self.pool))
+
+class NullColumn:
+    # ADD COLUMN 为已有的行添加的列：值全为 NULL，不占用与行数成正比的内存；
+    # 写入等其他操作先把它换成真正的列（之后都由它完成）
+    def __init__(self, column_type, length):
+        self.column_type = column_type
+        self.length = length
+        self.column = None
+
+    def __len__(self):
+        return self.length if self.column is None else len(self.column)
+
+    def __getattr__(self, name):
+        column = self.__dict__['column']
+        if column is None:
+            column = self.column = _make_column(self.column_type, [None] * self.length)
+        return getattr(column, name)
+
+    def get(self, pos):
+        return None if self.column is None else self.column.get(pos)
+
+    def values(self):
+        return [None] * self.length if self.column is None else self.column.values()
+
+    def slice(self, start, stop):
+        return [None] * (min(stop, self.length) - start) if self.column is None else self.column.slice(start, stop)
+
+    def pop(self):
+        if self.column is not None:
+            return self.column.pop()
+        self.length -= 1
+        return None
+
+    def delete(self, positions):
+        if self.column is not None:
+            return self.column.delete(positions)
+        self.length -= len(positions)
+
+    def memory_usage(self):
+        return sys.getsizeof(self) if self.column is None else self.column.memory_usage()
+
+def _make_column(column_type, values=()):
+    declared = datatypes.column_type(column_type)
+    if declared.typecode is not None:
+        try:
+            return FixedColumn(declared, values)
+        except OverflowError:
+            pass  # 超出 64 位的整数退回字典编码
+    return DictColumn(values)
+
+class ColumnarStorage:
+    # 列存储：定长类型的列为 FixedColumn，其他列为 DictColumn，行只在读取时拼装
+    storage_type = 'COLUMNAR'
+
+    def __init__(self, column_types):
+        self.column_types = list(column_types)
+        self.columns = [_make_column(column_type) for column_type in self.column_types]
+        self.row_count = 0
+
+    def __len__(self):
+        return self.row_count
+
+    @property
+    def width(self):
+        return len(self.columns)
+
+    # 每列都有全部的行（新增的列为 NullColumn）
+    full_width = width
+
+    def _demote(self, col_idx):
+        column = self.columns[col_idx]
+        self.columns[col_idx] = DictColumn(column.values())
+        return self.columns[col_idx]
+
+    def append(self, values):
+        for col_idx, (column, value) in enumerate(zip(self.columns, values)):
+            try:
+                column.append(value)
+            except OverflowError:
+                self._demote(col_idx).append(value)
+        self.row_count += 1
+
+    def extend(self, rows):
+        # 批量追加：按列整体写入，而不是逐行逐列
+        for col_idx, values in enumerate(zip(*rows)):
+            try:
+                self.columns[col_idx].extend(values)
+            except OverflowError:
+                self._demote(col_idx).extend(values)
+        self.row_count += len(rows)
+
+    def pop(self):
+        self.row_count -= 1
+        return [column.pop() for column in self.columns]
+
+    def get_row(self, pos):
+        return [column.get(pos) for column in self.columns]
+
+    def get_cell(self, pos, col_idx):
+        return self.columns[col_idx].get(pos)
+
+    def set_cell(self, pos, col_idx, value):
+        try:
+            self.columns[col_idx].set(pos, value)
+        except OverflowError:
+            self._demote(col_idx).set(pos, value)
+
+    def set_row(self, pos, values):
+        for col_idx, value in enumerate(values):
+            self.set_cell(pos, col_idx, value)
+
+    def column(self, col_idx):
+        return self.columns[col_idx].values()
+
+    def compare(self, col_idx, operator, value, positions=None):
+        # 定长列直接比较编码后的数组，返回满足条件的位置；其他列返回 None，由调用方扫描解码后的值
+        column = self.columns[col_idx]
+        if type(column) is NullColumn:
+            if column.column is None:
+                return []  # 全为 NULL，与任何值比较的结果都不为真
+            column = column.column
+        compare = getattr(column, 'compare', None)
+        return None if compare is None else compare(operator, value, positions)
+
+    def project(self, positions, col_indices):
+        if positions is None:
+            if not col_indices:
+                return [[] for _ in range(self.row_count)]
+            return [list(row) for row in zip(*(self.columns[idx].values() for idx in col_indices))]
+        getters = [self.columns[idx].get for idx in col_indices]
+        return [[get(pos) for get in getters] for pos in positions]
+
+    def column_batches(self, positions, col_indices, batch_size=SCAN_BATCH):
+        columns = [self.columns[idx] for idx in col_indices]
+        count = self.row_count if positions is None else len(positions)
+        for start in range(0, count, batch_size):
+            stop = min(start + batch_size, count)
+            if positions is None:
+                yield stop - start, [column.slice(start, stop) for column in columns]
+            else:
+                batch = positions[start:stop]
+                yield stop - start, [list(map(column.get, batch)) for column in columns]
+
+    def take(self, positions, col_idx):
+        return list(map(self.columns[col_idx].get, positions))
+
+    def scan(self, positions, col_indices):
+        # 按批拼装行：全表扫描时每批从各列切片，内存占用与表大小无关
+        if positions is None:
+            columns = [self.columns[idx] for idx in col_indices]
+            for start in range(0, self.row_count, SCAN_BATCH):
+                stop = min(start + SCAN_BATCH, self.row_count)
+                if not columns:
+                    yield from ([] for _ in range(start, stop))
+                    continue
+                yield from map(list, zip(*(column.slice(start, stop) for column in columns)))
+            return
+        for start in range(0, len(positions), SCAN_BATCH):
+            yield from self.project(positions[start:start + SCAN_BATCH], col_indices)
+
+    def _rebuild(self, rows):
+        self.columns = [
+            _make_column(column_type, [row[col_idx] for row in rows])
+            for col_idx, column_type in enumerate(self.column_types)
+        ]
+        self.row_count = len(rows)
+
+    def assign(self, positions, assignments):
+        for col_idx, value in assignments:
+            for pos in positions:
+                self.set_cell(pos, col_idx, value)
+
+    def delete(self, positions):
+        for column in self.columns:
+            column.delete(positions)
+        self.row_count -= len(positions)
+
+    def insert_rows(self, entries):
+        self._rebuild(_merge_rows(self.to_rows(), entries))
+
+    def truncate(self):
+        state = (self.columns, self.row_count)
+        self.columns = [_make_column(column_type) for column_type in self.column_types]
+        self.row_count = 0
+        return state
+
+    def restore(self, state):
+        self.columns, self.row_count = state
+
+    def load(self, rows):
+        self._rebuild(rows)
+
+    def to_rows(self):
+        return self.project(None, range(len(self.columns)))
+
+    def add_column(self, column_type):
+        self.column_types.append(column_type)
+        self.columns.append(NullColumn(column_type, self.row_count))
+
+    def remove_column(self):
+        self.column_types.pop()
+        self.columns.pop()
+
+    def compact(self, slots, column_types):
+        # 列存储中的列各自独立，去掉不再引用的列、按列的顺序重排即可
+        self.columns = [self.columns[slot] for slot in slots]
+        self.column_types = list(column_types)
+
+    def replace_column(self, col_idx, column_type, values):
+        self.column_types[col_idx] = column_type
+        self.columns[col_idx] = _make_column(column_type, values)
+
+    def memory_usage(self):
+        return sys.getsizeof(self.columns) + sum(column.memory_usage() for column in self.columns)
+
+    def row_store_estimate(self):
+        return row_store_bytes(zip(*(column.values() for column in self.columns)))
+
+STORAGE_TYPES = {
+    'ROW': RowStorage,
+    'COLUMNAR': ColumnarStorage,
+}
+
+def create_storage(storage_type, column_types):
+    storage_cls = STORAGE_TYPES.get(storage_type.upper())
+    if storage_cls is None:
+        raise ValueError(f"Unsupported storage type '{storage_type}'")
+    return storage_cls(column_types)
@@ -0,0 +1,213 @@
+# src/transaction.py
+
+import threading
+
+class UndoLog:
+    # 事务期间每个写操作登记一个撤销函数及其参数，回滚时逆序回放。
+    # 挂接预写日志（wal）后，写操作还会记录重做信息：事务内的先缓存到 COMMIT，事务外的立即提交。
+    def __init__(self):
+        self.active = False
+        self.entries = []
+        self.wal = None
+        self.redo = []
+
+    def begin(self):
+        self.entries = []
+        self.redo = []
+        self.active = True
+
+    def record(self, undo, *args):
+        if self.active:
+            self.entries.append((undo, args))
+
+    def log(self, *op):
+        if self.wal is None:
+            return
+        if self.active:
+            self.redo.append(op)
+        else:
+            self.wal.commit([op])
+
+    def commit(self):
+        redo = self.redo
+        self.entries = []
+        self.redo = []
+        self.active = False
+        if redo and self.wal is not None:
+            self.wal.commit(redo)
+
+    def rollback(self):
+        # 回放期间不再记录新的撤销项；未提交的重做信息直接丢弃
+        self.active = False
+        self.redo = []
+        entries, self.entries = self.entries, []
+        for undo, args in reversed(entries):
+            undo(*args)
+
+# 等待表锁的默认超时（秒）；超时说明可能发生了死锁（如两个事务都要把共享锁升级为排他锁）
+LOCK_TIMEOUT = 10.0
+
+class TableLock:
+    # 表级读写锁。持有者为会话，可重入；会话只持有共享锁而没有其他读者时可以升级为排他锁。
+    # 有会话在等待排他锁时，没有持有这张表的新读者排队等待，避免写者饥饿
+    def __init__(self, name):
+        self.name = name
+        self.cond = threading.Condition(threading.Lock())
+        self.readers = {}   # 会话 -> 重入次数
+        self.writer = None
+        self.writes = 0
+        self.waiting_writers = 0
+
+    def _can_read(self, owner):
+        return self.writer in (None, owner) and (owner in self.readers or owner is self.writer
+                                                 or not self.waiting_writers)
+
+    def _can_write(self, owner):
+        return self.writer in (None, owner) and all(reader is owner for reader in self.readers)
+
+    def acquire(self, owner, exclusive, timeout=LOCK_TIMEOUT):
+        with self.cond:
+            ready = (lambda: self._can_write(owner)) if exclusive else (lambda: self._can_read(owner))
+            if not ready():
+                if exclusive:
+                    self.waiting_writers += 1
+                try:
+                    acquired = self.cond.wait_for(ready, timeout)
+                finally:
+                    if exclusive:
+                        self.waiting_writers -= 1
+                if not acquired:
+                    self.cond.notify_all()
+                    kind = 'write' if exclusive else 'read'
+                    raise ValueError(f"Timed out waiting for a {kind} lock on table '{self.name}'.")
+            if exclusive:
+                self.writer = owner
+                self.writes += 1
+            else:
+                self.readers[owner] = self.readers.get(owner, 0) + 1
+
+    def release(self, owner, exclusive):
+        with self.cond:
+            if exclusive:
+                self.writes -= 1
+                if not self.writes:
+                    self.writer = None
+            else:
+                count = self.readers.pop(owner) - 1
+                if count:
+                    self.readers[owner] = count
+            self.cond.notify_all()
+
+class Session:
+    # 一个连接的事务状态：自己的撤销日志与事务期间持有的表锁
+    def __init__(self):
+        self.journal = UndoLog()
+        self.held = []  # [(TableLock, 是否排他)]
+
+class SessionManager:
+    # 每个线程是一个连接，各有自己的会话。数据库与表通过它访问当前会话的撤销日志（接口与 UndoLog 相同）。
+    # 锁按两阶段加锁：事务内获得的表锁保持到 COMMIT / ROLLBACK；事务外的语句结束时即释放
+    def __init__(self, lock_timeout=LOCK_TIMEOUT):
+        self.local = threading.local()
+        self.lock_timeout = lock_timeout
+        self.locks = {}
+        self.mutex = threading.Lock()
+        self.wal = None
+
+    @property
+    def session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = Session()
+        session.journal.wal = self.wal
+        return session
+
+    @property
+    def active(self):
+        return self.session.journal.active
+
+    @property
+    def entries(self):
+        return self.session.journal.entries
+
+    def begin(self):
+        self.session.journal.begin()
+
+    def record(self, undo, *args):
+        self.session.journal.record(undo, *args)
+
+    def log(self, *op):
+        self.session.journal.log(*op)
+
+    def commit(self):
+        session = self.session
+        try:
+            session.journal.commit()
+        finally:
+            self._release_held(session)
+
+    def rollback(self):
+        session = self.session
+        try:
+            session.journal.rollback()
+        finally:
+            self._release_held(session)
+
+    def lock(self, table_names, exclusive=False, timeout=None):
+        # 按表名顺序加锁，避免不同语句之间循环等待；返回语句结束时调用的释放函数。
+        # timeout 为 None 时使用 lock_timeout，为 0 时拿不到锁立即报错
+        session = self.session
+        timeout = self.lock_timeout if timeout is None else timeout
+        acquired = []
+        try:
+            for name in sorted(set(table_names)):
+                with self.mutex:
+                    lock = self.locks.get(name)
+                    if lock is None:
+                        lock = self.locks[name] = TableLock(name)
+                lock.acquire(session, exclusive, timeout)
+                acquired.append((lock, exclusive))
+        except BaseException:
+            if not session.journal.active:
+                _release(session, acquired)
+            raise
+        finally:
+            if session.journal.active:
+                # 事务内的锁（包括出错前已获得的）由 COMMIT / ROLLBACK 释放
+                session.held.extend(acquired)
+                acquired = []
+        return lambda: _release(session, acquired)
+
+    def _release_held(self, session):
+        held, session.held = session.held, []
+        _release(session, held)
+
+def _release(session, locks):
+    while locks:
+        lock, exclusive = locks.pop()
+        lock.release(session, exclusive)
+
+class LockedRows:
+    # 语句的读锁保持到行被取完、游标关闭或被回收为止，行在取用时才从存储中读取
+    def __init__(self, rows, release):
+        self.rows = iter(rows)
+        self.release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.rows)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        release, self.release = self.release, None
+        self.rows = iter(())
+        if release is not None:
+            release()
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,115 @@
+# src/wal.py
+
+import datetime
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+# 每条记录: 负载长度、CRC32、LSN，随后是 JSON 编码的操作列表（一个事务一条记录）
+_RECORD_HEADER = struct.Struct('<IIQ')
+# group commit 的窗口分成这么多步等待，一步之内没有新的记录追加就提前结束
+GROUP_COMMIT_STEPS = 20
+
+class WriteAheadLog:
+    # 只追加的预写日志。提交时先追加记录，再等待其落盘；
+    # 同时提交的多个事务由一个 leader 统一 fsync（group commit）。
+    def __init__(self, path, next_lsn=1, group_commit_window=0.001):
+        self.path = path
+        self.file = open(path, 'ab')
+        self.group_commit_window = group_commit_window
+        self.cond = threading.Condition(threading.Lock())
+        self.last_lsn = next_lsn - 1     # 最后追加的 LSN
+        self.durable_lsn = next_lsn - 1  # 已 fsync 的 LSN
+        self.flushing = False
+        self.committers = 0              # 正在等待落盘的提交者数
+        self.commits = 0
+        self.fsyncs = 0
+
+    def append(self, ops):
+        payload = json.dumps(ops, ensure_ascii=False, default=_encode_value).encode('utf-8')
+        with self.cond:
+            self.last_lsn += 1
+            self.file.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload), self.last_lsn))
+            self.file.write(payload)
+            return self.last_lsn
+
+    def flush(self, lsn):
+        # 阻塞直到 lsn 之前的记录都已落盘
+        with self.cond:
+            self.committers += 1
+            try:
+                while self.durable_lsn < lsn:
+                    if self.flushing:
+                        self.cond.wait()
+                        continue
+                    self.flushing = True
+                    if self.group_commit_window and self.committers > 1:
+                        self._gather()
+                    target = self.last_lsn
+                    self.file.flush()
+                    self.cond.release()
+                    try:
+                        os.fsync(self.file.fileno())
+                    finally:
+                        self.cond.acquire()
+                        self.fsyncs += 1
+                        self.durable_lsn = max(self.durable_lsn, target)
+                        self.flushing = False
+                        self.cond.notify_all()
+            finally:
+                self.committers -= 1
+                self.commits += 1
+
+    def _gather(self):
+        # 还有其他提交者时稍等，让随后到达的提交者的记录进入同一次 fsync。
+        # 已在等待的提交者的记录都已追加，只有新的记录才值得等待：每步之后没有新的记录就不再等，最多等待一个窗口
+        deadline = time.monotonic() + self.group_commit_window
+        step = self.group_commit_window / GROUP_COMMIT_STEPS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            seen = self.last_lsn
+            self.cond.wait(min(step, remaining))
+            if self.last_lsn == seen:
+                return
+
+    def commit(self, ops):
+        self.flush(self.append(ops))
+
+    def truncate(self):
+        # 检查点之后调用：日志中的记录都已写入数据文件
+        with self.cond:
+            self.file.close()
+            self.file = open(self.path, 'wb')
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        with self.cond:
+            self.file.close()
+
+def _encode_value(value):
+    # JSON 不能直接表示的值：日期与时间写为 ISO 格式的字符串，重放时按列的类型转换回来；其他序列（如 range）写为数组
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return list(value)
+
+def read_log(path, after_lsn=0):
+    # 依次返回 (lsn, ops)；遇到不完整或校验失败的记录（崩溃时写了一半）即停止
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset + _RECORD_HEADER.size <= len(data):
+        length, checksum, lsn = _RECORD_HEADER.unpack_from(data, offset)
+        start = offset + _RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        offset = start + length
+        if lsn > after_lsn:
+            yield lsn, json.loads(payload.decode('utf-8'))
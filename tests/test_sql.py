@@ -1,14 +1,29 @@
 ﻿# tests/test_sql.py
 
+import datetime
 import unittest
 from io import StringIO
+import shutil
 import sys
 import os
+import tempfile
+import threading
+import time
 
 # 确保可以导入 src 包
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from main import print_cursor
+from src.client import Connection, ConnectionPool
+from src.database import Database, Table
+from src.instrumentation import Instrumentation
+from src.join import HashJoin, MergeJoin
 from src.query_executor import QueryExecutor
+from src.result_cache import ResultCache
+from src.server import DatabaseServer
+from src.sql_ast import And, Comparison, In, Like, Not, Or
+from src.sql_parser import SQLParser, normalize_sql
+from src.wal import WriteAheadLog
 
 class TestSQLExecutor(unittest.TestCase):
     def setUp(self):
@@ -72,7 +87,7 @@ class TestSQLExecutor(unittest.TestCase):
         sys.stdout = captured_output
 
         select_sql = "SELECT * FROM students"
-        self.executor.execute(select_sql)
+        print_cursor(self.executor.execute(select_sql))
 
         # 恢复标准输出
         sys.stdout = sys.__stdout__
@@ -95,7 +110,7 @@ class TestSQLExecutor(unittest.TestCase):
         sys.stdout = captured_output
 
         select_sql = "SELECT name FROM students WHERE id = 1"
-        self.executor.execute(select_sql)
+        print_cursor(self.executor.execute(select_sql))
 
         # 恢复标准输出
         sys.stdout = sys.__stdout__
@@ -311,50 +326,1277 @@ class TestSQLExecutor(unittest.TestCase):
         self.assertIn("Table 'students' does not exist.", str(context.exception))
 
     def test_add_existing_column(self):
-        """测试添加已存在的列应打印消息但不抛出错误"""
+        """测试添加已存在的列应返回提示消息但不抛出错误"""
         create_sql = "CREATE TABLE students (id INT, name TEXT)"
         self.executor.execute(create_sql)
 
         alter_sql = "ALTER TABLE students ADD COLUMN name TEXT"
-        # 根据 Table.add_column 的实现，添加已存在的列会打印消息但不抛出错误
-        captured_output = StringIO()
-        sys.stdout = captured_output
-
-        self.executor.execute(alter_sql)
-
-        sys.stdout = sys.__stdout__
-        output = captured_output.getvalue()
-        self.assertIn("Column 'name' already exists in table 'students'.", output)
+        # 根据 Table.add_column 的实现，添加已存在的列不做任何事，也不抛出错误
+        result = self.executor.execute(alter_sql)
+        self.assertEqual(result.message, "Column 'name' already exists in table 'students'.")
 
     def test_drop_nonexistent_column(self):
-        """测试删除不存在的列应打印消息但不抛出错误"""
+        """测试删除不存在的列应返回提示消息但不抛出错误"""
         create_sql = "CREATE TABLE students (id INT, name TEXT)"
         self.executor.execute(create_sql)
 
         alter_sql = "ALTER TABLE students DROP COLUMN age"
-        captured_output = StringIO()
-        sys.stdout = captured_output
-
-        self.executor.execute(alter_sql)
-
-        sys.stdout = sys.__stdout__
-        output = captured_output.getvalue()
-        self.assertIn("Column 'age' does not exist in table 'students'.", output)
+        result = self.executor.execute(alter_sql)
+        self.assertEqual(result.message, "Column 'age' does not exist in table 'students'.")
 
     def test_modify_nonexistent_column(self):
-        """测试修改不存在的列应打印消息但不抛出错误"""
+        """测试修改不存在的列应返回提示消息但不抛出错误"""
         create_sql = "CREATE TABLE students (id INT, name TEXT)"
         self.executor.execute(create_sql)
 
         alter_sql = "ALTER TABLE students MODIFY COLUMN age INT"
-        captured_output = StringIO()
-        sys.stdout = captured_output
+        result = self.executor.execute(alter_sql)
+        self.assertEqual(result.message, "Column 'age' does not exist in table 'students'.")
+
+    def _create_indexed_students(self):
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        for i, name in enumerate(['Alice', 'Bob', 'Carol', 'Dave'], start=1):
+            self.executor.execute(f"INSERT INTO students (id, name) VALUES ({i}, '{name}')")
+        self.executor.execute("CREATE INDEX idx_id ON students (id)")
+        self.executor.execute("CREATE INDEX idx_name ON students (name) USING HASH")
+        return self.executor.database.get_table('students')
+
+    def test_create_index(self):
+        """测试创建索引并用于等值与范围查询"""
+        table = self._create_indexed_students()
+        self.assertEqual(table.indexes['idx_id'].index_type, 'SORTED')
+        self.assertEqual(table.indexes['idx_name'].index_type, 'HASH')
+
+        self.assertEqual(table._index_lookup(('id', '=', 2)), [1])
+        self.assertEqual(table._index_lookup(('id', '>', 2)), [2, 3])
+        self.assertEqual(table._index_lookup(('name', '=', 'Carol')), [2])
+        # 哈希索引不支持范围查询，退回全表扫描
+        self.assertIsNone(table._index_lookup(('name', '<', 'Carol')))
+
+        self.assertEqual(table.select(['name'], ('id', '<', 3)), [['Alice'], ['Bob']])
+        self.assertEqual(table.select(['id'], ('name', '=', 'Dave')), [[4]])
+
+    def test_index_maintained_by_update_and_delete(self):
+        """测试更新和删除后索引保持同步"""
+        table = self._create_indexed_students()
+        self.executor.execute("UPDATE students SET id = 10 WHERE name = 'Bob'")
+        self.assertEqual(table.select(['name'], ('id', '=', 10)), [['Bob']])
+        self.assertEqual(table.select(['name'], ('id', '=', 2)), [])
+
+        self.executor.execute("DELETE FROM students WHERE id < 3")
+        self.assertEqual(table.select(['name'], ('id', '>', 0)), [['Bob'], ['Carol'], ['Dave']])
+        self.assertEqual(table.select(['id'], ('name', '=', 'Dave')), [[4]])
+
+        self.executor.execute("ALTER TABLE students ADD COLUMN age INT")
+        self.executor.execute("INSERT INTO students (id, name, age) VALUES (5, 'Eve', 30)")
+        self.assertEqual(table.select(['name', 'age'], ('id', '>', 4)), [['Bob', None], ['Eve', 30]])
+
+    def test_index_restored_on_rollback(self):
+        """测试事务回滚后索引恢复"""
+        self._create_indexed_students()
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("DELETE FROM students WHERE id = 1")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (7, 'Zed')")
+        self.executor.execute("ROLLBACK")
 
-        self.executor.execute(alter_sql)
+        table = self.executor.database.get_table('students')
+        self.assertEqual(table.select(['name'], ('id', '=', 1)), [['Alice']])
+        self.assertEqual(table.select(['name'], ('id', '=', 7)), [])
+
+    def test_rollback_large_update_on_low_cardinality_index(self):
+        """测试只有两个不同值的列上有序索引的大批 UPDATE 回滚：索引项按 (键, 位置) 排列，回滚不比更新本身慢很多"""
+        self.executor.execute("CREATE TABLE t (id INT, g INT)")
+        table = self.executor.database.get_table('t')
+        table.bulk_insert([(i, i % 2) for i in range(20000)])
+        self.executor.execute("CREATE INDEX idx_g ON t (g)")
+        index = table.indexes['idx_g']
+        expected = (list(index.keys), list(index.positions))
+        for where in ["g = 0", "id < 1000"]:  # 整体重建与逐行维护索引两种情况
+            self.executor.execute("BEGIN TRANSACTION")
+            started = time.perf_counter()
+            self.executor.execute(f"UPDATE t SET g = 7 WHERE {where}")
+            updated = time.perf_counter()
+            self.assertEqual(list(zip(index.keys, index.positions)), sorted(zip(index.keys, index.positions)))
+            self.executor.execute("ROLLBACK")
+            rolled_back = time.perf_counter()
+            self.assertLess(rolled_back - updated, 5 * (updated - started) + 0.05)
+            self.assertEqual((index.keys, index.positions), expected)
+        self.assertEqual(len(table.select(['id'], ('g', '=', 0))), 10000)
 
-        sys.stdout = sys.__stdout__
-        output = captured_output.getvalue()
-        self.assertIn("Column 'age' does not exist in table 'students'.", output)
+    def test_drop_index(self):
+        """测试删除索引，以及删除列时同时删除其上的索引"""
+        table = self._create_indexed_students()
+        self.executor.execute("DROP INDEX idx_id")
+        self.assertNotIn('idx_id', table.indexes)
+        self.assertIsNone(table._index_lookup(('id', '=', 1)))
+
+        self.executor.execute("ALTER TABLE students DROP COLUMN name")
+        self.assertEqual(table.indexes, {})
+
+        with self.assertRaises(ValueError) as context:
+            self.executor.execute("DROP INDEX idx_id ON students")
+        self.assertIn("Index 'idx_id' does not exist.", str(context.exception))
+
+    def test_create_duplicate_index(self):
+        """测试创建重名索引应抛出错误"""
+        self._create_indexed_students()
+        with self.assertRaises(ValueError) as context:
+            self.executor.execute("CREATE INDEX idx_id ON students (name)")
+        self.assertIn("Index 'idx_id' already exists.", str(context.exception))
+
+    def test_rollback_restores_dml(self):
+        """测试回滚撤销事务内的插入、更新和删除"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        for i, name in enumerate(['Alice', 'Bob', 'Carol'], start=1):
+            self.executor.execute(f"INSERT INTO students (id, name) VALUES ({i}, '{name}')")
+
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("UPDATE students SET name = 'Zed' WHERE id > 1")
+        self.executor.execute("DELETE FROM students WHERE id = 2")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (4, 'Dave')")
+        self.executor.execute("DELETE FROM students")
+        self.executor.execute("ROLLBACK")
+
+        table = self.executor.database.get_table('students')
+        self.assertEqual(table.rows, [[1, 'Alice'], [2, 'Bob'], [3, 'Carol']])
+        self.assertEqual(self.executor.database.journal.entries, [])
+
+    def test_rollback_restores_ddl(self):
+        """测试回滚撤销事务内的建表、删表和修改列"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT, age INT)")
+        self.executor.execute("INSERT INTO students (id, name, age) VALUES (1, 'Alice', 20)")
+        self.executor.execute("CREATE INDEX idx_age ON students (age)")
+
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("ALTER TABLE students DROP COLUMN age")
+        self.executor.execute("ALTER TABLE students ADD COLUMN email TEXT")
+        self.executor.execute("ALTER TABLE students MODIFY COLUMN id TEXT")
+        self.executor.execute("CREATE TABLE courses (id INT)")
+        self.executor.execute("DROP TABLE students")
+        self.executor.execute("ROLLBACK")
+
+        self.assertNotIn('courses', self.executor.database.tables)
+        table = self.executor.database.get_table('students')
+        self.assertEqual(table.column_names, ['id', 'name', 'age'])
+        self.assertEqual(table.columns, {'id': 'INT', 'name': 'TEXT', 'age': 'INT'})
+        self.assertEqual(table.rows, [[1, 'Alice', 20]])
+        self.assertEqual(table.select(['name'], ('age', '=', 20)), [['Alice']])
+        self.assertIn('idx_age', table.indexes)
+
+    def test_commit_discards_undo_log(self):
+        """测试提交后撤销日志被清空且不再记录"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (1, 'Alice')")
+        self.assertEqual(len(self.executor.database.journal.entries), 1)
+        self.executor.execute("COMMIT")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (2, 'Bob')")
+        self.assertEqual(self.executor.database.journal.entries, [])
+
+    def test_compact_rows_and_schema(self):
+        """测试行存储以 tuple 存放并整行替换，ALTER TABLE 生成新的 Schema，旧的 Schema 不受影响"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (1, 'Alice'), (2, 'Bob')")
+        table = self.executor.database.get_table('students')
+        stored = table.storage.rows
+        self.assertEqual(stored, [(1, 'Alice'), (2, 'Bob')])
+        self.executor.execute("UPDATE students SET name = 'Bobby' WHERE id = 2")
+        self.assertEqual(stored[1], (2, 'Bobby'))
+        table.rows[0][1] = 'changed'  # rows 是副本
+        self.assertEqual(stored[0], (1, 'Alice'))
+
+        schema = table.schema
+        self.assertEqual((schema.positions, schema.converters), ({'id': 0, 'name': 1}, {'id': int, 'name': str}))
+        self.executor.execute("ALTER TABLE students ADD COLUMN age INT")
+        self.assertIsNot(table.schema, schema)
+        self.assertEqual(schema.names, ['id', 'name'])
+        self.assertEqual(table.schema.positions['age'], 2)
+        with self.assertRaises(ValueError) as context:
+            self.executor.execute("UPDATE students SET age = 'x'")
+        self.assertIn("Invalid value for column 'age': x", str(context.exception))
+
+    def test_alter_without_rewrite(self):
+        """测试 ADD / DROP COLUMN 不改写已有的行，读取时补齐；回滚换回旧的表结构，compact() 改写为紧凑布局"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (1, 'Alice'), (2, 'Bob')")
+        self.executor.execute("CREATE INDEX idx_name ON students (name)")
+        database = self.executor.database
+        table = database.get_table('students')
+        stored = table.storage.rows
+        self.executor.execute("ALTER TABLE students ADD COLUMN age INT")
+        self.executor.execute("ALTER TABLE students DROP COLUMN name")
+        self.assertIs(table.storage.rows, stored)
+        self.assertEqual(stored, [(1, 'Alice'), (2, 'Bob')])
+        self.assertEqual(table.indexes, {})
+        self.executor.execute("INSERT INTO students (id, age) VALUES (3, 30)")
+        self.executor.execute("UPDATE students SET age = 20 WHERE id = 1")
+        self.assertEqual(stored, [(1, 'Alice', 20), (2, 'Bob'), (3, None, 30)])
+        self.assertEqual(self.executor.execute("SELECT * FROM students WHERE age < 25").fetchall(), [[1, 20]])
+        self.assertEqual(self.executor.execute("SELECT MAX(age) FROM students").fetchall(), [[30]])
+
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("ALTER TABLE students ADD COLUMN name TEXT")
+        self.executor.execute("INSERT INTO students (id, age, name) VALUES (4, 40, 'Dave')")
+        self.executor.execute("ROLLBACK")
+        self.assertEqual(table.rows, [[1, 20], [2, None], [3, 30]])
+        self.assertTrue(table.needs_compaction)
+
+        self.assertEqual(database.compact(), ['students'])
+        self.assertEqual(table.storage.rows, [(1, 20), (2, None), (3, 30)])
+        self.assertEqual((table.schema.positions, table.schema.width), ({'id': 0, 'age': 1}, 2))
+        self.assertEqual(database.compact(), [])
+        self.executor.execute("BEGIN TRANSACTION")
+        with self.assertRaises(ValueError) as context:
+            database.compact()
+        self.assertIn("Cannot compact while a transaction is in progress.", str(context.exception))
+        self.executor.execute("ROLLBACK")
+
+    def test_typed_columns(self):
+        """测试 FLOAT、BOOLEAN、DATE、TIMESTAMP 列：写入时转换，常量按列的类型比较，列存储中为定长编码"""
+        for storage in ['ROW', 'COLUMNAR']:
+            self.executor.execute(f"CREATE TABLE events_{storage} (id INT, price FLOAT, paid BOOLEAN, day DATE, "
+                                  f"created TIMESTAMP) STORAGE {storage}")
+            self.executor.execute(f"INSERT INTO events_{storage} (id, price, paid, day, created) VALUES "
+                                  "(1, 9.5, TRUE, '2024-01-02', '2024-01-02 10:00:00'), "
+                                  "(2, '3', 'false', '2024-03-01', '2024-03-01T08:30:00+02:00'), "
+                                  "(3, NULL, NULL, NULL, NULL)")
+            query = lambda where: self.executor.execute(f"SELECT id FROM events_{storage} WHERE {where}").fetchall()
+            self.assertEqual(query("price < 5"), [[2]])
+            self.assertEqual(query("paid = TRUE"), [[1]])
+            self.assertEqual(query("day >= '2024-02-01'"), [[2]])
+            self.assertEqual(query("created BETWEEN '2024-03-01' AND '2024-03-01 07:00'"), [[2]])
+            table = self.executor.database.get_table(f'events_{storage}')
+            self.assertEqual(table.rows[1], [2, 3.0, False, datetime.date(2024, 3, 1),
+                                             datetime.datetime(2024, 3, 1, 6, 30)])
+            with self.assertRaises(ValueError) as context:
+                self.executor.execute(f"INSERT INTO events_{storage} (id, day) VALUES (4, '2024-02-30')")
+            self.assertIn("Invalid value for column 'day': 2024-02-30", str(context.exception))
+        day_column = self.executor.database.get_table('events_COLUMNAR').storage.columns[3]
+        self.assertEqual((day_column.data.typecode, day_column.data[0]), ('i', datetime.date(2024, 1, 2).toordinal()))
+
+    def test_modify_column_converts_values(self):
+        """测试 MODIFY COLUMN 一次转换整列，有无法转换的值时报告个数与第一个值且不修改表，回滚恢复原来的值"""
+        self.executor.execute("CREATE TABLE students (id INT, score TEXT)")
+        self.executor.execute("INSERT INTO students (id, score) VALUES (1, '90'), (2, 'n/a'), (3, NULL), (4, 'x')")
+        self.executor.execute("CREATE INDEX idx_score ON students (score)")
+        with self.assertRaises(ValueError) as context:
+            self.executor.execute("ALTER TABLE students MODIFY COLUMN score INT")
+        self.assertIn("Cannot convert column 'score' to INT: 2 value(s) are invalid, the first is 'n/a' at row 1.",
+                      str(context.exception))
+        table = self.executor.database.get_table('students')
+        self.assertEqual(table.columns['score'], 'TEXT')
+
+        self.executor.execute("DELETE FROM students WHERE score > 'a'")
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("ALTER TABLE students MODIFY COLUMN score FLOAT")
+        self.assertEqual(table.rows, [[1, 90.0], [3, None]])
+        self.assertEqual(self.executor.execute("SELECT id FROM students WHERE score > 89.5").fetchall(), [[1]])
+        self.assertEqual(table._index_lookup(('score', '=', 90.0)), [0])
+        self.executor.execute("ROLLBACK")
+        self.assertEqual(table.rows, [[1, '90'], [3, None]])
+        self.assertEqual(table._index_lookup(('score', '=', '90')), [0])
+
+    def test_where_with_null_values(self):
+        """测试 WHERE 比较遇到 NULL 时视为不满足条件"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT, age INT)")
+        self.executor.execute("INSERT INTO students (id, name, age) VALUES (1, 'Alice', 20)")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (2, 'Bob')")
+        self.executor.execute("INSERT INTO students (id, name, age) VALUES (3, 'Carol', 30)")
+
+        table = self.executor.database.get_table('students')
+        self.assertEqual(table.select(['id'], ('age', '>', 10)), [[1], [3]])
+        self.assertEqual(table.select(['id'], ('age', '<', 25)), [[1]])
+        self.executor.execute("UPDATE students SET age = 40 WHERE age < 25")
+        self.assertEqual(table.rows[0], [1, 'Alice', 40])
+
+    def test_where_with_type_conversion(self):
+        """测试常量按列的类型转换后比较：TEXT 列按字符串比较，MODIFY COLUMN 转换列中的值后按整数比较"""
+        self.executor.execute("CREATE TABLE students (id INT, code TEXT)")
+        self.executor.execute("INSERT INTO students (id, code) VALUES (1, '10')")
+        self.executor.execute("INSERT INTO students (id, code) VALUES (2, '9')")
+
+        table = self.executor.database.get_table('students')
+        self.assertEqual(table.select(['id'], ('code', '>', 5)), [[2]])  # '10' < '5'
+        self.assertEqual(table.select(['id'], ('code', '=', 9)), [[2]])
+        self.assertEqual(table.select(['code'], ('id', '=', '2')), [['9']])
+
+        self.executor.execute("ALTER TABLE students MODIFY COLUMN code INT")
+        self.assertEqual(table.rows, [[1, 10], [2, 9]])
+        self.assertEqual(table.select(['id'], ('code', '<', 10)), [[2]])
+        self.assertEqual(table.select(['id'], ('code', '<', '9.5')), [[2]])
+        with self.assertRaises(ValueError) as context:
+            table.select(['id'], ('code', '=', 'ten'))
+        self.assertIn("Invalid value for column 'code': ten", str(context.exception))
+
+    def test_having_binds_constants_by_type(self):
+        """测试 HAVING 中的常量按聚合结果的类型转换：计数与求和为整数，MIN/MAX 与所在列同类型，分组列按列的类型"""
+        self.executor.execute("CREATE TABLE events (id INT, kind TEXT, day DATE, price FLOAT)")
+        self.executor.execute("INSERT INTO events (id, kind, day, price) VALUES (1, 'a', '2024-01-02', 1.5), "
+                              "(2, 'a', '2024-03-01', 2), (3, 'b', '2024-02-01', NULL)")
+        query = lambda having: [row[0] for row in self.executor.execute(
+            f"SELECT kind FROM events GROUP BY kind HAVING {having}").fetchall()]
+        self.assertEqual(query("COUNT(*) > '1'"), ['a'])
+        self.assertEqual(query("MAX(day) >= '2024-02-01'"), ['a', 'b'])
+        self.assertEqual(query("MIN(day) BETWEEN '2024-01-15' AND '2024-02-15'"), ['b'])
+        self.assertEqual(query("SUM(price) = '3.5'"), ['a'])
+        self.assertEqual(query("kind IN ('b', 'c')"), ['b'])
+        self.executor.execute("CREATE TABLE kinds (code TEXT, title TEXT)")
+        self.executor.execute("INSERT INTO kinds (code, title) VALUES ('a', 'A'), ('b', 'B')")
+        cursor = self.executor.execute("SELECT title, COUNT(*) FROM events JOIN kinds ON kind = code "
+                                       "GROUP BY title HAVING MAX(events.day) > '2024-02-15'")
+        self.assertEqual(cursor.fetchall(), [['A', 2]])
+        with self.assertRaises(ValueError) as context:
+            query("MIN(day) < 'soon'")
+        self.assertIn("Invalid value for column 'MIN(day)': soon", str(context.exception))
+
+    def test_prepared_statements(self):
+        """测试预编译语句的 ? 参数绑定"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        insert = self.executor.prepare("INSERT INTO students (id, name) VALUES (?, ?)")
+        self.assertEqual(insert.param_count, 2)
+        for i, name in enumerate(['Alice', 'Bob', "O'Brien"]):
+            insert.execute((i + 1, name))
+        insert.execute((4, None))
+        self.executor.execute("UPDATE students SET name = ? WHERE id = ?", ('Bobby', 2))
+        self.executor.execute("INSERT INTO students (id, name) VALUES (5, '?')")
+
+        table = self.executor.database.get_table('students')
+        self.assertEqual(table.rows, [[1, 'Alice'], [2, 'Bobby'], [3, "O'Brien"], [4, None], [5, '?']])
+        cursor = self.executor.prepare("SELECT name FROM students WHERE id > ?").execute((3,))
+        self.assertEqual(cursor.fetchall(), [[None], ['?']])
+
+        with self.assertRaises(ValueError) as context:
+            insert.execute((6,))
+        self.assertIn("Statement expects 2 parameter(s), got 1.", str(context.exception))
+
+    def test_multi_row_insert(self):
+        """测试一条 INSERT 插入多行，索引在整批写入后更新"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT, age INT)")
+        self.executor.execute("CREATE INDEX idx_age ON students (age)")
+        self.executor.execute("INSERT INTO students (id, age) VALUES (1, 30)")
+        result = self.executor.execute("INSERT INTO students (name, id, age) VALUES ('Bob, Jr.', 2, 20), ('Carol', 3, 40)")
+        self.assertEqual(result.rowcount, 2)
+        self.assertEqual(result.message, "Inserted 2 row(s) into 'students'.")
+
+        table = self.executor.database.get_table('students')
+        self.assertEqual(table.rows, [[1, None, 30], [2, 'Bob, Jr.', 20], [3, 'Carol', 40]])
+        self.assertEqual(table._index_lookup(('age', '>', 25)), [0, 2])
+        with self.assertRaises(ValueError) as context:
+            self.executor.execute("INSERT INTO students (id, name, age) VALUES (4, 'Dave', 20), ('x', 'Eve', 21)")
+        self.assertIn("Invalid value for column 'id': x", str(context.exception))
+        self.assertEqual(len(table.rows), 3)
+
+    def test_executemany(self):
+        """测试 executemany 批量插入，以及回滚整批插入"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.execute("CREATE INDEX idx_id ON students (id) USING HASH")
+        self.executor.executemany("INSERT INTO students (id, name) VALUES (?, ?)", [(i, f'name{i}') for i in range(100)])
+        table = self.executor.database.get_table('students')
+        self.assertEqual(len(table.rows), 100)
+        self.assertEqual(table._index_lookup(('id', '=', 42)), [42])
+
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.executemany("INSERT INTO students (id, name) VALUES (?, 'x')", [(i,) for i in range(100, 150)])
+        result = self.executor.executemany("UPDATE students SET name = ? WHERE id = ?", [('Alice', 1), ('Bob', 2)])
+        self.assertEqual(result.rowcount, 2)
+        self.assertEqual(table._index_lookup(('id', '=', 120)), [120])
+        self.executor.execute("ROLLBACK")
+        self.assertEqual(len(table.rows), 100)
+        self.assertEqual(table.rows[1], [1, 'name1'])
+        self.assertEqual(table._index_lookup(('id', '=', 120)), [])
+
+    def test_cursor_fetch(self):
+        """测试 SELECT 返回游标，支持 fetchone、fetchmany 与迭代"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.executemany("INSERT INTO students (id, name) VALUES (?, ?)", [(i, f'name{i}') for i in range(5)])
+        cursor = self.executor.execute("SELECT name, id FROM students WHERE id > 0")
+        self.assertEqual(cursor.columns, ['name', 'id'])
+        self.assertGreaterEqual(cursor.elapsed, 0)
+        self.assertEqual(cursor.fetchone(), ['name1', 1])
+        self.assertEqual(cursor.fetchmany(2), [['name2', 2], ['name3', 3]])
+        self.assertEqual(cursor.rowcount, -1)  # 行取完之前结果行数未知
+        self.assertEqual(list(cursor), [['name4', 4]])
+        self.assertIsNone(cursor.fetchone())
+        self.assertEqual(cursor.rownumber, 4)
+        self.assertEqual(cursor.rowcount, 4)
+        self.assertEqual(self.executor.execute("SELECT * FROM students").columns, ['id', 'name'])
+        # 列不存在的错误在 execute 时立即抛出，而不是取行时
+        with self.assertRaises(ValueError):
+            self.executor.execute("SELECT age FROM students")
+
+    def _create_people(self):
+        self.executor.execute("CREATE TABLE people (id INT, name TEXT, age INT)")
+        self.executor.execute("INSERT INTO people (id, name, age) VALUES (1, 'Alice', 20), (2, 'Bob', 25), "
+                              "(3, 'Carol, Jr.', 30), (4, 'Dave', NULL), (5, 'O''Brien', 35)")
+
+    def _ids(self, sql, params=()):
+        return [row[0] for row in self.executor.execute(sql, params)]
+
+    def test_where_expressions(self):
+        """测试 AND / OR / NOT、括号、IN、BETWEEN、LIKE 与各种比较运算符"""
+        self._create_people()
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age >= 25 AND age <= 30"), [2, 3])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age < 25 OR name = 'Dave'"), [1, 4])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE NOT (age > 20 AND age < 35)"), [1, 5])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age != 25"), [1, 3, 5])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age <> 25 AND (id = 1 OR id = 5)"), [1, 5])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE id IN (2, 4, 9)"), [2, 4])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age NOT IN (20, 25)"), [3, 5])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age BETWEEN 21 AND 30"), [2, 3])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age NOT BETWEEN 21 AND 30"), [1, 5])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE name LIKE '%r%'"), [3, 5])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE name NOT LIKE '_o%'"), [1, 3, 4, 5])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE 30 < age"), [5])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age = NULL"), [])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE id IN (?, ?) AND age BETWEEN ? AND ?", (1, 3, 0, 25)), [1])
+        self.assertEqual(self._ids("SELECT name FROM people WHERE id = 3 OR id = 5"), ['Carol, Jr.', "O'Brien"])
+
+        # 有索引时结果相同
+        self.executor.execute("CREATE INDEX idx_age ON people (age)")
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age >= 25 AND age <= 30"), [2, 3])
+        self.assertEqual(self._ids("SELECT id FROM people WHERE age IN (20, 35)"), [1, 5])
+        self.executor.execute("DELETE FROM people WHERE NOT age >= 25")
+        self.assertEqual(self._ids("SELECT id FROM people"), [2, 3, 4, 5])
+
+    def test_parser_ast_and_errors(self):
+        """测试语法树的结构与语法错误"""
+        parsed = self.executor.parser.parse("SELECT * FROM t WHERE a = 1 AND (b < -2 OR NOT c LIKE 'x%')")
+        self.assertEqual(parsed['where'], And((Comparison('a', '=', 1),
+                                               Or((Comparison('b', '<', -2), Not(Like('c', 'x%', False)))))))
+        self.assertEqual(self.executor.parser.parse("select id from t where id in (1, 2);")['where'],
+                         In('id', (1, 2), False))
+        for sql, message in [
+            ("SELECT id FROM", "SQL syntax error near end of statement: expected a name."),
+            ("SELECT id FROM t WHERE a = 1 b", "SQL syntax error near 'b': expected end of statement."),
+            ("SELECT id FROM t WHERE a BETWEEN 1", "SQL syntax error near end of statement: expected AND."),
+            ("INSERT INTO t (a) VALUES ('unterminated)", "Unterminated string literal"),
+            ("SELEC * FROM t", "Unable to parse SQL statement"),
+        ]:
+            with self.assertRaises(ValueError) as context:
+                self.executor.parser.parse(sql)
+            self.assertIn(message, str(context.exception))
+
+    def test_parser_number_literals(self):
+        """测试以小数点开头的数字（.5、-.25）与限定列名中的点"""
+        parse = lambda sql: self.executor.parser.parse(sql)['where']
+        self.assertEqual(parse("SELECT * FROM t WHERE score > .5"), Comparison('score', '>', 0.5))
+        self.assertEqual(parse("SELECT * FROM t WHERE score < -.25"), Comparison('score', '<', -0.25))
+        self.assertEqual(parse("SELECT * FROM t WHERE score IN (.5, 1., 2)"), In('score', (0.5, 1.0, 2), False))
+        self.assertEqual(parse("SELECT * FROM t WHERE t.score = 3.5"), Comparison('t.score', '=', 3.5))
+        self.executor.execute("CREATE TABLE t (id INT, score FLOAT)")
+        self.executor.execute("INSERT INTO t (id, score) VALUES (1, .25), (2, .75)")
+        self.assertEqual(self._ids("SELECT id FROM t WHERE score > .5"), [2])
+
+    def test_planner_and_explain(self):
+        """测试规划器按统计信息选择访问路径、按选择率排列条件，EXPLAIN 对比估计与实际行数"""
+        self.executor.execute("CREATE TABLE t (id INT, age INT, name TEXT)")
+        self.executor.executemany("INSERT INTO t (id, age, name) VALUES (?, ?, ?)",
+                                  [(i, i % 50, 'n%d' % (i % 4)) for i in range(1000)])
+        self.executor.execute("CREATE INDEX idx_id ON t (id)")
+        table = self.executor.database.get_table('t')
+
+        # 选择性高的索引条件先执行，其余条件只对候选行求值
+        plan = self._ids("EXPLAIN SELECT id, name FROM t WHERE age > 10 AND id < 20")
+        self.assertEqual(plan[0], "Project: id, name")
+        self.assertTrue(plan[1].startswith("Index Scan on t using idx_id (SORTED): id < 20 (selectivity: 0.020"))
+        self.assertTrue(plan[2].startswith("Filter: age > 10"))
+        self.assertEqual(plan[-1], "Estimated rows: 16, actual rows: 9")
+        self.assertEqual(self._ids("SELECT id FROM t WHERE age > 10 AND id < 20"), list(range(11, 20)))
+
+        # 几乎命中全表的索引条件不如全表扫描
+        plan = self._ids("EXPLAIN SELECT * FROM t WHERE id > 5 AND name = 'n1'")
+        self.assertTrue(plan[1].startswith("Full Scan on t: name = 'n1' (selectivity: 0.250"))
+        self.assertTrue(plan[2].startswith("Filter: id > 5"))
+        self.assertEqual(plan[-1], "Estimated rows: 249, actual rows: 248")
+        self.assertEqual(self._ids("EXPLAIN SELECT * FROM t")[1:],
+                         ["Full Scan on t (estimated rows: 1000)", "Estimated rows: 1000, actual rows: 1000"])
+
+        # 统计信息在修改超过一成的行后才重新收集
+        stats = table.statistics()
+        self.assertEqual(stats.columns['age'].distinct, 50)
+        self.assertEqual((stats.columns['id'].low, stats.columns['id'].high), (0, 999))
+        self.executor.execute("DELETE FROM t WHERE id < 50")
+        self.assertIs(table.statistics(), stats)
+        self.executor.execute("DELETE FROM t WHERE id < 200")
+        self.assertEqual(table.statistics(['id']).columns['id'].low, 200)
+
+    def test_range_conditions_use_one_index_lookup(self):
+        """测试同一列上的下界与上界（含 BETWEEN）合并为一次有序索引查找，按有界的选择率估计代价"""
+        self.executor.execute("CREATE TABLE t (id INT, age INT)")
+        self.executor.executemany("INSERT INTO t (id, age) VALUES (?, ?)", [(i, i % 50) for i in range(1000)])
+        self.executor.execute("CREATE INDEX idx_id ON t (id)")
+        index = self.executor.database.get_table('t').indexes['idx_id']
+        self.assertEqual(index.range_lookup(10, 13), [10, 11, 12, 13])
+        self.assertEqual(index.range_lookup(10, 13, False, False), [11, 12])
+        self.assertEqual(index.range_lookup(13, 10), [])
+
+        for where, expected in [
+            ("id BETWEEN 500 AND 503", "id BETWEEN 500 AND 503 (selectivity: 0.003"),
+            ("id >= 500 AND id < 504", "id >= 500 AND id < 504 (selectivity: 0.004"),
+            ("id < 504 AND age >= 0 AND id > 499 AND id >= 300", "id > 499 AND id < 504 (selectivity: 0.005"),
+        ]:
+            plan = self._ids(f"EXPLAIN SELECT id FROM t WHERE {where}")
+            self.assertTrue(plan[1].startswith(f"Index Scan on t using idx_id (SORTED): {expected}"), plan[1])
+            self.assertEqual(self._ids(f"SELECT id FROM t WHERE {where}"), [500, 501, 502, 503])
+        self.assertEqual(self._ids("SELECT id FROM t WHERE id NOT BETWEEN 2 AND 997"), [0, 1, 998, 999])
+        self.assertEqual(self._ids("SELECT id FROM t WHERE age = 3 AND id BETWEEN 0 AND 200"), [3, 53, 103, 153])
+
+    def test_parse_cache(self):
+        """测试解析缓存按规范化后的语句命中，并按 LRU 淘汰"""
+        parser = SQLParser(cache_size=2)
+        first = parser.parse("SELECT * FROM students WHERE id = 1")
+        self.assertIs(parser.parse("  SELECT *   FROM students\nWHERE id = 1;"), first)
+        parser.parse("SELECT * FROM students WHERE id = 2")
+        parser.parse("SELECT * FROM students WHERE id = 1")
+        parser.parse("SELECT * FROM courses")  # 淘汰 id = 2
+        parser.parse("SELECT * FROM students WHERE id = 2")
+        self.assertEqual(parser.cache_info(), {'hits': 2, 'misses': 4, 'size': 2, 'capacity': 2})
+        # 引号内的空白不被折叠
+        self.assertNotEqual(normalize_sql("SELECT * FROM t WHERE name = 'a  b'"),
+                            normalize_sql("SELECT * FROM t WHERE name = 'a b'"))
+
+    def _create_orders(self):
+        self.executor.execute("CREATE TABLE users (id INT, name TEXT)")
+        self.executor.execute("CREATE TABLE orders (oid INT, user_id INT, amount INT)")
+        self.executor.execute("INSERT INTO users (id, name) VALUES (1, 'Alice'), (2, 'Bob'), (3, 'Carol'), (NULL, 'Nobody')")
+        self.executor.execute("INSERT INTO orders (oid, user_id, amount) VALUES "
+                              "(10, 1, 100), (11, 2, 50), (12, 1, 70), (13, 9, 10), (14, NULL, 5)")
+
+    def test_join(self):
+        """测试散列连接与归并连接：结果相同，NULL 键不匹配，WHERE 下推到各表"""
+        self._create_orders()
+        sql = ("SELECT users.name, orders.amount FROM users JOIN orders ON users.id = orders.user_id "
+               "WHERE amount >= 50")
+        expected = [['Alice', 70], ['Alice', 100], ['Bob', 50]]
+        self.assertEqual(sorted(self.executor.execute(sql).fetchall()), expected)
+        plan = self._ids("EXPLAIN " + sql)
+        self.assertTrue(plan[1].startswith("Hash Join: users.id = orders.user_id"))
+        self.assertEqual(plan[-1].split(', ')[-1], "actual rows: 3")
+
+        self.executor.execute("CREATE INDEX idx_users ON users (id)")
+        self.executor.execute("CREATE INDEX idx_orders ON orders (user_id)")
+        self.assertEqual(self._ids("EXPLAIN " + sql)[1],
+                         "Merge Join: users.id = orders.user_id (using idx_users, idx_orders)")
+        # 归并连接按连接键的顺序输出
+        self.assertEqual(self.executor.execute(sql).fetchall(), [['Alice', 100], ['Alice', 70], ['Bob', 50]])
+
+        cursor = self.executor.execute("SELECT * FROM orders INNER JOIN users ON user_id = id WHERE name = 'Bob'")
+        self.assertEqual(cursor.columns, ['orders.oid', 'orders.user_id', 'orders.amount', 'users.id', 'users.name'])
+        self.assertEqual(cursor.fetchall(), [[11, 2, 50, 2, 'Bob']])
+
+        for sql, message in [
+            ("SELECT name FROM users JOIN orders ON id = user_id WHERE id = 1 OR amount = 5",
+             "must reference a single table"),
+            ("SELECT name FROM users JOIN users ON id = id", "appears more than once"),
+            ("SELECT oid FROM users JOIN orders ON users.id = orders.missing", "Column 'missing' does not exist"),
+        ]:
+            with self.assertRaises(ValueError) as context:
+                self.executor.execute(sql)
+            self.assertIn(message, str(context.exception))
+
+    def test_join_operators_and_spill(self):
+        """测试 build 一侧超出内存预算时散列连接溢出到磁盘，结果与内存中的连接一致"""
+        left = [[i % 97, 'l%d' % i] for i in range(2000)]
+        right = [[i, i % 97] for i in range(300)] + [[None, None]]
+        expected = sorted(l_row + r_row for l_row in left for r_row in right if l_row[0] == r_row[1])
+
+        in_memory = HashJoin(right, 1, left, 0, build_is_left=False)
+        self.assertEqual(sorted(in_memory), expected)
+        self.assertEqual(in_memory.spilled_partitions, 0)
+        spilled = HashJoin(left, 0, right, 1, build_is_left=True, memory_rows=100)
+        self.assertEqual(sorted(spilled), expected)
+        self.assertGreater(spilled.spilled_partitions, 0)
+        merged = MergeJoin(sorted(left), 0, sorted(right[:-1], key=lambda row: row[1]), 1)
+        self.assertEqual(sorted(merged), expected)
+
+        database = Database(join_memory_rows=10)
+        executor = QueryExecutor(database)
+        self.executor = executor
+        self._create_orders()
+        executor.executemany("INSERT INTO users (id, name) VALUES (?, ?)", [(i, 'u%d' % i) for i in range(100, 200)])
+        executor.executemany("INSERT INTO orders (oid, user_id, amount) VALUES (?, ?, ?)",
+                             [(i, 100 + i % 50, i) for i in range(200)])
+        rows = executor.execute("SELECT users.id, oid FROM users JOIN orders ON users.id = orders.user_id").fetchall()
+        self.assertEqual(len(rows), 203)
+        self.assertTrue(all(user_id == 100 + oid % 50 for user_id, oid in rows if oid >= 20))
+
+    def test_aggregates_and_group_by(self):
+        """测试聚合函数、GROUP BY 与 HAVING；NULL 不参与聚合，单独成为一个分组"""
+        self.executor.execute("CREATE TABLE emp (id INT, dept TEXT, salary INT)")
+        self.executor.execute("INSERT INTO emp (id, dept, salary) VALUES "
+                              "(1, 'a', 100), (2, 'a', 200), (3, 'b', 50), (4, NULL, NULL), (5, 'b', NULL)")
+        cursor = self.executor.execute(
+            "SELECT COUNT(*), COUNT(salary), SUM(salary), MIN(salary), MAX(salary), AVG(salary) FROM emp")
+        self.assertEqual(cursor.columns, ['COUNT(*)', 'COUNT(salary)', 'SUM(salary)', 'MIN(salary)',
+                                          'MAX(salary)', 'AVG(salary)'])
+        self.assertEqual(cursor.fetchall(), [[5, 3, 350, 50, 200, 350 / 3]])
+        self.assertEqual(self._ids("SELECT COUNT(*) FROM emp WHERE salary > 60"), [2])
+        self.assertEqual(self.executor.execute("SELECT SUM(salary), MAX(id) FROM emp WHERE id > 9").fetchall(),
+                         [[None, None]])
+        self.assertEqual(self.executor.execute("SELECT dept, COUNT(*), AVG(salary) FROM emp GROUP BY dept").fetchall(),
+                         [['a', 2, 150.0], ['b', 2, 50.0], [None, 1, None]])
+        self.assertEqual(self.executor.execute("SELECT dept FROM emp GROUP BY dept HAVING COUNT(*) > 1 "
+                                               "AND SUM(salary) >= 100").fetchall(), [['a']])
+
+        # 连接结果上的分组
+        self.executor.execute("CREATE TABLE depts (code TEXT, title TEXT)")
+        self.executor.execute("INSERT INTO depts (code, title) VALUES ('a', 'Eng'), ('b', 'Ops')")
+        cursor = self.executor.execute("SELECT title, SUM(salary) FROM emp JOIN depts ON dept = code GROUP BY title")
+        self.assertEqual(sorted(cursor.fetchall()), [['Eng', 300], ['Ops', 50]])
+        self.assertEqual(self._ids("EXPLAIN SELECT dept, COUNT(*) FROM emp GROUP BY dept")[0],
+                         "Hash Aggregate: COUNT(*) (group by: dept)")
+
+        for sql, message in [
+            ("SELECT id, COUNT(*) FROM emp", "Column 'id' must appear in GROUP BY"),
+            ("SELECT SUM(dept) FROM emp", "Cannot apply SUM to column 'dept'"),
+            ("SELECT * FROM emp GROUP BY dept", "SELECT * cannot be combined"),
+        ]:
+            with self.assertRaises(ValueError) as context:
+                self.executor.execute(sql)
+            self.assertIn(message, str(context.exception))
+
+    def test_order_by_and_limit(self):
+        """测试多列 ORDER BY、LIMIT / OFFSET、Top-N 与沿有序索引读取；NULL 升序时排在最前"""
+        self.executor.execute("CREATE TABLE emp (id INT, dept TEXT, salary INT)")
+        self.executor.execute("INSERT INTO emp (id, dept, salary) VALUES "
+                              "(1, 'b', 100), (2, 'a', NULL), (3, 'c', 100), (4, 'a', 50), (5, 'b', 70)")
+        self.assertEqual(self._ids("SELECT id FROM emp ORDER BY salary"), [2, 4, 5, 1, 3])
+        self.assertEqual(self._ids("SELECT id FROM emp ORDER BY salary DESC, dept"), [1, 3, 5, 4, 2])
+        self.assertEqual(self._ids("SELECT id FROM emp ORDER BY dept, salary DESC LIMIT 3"), [4, 2, 1])
+        self.assertEqual(self._ids("SELECT id FROM emp ORDER BY id DESC LIMIT ? OFFSET ?", (2, 1)), [4, 3])
+        self.assertEqual(self._ids("SELECT id FROM emp WHERE salary >= 70 LIMIT 2"), [1, 3])
+        self.assertEqual(self.executor.execute("SELECT dept, SUM(salary) FROM emp GROUP BY dept "
+                                               "ORDER BY SUM(salary) DESC LIMIT 2").fetchall(),
+                         [['b', 170], ['c', 100]])
+
+        self.executor.execute("CREATE INDEX idx_id ON emp (id)")
+        self.assertEqual(self._ids("SELECT id FROM emp ORDER BY id DESC LIMIT 2"), [5, 4])
+        plan = self._ids("EXPLAIN SELECT dept FROM emp ORDER BY id DESC LIMIT 2")
+        self.assertEqual(plan[:2], ["Limit: 2", "  Index Order: id DESC using idx_id"])
+        self.assertEqual(plan[-1], "Returned rows: 2")
+        self.assertEqual(self._ids("EXPLAIN SELECT id FROM emp ORDER BY salary LIMIT 2 OFFSET 1")[0],
+                         "Top-N Sort: salary (keep 3 rows)")
+
+        for sql, message in [
+            ("SELECT id FROM emp LIMIT -1", "LIMIT must be a non-negative integer"),
+            ("SELECT id FROM emp ORDER BY bonus", "Column 'bonus' does not exist"),
+            ("SELECT dept, COUNT(*) FROM emp GROUP BY dept ORDER BY id", "Column 'id' must appear in GROUP BY"),
+        ]:
+            with self.assertRaises(ValueError) as context:
+                self.executor.execute(sql)
+            self.assertIn(message, str(context.exception))
+
+    def test_statement_instrumentation(self):
+        """测试语句计量：各阶段耗时、扫描行数、索引命中、慢查询日志与监听函数，以及 SHOW STATS"""
+        with self.assertRaises(ValueError) as context:
+            self.executor.execute("SHOW STATS")
+        self.assertIn("instrumentation is not enabled", str(context.exception))
+
+        profiles = []
+        instrumentation = Instrumentation(slow_query_threshold=0, listeners=[profiles.append])
+        executor = QueryExecutor(instrumentation=instrumentation)
+        executor.execute("CREATE TABLE t (id INT, name TEXT)")
+        executor.executemany("INSERT INTO t (id, name) VALUES (?, ?)", [(i, f'n{i}') for i in range(100)])
+        self.assertEqual([profile.action for profile in profiles], ['CREATE TABLE', 'INSERT INTO'])
+        self.assertEqual(profiles[-1].rows_returned, 100)
+
+        cursor = executor.execute("SELECT name FROM t WHERE id < 10")
+        self.assertEqual(len(profiles), 2)  # 行取完时语句才结束
+        self.assertEqual(len(cursor.fetchall()), 10)
+        profile = profiles[-1]
+        self.assertEqual((profile.rows_scanned, profile.rows_returned, profile.index_hits), (100, 10, 0))
+        self.assertTrue(all(profile.phases[phase] > 0 for phase in ('parse', 'plan', 'filter', 'execute', 'fetch')))
+        self.assertAlmostEqual(profile.total, sum(profile.phases.values()))
+
+        executor.execute("CREATE INDEX idx_id ON t (id)")
+        executor.execute("SELECT name FROM t WHERE id = ?", (5,)).close()
+        self.assertEqual((profiles[-1].rows_scanned, profiles[-1].index_hits), (0, 1))
+        with self.assertRaises(ValueError):
+            executor.execute("SELECT missing FROM t")
+        self.assertIn("does not exist", profiles[-1].error)
+
+        stats = dict(executor.execute("SHOW STATS").fetchall())
+        self.assertEqual(stats['dbms_statements_total{action="SELECT"}'], 3)
+        self.assertEqual(stats['dbms_statement_errors_total{action="SELECT"}'], 1)
+        self.assertEqual(stats['dbms_rows_scanned_total'], 100)
+        self.assertEqual(stats['dbms_index_hits_total'], 1)
+        self.assertEqual(stats['dbms_statement_seconds_count{action="SELECT"}'], 3)
+        self.assertIn('dbms_index_hits_total 1\n', instrumentation.registry.render())
+        slow = executor.execute("SHOW SLOW QUERIES").fetchall()
+        self.assertEqual(slow[2][:2], ["SELECT name FROM t WHERE id < 10", 'SELECT'])
+
+    def test_abandoned_cursors_are_counted(self):
+        """测试没有取完就丢弃的游标在回收时结束计量，遍历取完的游标不记为错误，SHOW STATS 计入每条执行过的查询"""
+        profiles = []
+        executor = QueryExecutor(instrumentation=Instrumentation(listeners=[profiles.append]))
+        executor.execute("CREATE TABLE t (id INT)")
+        executor.executemany("INSERT INTO t (id) VALUES (?)", [(i,) for i in range(10)])
+
+        cursor = executor.execute("SELECT id FROM t")
+        cursor.fetchmany(3)
+        self.assertEqual(len(profiles), 2)
+        del cursor
+        self.assertEqual((profiles[-1].action, profiles[-1].rows_returned, profiles[-1].error), ('SELECT', 3, None))
+        executor.execute("SELECT id FROM t WHERE id > 5")  # 结果没有被引用，立即回收
+        self.assertEqual(profiles[-1].rows_returned, 0)
+        self.assertEqual(len([row for row in executor.execute("SELECT id FROM t")]), 10)
+        self.assertEqual((profiles[-1].rows_returned, profiles[-1].error), (10, None))
+
+        stats = dict(executor.execute("SHOW STATS").fetchall())
+        self.assertEqual(stats['dbms_statements_total{action="SELECT"}'], 3)
+        self.assertEqual(stats['dbms_statement_errors_total{action="SELECT"}'], 0)
+
+    def test_result_cache(self):
+        """测试查询结果缓存：重复查询命中，写操作、ALTER、回滚与 DROP 后重建使缓存的结果过期，事务中的结果不写入缓存"""
+        cache = ResultCache()
+        executor = QueryExecutor(self.executor.database, result_cache=cache)
+        executor.execute("CREATE TABLE users (id INT, name TEXT)")
+        executor.execute("CREATE TABLE orders (user_id INT, amount INT)")
+        executor.execute("INSERT INTO users (id, name) VALUES (1, 'Alice'), (2, 'Bob')")
+        executor.execute("INSERT INTO orders (user_id, amount) VALUES (1, 10), (2, 20)")
+        query = "SELECT name FROM users WHERE id >= ? ORDER BY id"
+        join = "SELECT name, amount FROM users JOIN orders ON users.id = orders.user_id WHERE amount > 5"
+
+        self.assertEqual(executor.execute(query, (1,)).fetchall(), [['Alice'], ['Bob']])
+        cursor = executor.execute("  SELECT name FROM users   WHERE id >= ?\n ORDER BY id; ", (1,))
+        self.assertEqual((cursor.fetchall(), cursor.rowcount), ([['Alice'], ['Bob']], 2))
+        self.assertEqual(executor.execute(query, (2,)).fetchall(), [['Bob']])  # 参数不同，不命中
+        self.assertEqual(executor.execute(join).fetchall(), [['Alice', 10], ['Bob', 20]])
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+        for sql, expected in [
+            ("INSERT INTO users (id, name) VALUES (3, 'Carol')", [['Alice'], ['Bob'], ['Carol']]),
+            ("UPDATE users SET name = 'Bobby' WHERE id = 2", [['Alice'], ['Bobby'], ['Carol']]),
+            ("DELETE FROM users WHERE id = 1", [['Bobby'], ['Carol']]),
+            ("ALTER TABLE users MODIFY COLUMN name TEXT", [['Bobby'], ['Carol']]),
+        ]:
+            executor.execute(sql)
+            self.assertEqual(executor.execute(query, (1,)).fetchall(), expected)
+        executor.execute("UPDATE orders SET amount = 1 WHERE user_id = 1")
+        self.assertEqual(executor.execute(join).fetchall(), [['Bobby', 20]])  # 连接的表变化同样过期
+
+        executor.execute("BEGIN TRANSACTION")
+        executor.execute("DELETE FROM users")
+        self.assertEqual(executor.execute(query, (1,)).fetchall(), [])
+        executor.execute("ROLLBACK")
+        self.assertEqual(executor.execute(query, (1,)).fetchall(), [['Bobby'], ['Carol']])
+        self.assertEqual(executor.execute(query, (1,)).fetchall(), [['Bobby'], ['Carol']])
+
+        executor.execute("DROP TABLE users")
+        executor.execute("CREATE TABLE users (id INT, name TEXT)")
+        self.assertEqual(executor.execute(query, (1,)).fetchall(), [])
+        info = cache.cache_info()
+        self.assertEqual((info['hits'], info['misses']), (2, 11))
+        self.assertAlmostEqual(info['hit_rate'], 2 / 13)
+
+    def test_result_cache_eviction(self):
+        """测试结果缓存按字节数淘汰最久未使用的项，超过上限的结果不缓存，取出的行可以修改而不影响缓存"""
+        executor = QueryExecutor(self.executor.database)
+        executor.execute("CREATE TABLE t (id INT, name TEXT)")
+        executor.executemany("INSERT INTO t (id, name) VALUES (?, ?)", [(i, f'name{i}') for i in range(1000)])
+        queries = [f"SELECT id, name FROM t WHERE id < {n}" for n in (10, 20, 30)]
+        sizes = []
+        for sql in queries:
+            probe = ResultCache()
+            QueryExecutor(executor.database, result_cache=probe).execute(sql)
+            sizes.append(probe.bytes)
+
+        cache = ResultCache(max_bytes=sizes[0] + sizes[2])
+        executor.result_cache = cache
+        rows = executor.execute(queries[0]).fetchall()
+        rows[0][1] = 'changed'
+        executor.execute(queries[1])
+        self.assertEqual(executor.execute(queries[0]).fetchall()[0], [0, 'name0'])  # 命中，queries[1] 成为最久未使用
+        executor.execute(queries[2])
+        self.assertEqual(list(cache.entries), [(queries[0], ()), (queries[2], ())])
+        self.assertEqual(cache.bytes, sizes[0] + sizes[2])
+        self.assertEqual(cache.evictions, 1)
+
+        executor.execute("SELECT id, name FROM t")
+        self.assertEqual(len(cache.entries), 2)  # 结果超过上限，不缓存
+        self.assertEqual(cache.cache_info()['size'], 2)
+
+class TestColumnarStorage(unittest.TestCase):
+    def setUp(self):
+        """创建列存储的表，每个测试用例前都会执行"""
+        self.executor = QueryExecutor()
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT, age INT) STORAGE COLUMNAR")
+        self.executor.execute("INSERT INTO students (id, name, age) VALUES (1, 'Alice', 20)")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (2, 'Bob')")
+        self.executor.execute("INSERT INTO students (id, name, age) VALUES (3, 'Alice', 22)")
+        self.table = self.executor.database.get_table('students')
+
+    def test_columnar_bulk_insert(self):
+        """测试列存储的批量追加，包括 NULL 与超出 64 位的整数"""
+        self.table.bulk_insert([[4, 'Dave', None], [5, 'Alice', 2 ** 70]])
+        self.assertEqual(self.table.rows[3:], [[4, 'Dave', None], [5, 'Alice', 2 ** 70]])
+        self.assertEqual(self.table.select(['id'], ('age', '>', 21)), [[3], [5]])
+
+    def test_columnar_cursor_batches(self):
+        """测试列存储的流式扫描跨越多个批次时结果与物化查询一致"""
+        self.table.bulk_insert([[i, f'name{i % 7}', None if i % 5 == 0 else i] for i in range(4, 3000)])
+        cursor = self.executor.execute("SELECT * FROM students")
+        self.assertEqual(cursor.fetchall(), self.table.rows)
+        cursor = self.executor.execute("SELECT age FROM students WHERE id > 2000")
+        self.assertEqual(list(cursor), self.table.select(['age'], ('id', '>', 2000)))
+
+    def test_columnar_layout(self):
+        """测试 INT 列使用数组与 NULL 位图，字符串列使用字典编码"""
+        from src.storage import DictColumn, FixedColumn
+        id_column, name_column, age_column = self.table.storage.columns
+        self.assertIsInstance(id_column, FixedColumn)
+        self.assertIsInstance(name_column, DictColumn)
+        self.assertEqual(name_column.pool, ['Alice', 'Bob'])
+        self.assertEqual(age_column.null_count, 1)
+        self.assertEqual(self.table.rows, [[1, 'Alice', 20], [2, 'Bob', None], [3, 'Alice', 22]])
+
+    def test_columnar_dml(self):
+        """测试列存储上的查询、更新与删除"""
+        self.assertEqual(self.table.select(['name'], ('age', '>', 20)), [['Alice']])
+        self.executor.execute("UPDATE students SET age = 30 WHERE name = 'Bob'")
+        self.assertEqual(self.table.select(['id', 'age'], ('id', '=', 2)), [[2, 30]])
+        self.executor.execute("DELETE FROM students WHERE name = 'Alice'")
+        self.assertEqual(self.table.rows, [[2, 'Bob', 30]])
+
+    def test_columnar_alter_and_rollback(self):
+        """测试列存储上的增删列以及事务回滚"""
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("ALTER TABLE students ADD COLUMN email TEXT")
+        self.executor.execute("ALTER TABLE students DROP COLUMN age")
+        self.executor.execute("UPDATE students SET email = 'a@x' WHERE id = 1")
+        self.assertEqual(self.table.rows[0], [1, 'Alice', 'a@x'])
+        self.executor.execute("DELETE FROM students WHERE id < 3")
+        self.executor.execute("ROLLBACK")
+        self.assertEqual(self.table.rows, [[1, 'Alice', 20], [2, 'Bob', None], [3, 'Alice', 22]])
+
+    def test_columnar_int_overflow(self):
+        """测试超出 64 位的整数退回字典编码"""
+        self.executor.execute(f"INSERT INTO students (id, name) VALUES ({2 ** 70}, 'Big')")
+        self.assertEqual(self.table.select(['name'], ('id', '>', 3)), [['Big']])
+
+    def test_storage_report(self):
+        """测试列存储报告相对行存储节省的内存"""
+        for i in range(1000):
+            self.table.insert_row([i + 1000, 'name%d' % (i % 10), i])
+        report = self.table.storage_report()
+        self.assertEqual(report['storage'], 'COLUMNAR')
+        self.assertEqual(report['rows'], 1003)
+        self.assertGreater(report['saved_bytes'], 0)
+        self.assertLess(report['bytes'], report['row_store_bytes'] / 2)
+
+class TestParallelScan(unittest.TestCase):
+    def setUp(self):
+        """开启并行扫描（阈值设为 1000 行），每个测试用例前都会执行"""
+        self.database = Database(parallel_workers=2, parallel_threshold=1000)
+        self.executor = QueryExecutor(self.database)
+
+    def tearDown(self):
+        self.database.close()
+
+    def test_parallel_matches_serial(self):
+        """测试并行扫描与串行扫描的结果一致"""
+        rows = [[i, f'name{i % 10}', i % 7] for i in range(5000)]
+        for storage in ['ROW', 'COLUMNAR']:
+            self.executor.execute(f"CREATE TABLE t_{storage} (id INT, name TEXT, age INT) STORAGE {storage}")
+            self.database.get_table(f't_{storage}').bulk_insert(rows)
+        serial = Table('serial', {'id': 'INT', 'name': 'TEXT', 'age': 'INT'})
+        serial.rows = rows
+        for storage in ['ROW', 'COLUMNAR']:
+            table = self.database.get_table(f't_{storage}')
+            for where in [('id', '<', 1234), ('age', '=', 3), ('id', '>', 4990), ('name', '=', 'name4'), ('name', '=', 'nobody')]:
+                self.assertEqual(table.select(['id'], where), serial.select(['id'], where))
+        self.assertEqual(self.database.scanner.scans, 7)
+
+    def test_serial_fallback(self):
+        """测试行数低于阈值、含 NULL 或字典编码列上的范围比较时退回串行扫描"""
+        self.executor.execute("CREATE TABLE t (id INT, code TEXT) STORAGE COLUMNAR")
+        table = self.database.get_table('t')
+        table.bulk_insert([[i, str(i)] for i in range(500)])
+        self.assertEqual(table.select(['id'], ('id', '<', 3)), [[0], [1], [2]])
+        table.bulk_insert([[None, None]] + [[i, str(i)] for i in range(500, 1000)])
+        self.assertEqual(table.select(['id'], ('id', '>', 997)), [[998], [999]])
+        self.assertEqual(table.select(['id'], ('code', '>', 997)), [[998], [999]])
+        self.assertEqual(self.database.scanner.scans, 0)
+
+class TestConcurrency(unittest.TestCase):
+    def setUp(self):
+        """多个线程共享一个 QueryExecutor，锁等待超时设得很短，每个测试用例前都会执行"""
+        self.database = Database(lock_timeout=0.2)
+        self.executor = QueryExecutor(self.database)
+        self.executor.execute("CREATE TABLE t (id INT, name TEXT)")
+        self.executor.execute("CREATE TABLE other (id INT)")
+        self.executor.execute("INSERT INTO t (id, name) VALUES (1, 'Alice')")
+
+    def in_thread(self, sql):
+        # 在另一个线程（另一个连接）中执行语句，返回取出的行、状态说明或错误信息
+        result = {}
+
+        def run():
+            try:
+                cursor = self.executor.execute(sql)
+                result['value'] = cursor.fetchall() if cursor.columns is not None else cursor.message
+            except ValueError as e:
+                result['value'] = str(e)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        return result['value']
+
+    def test_transaction_state_is_per_connection(self):
+        """测试每个线程有自己的事务；未提交的写操作在提交前阻塞其他连接对这张表的访问"""
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("INSERT INTO t (id, name) VALUES (2, 'Bob')")
+        self.assertTrue(self.database.in_transaction)
+        self.assertEqual(self.in_thread("INSERT INTO other (id) VALUES (1)"), "Inserted 1 row(s) into 'other'.")
+        self.assertIn("Timed out waiting for a read lock on table 't'", self.in_thread("SELECT id FROM t"))
+        self.assertEqual(self.in_thread("COMMIT"), "No transaction in progress.")
+        self.executor.execute("COMMIT")
+        self.assertEqual(self.in_thread("SELECT id FROM t"), [[1], [2]])
+
+    def test_open_cursor_holds_read_lock(self):
+        """测试未取完的游标持有读锁：其他读者不受影响，写者等到游标关闭"""
+        self.executor.executemany("INSERT INTO t (id, name) VALUES (?, ?)", [(2, 'Bob'), (3, 'Carol')])
+        cursor = self.executor.execute("SELECT id FROM t")
+        self.assertEqual(cursor.fetchone(), [1])
+        self.assertEqual(self.in_thread("SELECT COUNT(*) FROM t"), [[3]])
+        self.assertIn("Timed out waiting for a write lock on table 't'", self.in_thread("DELETE FROM t WHERE id = 1"))
+        cursor.close()
+        self.assertEqual(self.in_thread("DELETE FROM t WHERE id = 1"), "Deleted 1 row(s) from 't'.")
+        self.assertEqual(self.executor.execute("SELECT id FROM t").fetchall(), [[2], [3]])
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        """在后台线程中启动服务器（系统分配端口，每帧 2 行），每个测试用例前都会执行"""
+        self.database = Database()
+        self.server = DatabaseServer(self.database, port=0, batch_rows=2).start_background()
+        self.pool = ConnectionPool(port=self.server.port, size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+
+    def test_pipeline_and_streaming(self):
+        """测试流水线请求按顺序响应、结果分批传输，以及错误信息传回客户端"""
+        self.pool.execute("CREATE TABLE t (id INT, name TEXT)")
+        with self.pool.connection() as connection:
+            results = connection.pipeline(
+                [("INSERT INTO t (id, name) VALUES (?, ?)", (i, f'n{i}')) for i in range(5)]
+                + ["SELECT id FROM t WHERE id >= 1", "SELECT nope FROM t", "SELECT COUNT(*) FROM t"])
+            rows = results[-3].wait()
+            self.assertEqual(rows.columns, ['id'])
+            self.assertEqual(rows.fetchall(), [[1], [2], [3], [4]])
+            self.assertEqual(rows.rowcount, 4)
+            with self.assertRaises(ValueError) as context:
+                results[-2].wait()
+            self.assertIn("Column 'nope' does not exist", str(context.exception))
+            self.assertEqual(results[-1].fetchall(), [[5]])
+        self.assertEqual(self.pool.execute("SELECT name FROM t ORDER BY id DESC LIMIT 1"), (['name'], [['n4']]))
+
+    def test_transactions_belong_to_connections(self):
+        """测试事务属于连接：其他连接看不到未提交的修改，连接断开时事务被回滚"""
+        self.pool.execute("CREATE TABLE t (id INT)")
+        self.pool.execute("INSERT INTO t (id) VALUES (1)")
+        connection = Connection(port=self.server.port)
+        connection.execute("BEGIN TRANSACTION")
+        result = connection.execute("DELETE FROM t")
+        self.assertEqual((result.columns, result.rowcount, result.message), (None, 1, "Deleted 1 row(s) from 't'."))
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM t").fetchall(), [[0]])
+        connection.close()
+        self.assertEqual(self.pool.execute("SELECT COUNT(*) FROM t"), (['COUNT(*)'], [[1]]))
+
+    def test_pool_rolls_back_unfinished_transactions(self):
+        """测试连接放回连接池时回滚借用者没有结束的事务：下一个借用者看不到它的修改，也不继承它的事务与锁"""
+        pool = ConnectionPool(port=self.server.port, size=1)
+        self.addCleanup(pool.close)
+        pool.execute("CREATE TABLE t (id INT)")
+        pool.execute("INSERT INTO t (id) VALUES (1)")
+        with self.assertRaises(RuntimeError):
+            with pool.connection() as connection:
+                connection.execute("BEGIN TRANSACTION")
+                connection.execute("DELETE FROM t")
+                self.assertTrue(connection.in_transaction)
+                raise RuntimeError("borrower failed")
+        with pool.connection() as connection:
+            self.assertFalse(connection.in_transaction)
+            connection.execute("BEGIN TRANSACTION")  # 继承了事务时报错
+            connection.execute("INSERT INTO t (id) VALUES (2)")  # 没有提交就放回
+        with pool.connection() as connection:
+            self.assertFalse(connection.in_transaction)
+            self.assertEqual(connection.execute("SELECT id FROM t").fetchall(), [[1]])
+        self.assertEqual(pool.created, 1)
+        # 锁已经释放，其他连接可以立即写这张表
+        with Connection(port=self.server.port) as other:
+            other.execute("INSERT INTO t (id) VALUES (3)")
+        self.assertEqual(pool.execute("SELECT COUNT(*) FROM t"), (['COUNT(*)'], [[2]]))
+
+class TestDiskStorage(unittest.TestCase):
+    def setUp(self):
+        """在临时目录中创建持久化数据库，每个测试用例前都会执行"""
+        self.data_dir = tempfile.mkdtemp()
+        self.executor = QueryExecutor(Database(self.data_dir, buffer_pool_pages=4))
+
+    def tearDown(self):
+        self.executor.database.close()
+        shutil.rmtree(self.data_dir)
+
+    def reopen(self):
+        self.executor.database.close()
+        self.executor = QueryExecutor(Database(self.data_dir, buffer_pool_pages=4))
+        return self.executor.database
+
+    def test_data_survives_restart(self):
+        """测试关闭后重新打开数据库，表结构、数据与索引仍然存在"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (1, 'Alice')")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (2, 'Bob')")
+        self.executor.execute("CREATE INDEX idx_id ON students (id)")
+        self.executor.execute("CREATE TABLE scratch (id INT) STORAGE ROW")
+
+        database = self.reopen()
+        self.assertNotIn('scratch', database.tables)
+        table = database.get_table('students')
+        self.assertEqual(table.storage.storage_type, 'DISK')
+        self.assertEqual(table.rows, [[1, 'Alice'], [2, 'Bob']])
+        self.assertEqual(table._index_lookup(('id', '=', 2)), [1])
+
+    def test_many_pages_with_small_buffer_pool(self):
+        """测试数据超出缓冲池容量时的增删改查"""
+        self.executor.execute("CREATE TABLE t (id INT, name TEXT)")
+        table = self.executor.database.get_table('t')
+        for i in range(3000):
+            table.insert_row([i, 'name%d' % i])
+        table.update_rows({'name': 'x' * 200}, ('id', '<', 100))
+        table.delete_rows(('id', '>', 2500))
+        table.add_column('age', 'INT')
+        self.assertGreater(len(table.storage.page_ids), 4)
+        self.assertLessEqual(len(self.executor.database.buffer_pool.pages), 4)
+
+        table = self.reopen().get_table('t')
+        self.assertEqual(len(table.rows), 2501)
+        self.assertEqual(table.select(['id', 'name', 'age'], ('id', '=', 50)), [[50, 'x' * 200, None]])
+        self.assertEqual(table.select(['name'], ('id', '=', 2000)), [['name2000']])
+
+    def test_bulk_insert_fills_pages(self):
+        """测试磁盘表批量插入跨越多个页，并可在重启后读回"""
+        self.executor.execute("CREATE TABLE t (id INT, name TEXT)")
+        self.executor.execute("INSERT INTO t (id, name) VALUES (0, 'first')")
+        self.executor.executemany("INSERT INTO t (id, name) VALUES (?, ?)", [(i, 'name%d' % i) for i in range(1, 3000)])
+        storage = self.executor.database.get_table('t').storage
+        self.assertGreater(len(storage.page_ids), 4)
+        self.assertEqual(storage.starts[1], storage.counts[0])
+
+        table = self.crash().get_table('t')
+        self.assertEqual(len(table.rows), 3000)
+        self.assertEqual(table.select(['name'], ('id', '=', 2999)), [['name2999']])
+
+    def test_cursor_reads_pages_lazily(self):
+        """测试磁盘表的游标按需读取页"""
+        self.executor.execute("CREATE TABLE t (id INT, name TEXT)")
+        self.executor.executemany("INSERT INTO t (id, name) VALUES (?, ?)", [(i, 'name%d' % i) for i in range(3000)])
+
+        heap = self.reopen().get_table('t').storage.heap
+        reads = heap.reads
+        cursor = self.executor.execute("SELECT name FROM t")
+        self.assertEqual(cursor.fetchone(), ['name0'])
+        self.assertEqual(heap.reads - reads, 1)
+        self.assertEqual(len(cursor.fetchall()), 2999)
+
+    def test_index_lookup_reads_only_needed_pages(self):
+        """测试索引点查只读取命中的页"""
+        self.executor.execute("CREATE TABLE t (id INT, name TEXT)")
+        table = self.executor.database.get_table('t')
+        for i in range(3000):
+            table.insert_row([i, 'name%d' % i])
+        table.create_index('idx_id', 'id', 'HASH')
+
+        heap = self.reopen().get_table('t').storage.heap
+        table = self.executor.database.get_table('t')
+        reads = heap.reads
+        self.assertEqual(table.select(['name'], ('id', '=', 1234)), [['name1234']])
+        self.assertEqual(heap.reads - reads, 1)
+
+    def test_aggregate_fast_paths_read_no_pages(self):
+        """测试 COUNT(*) 取自表的元数据，MIN / MAX 取自有序索引，都不读取数据页"""
+        self.executor.execute("CREATE TABLE t (id INT, name TEXT)")
+        self.executor.executemany("INSERT INTO t (id, name) VALUES (?, ?)", [(i, 'name%d' % i) for i in range(3000)])
+        self.executor.execute("CREATE INDEX idx_id ON t (id)")
+
+        heap = self.reopen().get_table('t').storage.heap
+        reads = heap.reads
+        cursor = self.executor.execute("SELECT COUNT(*), MIN(id), MAX(id) FROM t")
+        self.assertEqual(cursor.fetchall(), [[3000, 0, 2999]])
+        self.assertEqual(heap.reads - reads, 0)
+        self.assertEqual(self.executor.execute("SELECT SUM(id) FROM t WHERE id < 10").fetchall(), [[45]])
+        cursor = self.executor.execute("SELECT name, COUNT(*), MAX(id) FROM t WHERE id < 3 GROUP BY name")
+        self.assertEqual(cursor.fetchall(), [['name0', 1, 0], ['name1', 1, 1], ['name2', 1, 2]])
+
+    def test_disk_rollback_and_drop(self):
+        """测试磁盘表上的事务回滚，以及删除表后堆文件被清理"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (1, 'Alice')")
+        self.executor.database.checkpoint()
+
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("DELETE FROM students")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (2, 'Bob')")
+        self.executor.execute("DROP TABLE students")
+        self.executor.execute("ROLLBACK")
+        self.assertEqual(self.reopen().get_table('students').rows, [[1, 'Alice']])
+
+        self.executor.execute("DROP TABLE students")
+        self.executor.database.checkpoint()
+        self.assertEqual([name for name in os.listdir(self.data_dir) if name.endswith('.heap')], [])
+
+    def crash(self):
+        # 模拟进程崩溃：不写回脏页、不做检查点，直接在同一目录上重新打开
+        crashed = self.executor.database
+        self.executor = QueryExecutor(Database(self.data_dir, buffer_pool_pages=4))
+        crashed.wal.close()
+        for table in list(crashed.tables.values()) + crashed.dropped_tables:
+            table.storage.heap.close()
+        return self.executor.database
+
+    def test_recovery_replays_committed_log(self):
+        """测试崩溃后根据预写日志恢复已提交的修改，未提交的事务不会重放"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (1, 'Alice')")
+        self.executor.database.checkpoint()
+        self.executor.execute("INSERT INTO students (id, name) VALUES (2, 'Bob')")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (3, 'Carol')")
+        self.executor.execute("UPDATE students SET name = 'Bobby' WHERE id = 2")
+        self.executor.execute("DELETE FROM students WHERE id = 1")
+        self.executor.execute("CREATE INDEX idx_id ON students (id)")
+        self.executor.execute("ALTER TABLE students ADD COLUMN age INT")
+        self.executor.execute("CREATE TABLE courses (title TEXT)")
+        self.executor.execute("INSERT INTO courses (title) VALUES ('Math')")
+
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("DELETE FROM students")
+        self.executor.execute("DROP TABLE courses")
+        self.executor.execute("ROLLBACK")
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("INSERT INTO students (id, name, age) VALUES (4, 'Dave', 20)")
+        self.executor.execute("COMMIT")
+        self.executor.execute("BEGIN TRANSACTION")
+        self.executor.execute("INSERT INTO students (id, name, age) VALUES (5, 'Eve', 21)")
+
+        database = self.crash()
+        table = database.get_table('students')
+        self.assertEqual(table.rows, [[2, 'Bobby', None], [3, 'Carol', None], [4, 'Dave', 20]])
+        self.assertEqual(table._index_lookup(('id', '=', 3)), [1])
+        self.assertEqual(database.get_table('courses').rows, [['Math']])
+        # 恢复后日志已清空，之后的修改接着写入日志
+        self.assertEqual(os.path.getsize(os.path.join(self.data_dir, 'wal.log')), 0)
+        self.executor.execute("DROP TABLE courses")
+        self.assertNotIn('courses', self.crash().tables)
+
+    def test_alter_recovery_and_background_compaction(self):
+        """测试磁盘表 ALTER 之后的槽位布局在检查点与日志重放后保持一致，后台线程压缩不改变表的内容"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT, age INT)")
+        self.executor.execute("INSERT INTO students (id, name, age) VALUES (1, 'Alice', 20), (2, 'Bob', 21)")
+        self.executor.execute("ALTER TABLE students DROP COLUMN name")
+        self.executor.execute("ALTER TABLE students ADD COLUMN score INT")
+        self.executor.database.checkpoint()
+        self.executor.execute("INSERT INTO students (id, age, score) VALUES (3, 22, 90)")
+        self.executor.execute("UPDATE students SET score = 80 WHERE id = 1")
+        self.executor.execute("ALTER TABLE students DROP COLUMN age")
+
+        database = self.crash()
+        table = database.get_table('students')
+        self.assertEqual(table.schema.positions, {'id': 0, 'score': 3})
+        self.assertEqual(table.rows, [[1, 80], [2, None], [3, 90]])
+        database.close()
+
+        database = Database(self.data_dir, buffer_pool_pages=4, compaction_interval=0.01)
+        self.executor = QueryExecutor(database)
+        table = database.get_table('students')
+        for _ in range(500):
+            if not table.needs_compaction:
+                break
+            time.sleep(0.01)
+        self.assertFalse(table.needs_compaction)
+        self.assertEqual(table.storage.get_row(1), [2, None])
+        self.assertEqual(self.executor.execute("SELECT * FROM students WHERE score > 85").fetchall(), [[3, 90]])
+        self.assertEqual(self.reopen().get_table('students').rows, [[1, 80], [2, None], [3, 90]])
+
+    def test_typed_values_survive_recovery(self):
+        """测试 FLOAT、BOOLEAN、DATE、TIMESTAMP 的值在页中以二进制编码存放，检查点与日志重放后类型不变"""
+        self.executor.execute("CREATE TABLE events (id INT, price FLOAT, paid BOOLEAN, day DATE, created TIMESTAMP)")
+        self.executor.execute("INSERT INTO events (id, price, paid, day, created) "
+                              "VALUES (1, 9.5, TRUE, '2024-01-02', '2024-01-02 10:00:00')")
+        self.executor.database.checkpoint()
+        self.executor.execute("INSERT INTO events (id, price, paid, day, created) "
+                              "VALUES (2, 0.25, FALSE, '2024-03-01', '2024-03-01 08:30:00.5')")
+        self.executor.execute("UPDATE events SET day = '2025-05-05' WHERE id = 1")
+
+        table = self.crash().get_table('events')
+        self.assertEqual(table.rows, [
+            [1, 9.5, True, datetime.date(2025, 5, 5), datetime.datetime(2024, 1, 2, 10, 0)],
+            [2, 0.25, False, datetime.date(2024, 3, 1), datetime.datetime(2024, 3, 1, 8, 30, 0, 500000)],
+        ])
+
+    def test_group_commit_not_slower_than_one_writer(self):
+        """测试设置了 group commit 窗口时并发提交的吞吐不低于单个写入者：已追加的记录不再等满整个窗口"""
+        def throughput(writers, commits=400):
+            wal = WriteAheadLog(os.path.join(self.data_dir, f'wal_{writers}.log'), group_commit_window=0.001)
+            threads = [threading.Thread(target=lambda: [wal.commit([('insert', 't', [1])])
+                                                        for _ in range(commits // writers)]) for _ in range(writers)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            wal.close()
+            self.assertEqual(wal.commits, commits)
+            return commits / elapsed
+
+        single = max(throughput(1) for _ in range(3))
+        self.assertGreaterEqual(max(throughput(8) for _ in range(3)), single)
+
+    def test_recovery_ignores_torn_record(self):
+        """测试日志末尾写了一半的记录被忽略"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (1, 'Alice')")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (2, 'Bob')")
+        path = os.path.join(self.data_dir, 'wal.log')
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 3)
+
+        self.assertEqual(self.crash().get_table('students').rows, [[1, 'Alice']])
+        self.executor.execute("INSERT INTO students (id, name) VALUES (3, 'Carol')")
+        self.assertEqual(self.crash().get_table('students').rows, [[1, 'Alice'], [3, 'Carol']])
+
+    def test_snapshot_save_and_load(self):
+        """测试 SAVE / LOAD：各种存储的表写入快照，载入后的列在首次访问时才读取，修改不影响快照文件"""
+        self.executor.execute("CREATE TABLE students (id INT, name TEXT)")
+        self.executor.execute("CREATE TABLE scores (id INT, score INT) STORAGE COLUMNAR")
+        self.executor.execute("INSERT INTO students (id, name) VALUES (1, 'Alice'), (2, NULL), (NULL, 'Zoë')")
+        self.executor.execute("INSERT INTO scores (id, score) VALUES (1, 90), (2, NULL), (3, 99999999999999999999)")
+        self.executor.execute("CREATE INDEX idx_id ON students (id) USING HASH")
+        path = os.path.join(self.data_dir, 'backup.snap')
+        self.assertEqual(self.executor.execute(f"SAVE '{path}'").message, f"Saved 2 table(s) to '{path}'.")
+
+        executor = QueryExecutor()
+        self.assertEqual(executor.execute("LOAD ?", (path,)).message,
+                         f"Loaded 2 table(s) from '{path}': students, scores")
+        scores = executor.database.get_table('scores')
+        self.assertEqual(scores.storage.get_row(1), [2, None])
+        self.assertTrue(all(column.column is None for column in scores.storage.columns))
+        self.assertEqual(executor.execute("SELECT * FROM scores").fetchall(),
+                         [[1, 90], [2, None], [3, 99999999999999999999]])
+        self.assertEqual(executor.execute("SELECT name FROM students WHERE id = 2").fetchall(), [[None]])
+        self.assertEqual(list(executor.database.get_table('students').indexes), ['idx_id'])
+        executor.execute("UPDATE students SET name = 'Bob' WHERE id = 2")
+        with self.assertRaises(ValueError) as context:
+            executor.execute(f"LOAD '{path}'")
+        self.assertIn("Table 'students' already exists.", str(context.exception))
+
+        reloaded = QueryExecutor()
+        reloaded.execute(f"LOAD '{path}'")
+        self.assertEqual(reloaded.execute("SELECT * FROM students").fetchall(),
+                         [[1, 'Alice'], [2, None], [None, 'Zoë']])
 
 if __name__ == '__main__':
     unittest.main()